@@ -1,15 +1,39 @@
 import json
-import httpx
 from firebase_admin import auth
-from config.utils import get_secret
+from config.utils import secret_cache
+from config.firebase_config import initialize_firebase
+from services.executor_service import run_io
+from services.http_client import post_with_retry
+from services.metrics import span
+from auth.token_cache import GoogleCertCache, TokenVerificationCache, RevocationCache
 import os
 
-api_key_data = json.loads(get_secret("api-key"))
-FIREBASE_WEB_API_KEY = api_key_data["FIREBASE_WEB_API_KEY"]
+# Web API key diambil dari Secret Manager saat pertama dipakai (lalu di-cache), bukan saat import
+API_KEY_SECRET = "api-key"
 
-FIREBASE_SIGNUP_URL = f"https://identitytoolkit.googleapis.com/v1/accounts:signUp?key={FIREBASE_WEB_API_KEY}"
-FIREBASE_LOGIN_URL = f"https://identitytoolkit.googleapis.com/v1/accounts:signInWithPassword?key={FIREBASE_WEB_API_KEY}"
-FIREBASE_REFRESH_TOKEN_URL = f"https://securetoken.googleapis.com/v1/token?key={FIREBASE_WEB_API_KEY}"
+FIREBASE_SIGNUP_URL = "https://identitytoolkit.googleapis.com/v1/accounts:signUp"
+FIREBASE_LOGIN_URL = "https://identitytoolkit.googleapis.com/v1/accounts:signInWithPassword"
+FIREBASE_REFRESH_TOKEN_URL = "https://securetoken.googleapis.com/v1/token"
+
+def get_firebase_web_api_key() -> str:
+    return json.loads(secret_cache.get(API_KEY_SECRET))["FIREBASE_WEB_API_KEY"]
+
+async def _post_firebase(url: str, idempotent: bool = True, **kwargs):
+    # Secret Manager hanya dipanggil jika cache masih kosong
+    api_key = await run_io(get_firebase_web_api_key)
+    return await post_with_retry(url, idempotent=idempotent, params={"key": api_key}, **kwargs)
+
+# Cek pencabutan token dan akun nonaktif di setiap request (murah karena status pengguna di-cache)
+AUTH_CHECK_REVOKED = os.getenv("AUTH_CHECK_REVOKED", "true").lower() == "true"
+
+def _fetch_user_state(uid: str) -> tuple:
+    initialize_firebase()
+    user = auth.get_user(uid)
+    return user.tokens_valid_after_timestamp / 1000, user.disabled
+
+cert_cache = GoogleCertCache()
+token_cache = TokenVerificationCache(cert_cache)
+revocation_cache = RevocationCache(_fetch_user_state)
 
 async def register_user(email: str, password: str):
     payload = {
@@ -17,13 +41,13 @@ async def register_user(email: str, password: str):
         "password": password.strip(),
         "returnSecureToken": True
     }
-    async with httpx.AsyncClient() as client:
-        response = await client.post(FIREBASE_SIGNUP_URL, json=payload)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            error_message = response.json().get("error", {}).get("message", "Unknown error")
-            raise ValueError(f"Registration failed: {error_message}")
+    # signUp tidak idempotent: hanya diulang jika request belum terkirim
+    response = await _post_firebase(FIREBASE_SIGNUP_URL, idempotent=False, json=payload)
+    if response.status_code == 200:
+        return response.json()
+    else:
+        error_message = response.json().get("error", {}).get("message", "Unknown error")
+        raise ValueError(f"Registration failed: {error_message}")
 
 async def login_user(email: str, password: str):
     payload = {
@@ -31,55 +55,58 @@ async def login_user(email: str, password: str):
         "password": password.strip(),
         "returnSecureToken": True
     }
-    async with httpx.AsyncClient() as client:
-        response = await client.post(FIREBASE_LOGIN_URL, json=payload)
-        if response.status_code == 200:
-            data = response.json()
-            return {
-                "idToken": data.get("idToken"),
-                "refreshToken": data.get("refreshToken"),
-                "expiresIn": data.get("expiresIn")
-            }
-        else:
-            error_message = response.json().get("error", {}).get("message", "Unknown error")
-            raise ValueError(f"Login failed: {error_message}")
+    response = await _post_firebase(FIREBASE_LOGIN_URL, json=payload)
+    if response.status_code == 200:
+        data = response.json()
+        return {
+            "idToken": data.get("idToken"),
+            "refreshToken": data.get("refreshToken"),
+            "expiresIn": data.get("expiresIn")
+        }
+    else:
+        error_message = response.json().get("error", {}).get("message", "Unknown error")
+        raise ValueError(f"Login failed: {error_message}")
 
 async def refresh_user_token(refreshToken: str):
     payload = {
         "grant_type": "refresh_token",
         "refresh_token": refreshToken
     }
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.post(FIREBASE_REFRESH_TOKEN_URL, json=payload)
-        
-        if response.status_code == 200:
-            data = response.json()
-            return {
-                "idToken": data.get("id_token"),
-                "refreshToken": data.get("refresh_token"),
-                "expiresIn": data.get("expires_in")
-            }
-        else:
-            error_message = response.json().get("error", {}).get("message", "Unknown error")
-            raise ValueError(f"Token refresh failed: {error_message}")
+
+    response = await _post_firebase(FIREBASE_REFRESH_TOKEN_URL, json=payload)
+
+    if response.status_code == 200:
+        data = response.json()
+        return {
+            "idToken": data.get("id_token"),
+            "refreshToken": data.get("refresh_token"),
+            "expiresIn": data.get("expires_in")
+        }
+    else:
+        error_message = response.json().get("error", {}).get("message", "Unknown error")
+        raise ValueError(f"Token refresh failed: {error_message}")
 
 async def logout_user(idToken: str):
     """
     Logout pengguna dengan mencabut semua token refresh menggunakan Firebase Admin SDK.
     """
     try:
+        await run_io(initialize_firebase)
+
         # Verifikasi ID token untuk mendapatkan UID pengguna
-        decoded_token = auth.verify_id_token(idToken, check_revoked=False)
+        decoded_token = await run_io(auth.verify_id_token, idToken, check_revoked=False)
         uid = decoded_token.get("uid")
 
         # Cabut semua refresh token untuk UID pengguna
-        auth.revoke_refresh_tokens(uid)
+        await run_io(auth.revoke_refresh_tokens, uid)
 
         # Mendapatkan informasi pengguna setelah pencabutan
-        user = auth.get_user(uid)
+        user = await run_io(auth.get_user, uid)
         revocation_second = user.tokens_valid_after_timestamp / 1000
 
+        # Perbarui cache agar token lama langsung ditolak di instance ini
+        revocation_cache.set_user_state(uid, revocation_second, user.disabled)
+
         print(f"Tokens revoked at: {revocation_second}")  # Debugging
 
         return {"message": "Logout successful"}
@@ -90,8 +117,50 @@ async def logout_user(idToken: str):
     except Exception as e:
         raise Exception(f"An unexpected error occurred: {str(e)}")
 
-def verify_id_token(id_token: str):
+def verify_id_token(id_token: str, check_revoked: bool = AUTH_CHECK_REVOKED):
+    """
+    Verifikasi ID token secara lokal dengan cache token dan sertifikat Google.
+    Tanpa GOOGLE_CLOUD_PROJECT (atau saat memakai Auth emulator) verifikasi
+    diserahkan ke Firebase Admin SDK.
+    """
     try:
-        return auth.verify_id_token(id_token)
+        with span("verify_id_token"):
+            project_id = os.getenv("GOOGLE_CLOUD_PROJECT")
+            if not project_id or os.getenv("FIREBASE_AUTH_EMULATOR_HOST"):
+                initialize_firebase()
+                decoded_token = auth.verify_id_token(id_token)
+            else:
+                decoded_token = token_cache.verify(id_token, project_id)
+
+            if check_revoked and revocation_cache.is_revoked(decoded_token):
+                raise ValueError("Token has been revoked or the user is disabled")
+            return decoded_token
     except Exception as e:
-        raise ValueError(f"Token verification failed: {str(e)}")
\ No newline at end of file
+        raise ValueError(f"Token verification failed: {str(e)}")
+
+def start_token_verification():
+    """
+    Prefetch sertifikat Google dan Web API key, lalu mulai refresh di background.
+    """
+    if not os.getenv("GOOGLE_CLOUD_PROJECT"):
+        return
+    secret_cache.start_background_refresh(API_KEY_SECRET)
+    if not os.getenv("FIREBASE_AUTH_EMULATOR_HOST"):
+        cert_cache.start_background_refresh()
+
+def get_auth_cache_stats() -> dict:
+    return {
+        "token_cache": token_cache.get_stats(),
+        "revocation_cache": revocation_cache.get_stats(),
+        "cert_refreshes": cert_cache.refresh_count,
+        "cert_forced_refreshes": cert_cache.forced_refresh_count,
+        "unknown_kid_rejections": cert_cache.unknown_kid_rejections,
+        "secret_fetches": secret_cache.fetch_count
+    }
+
+def is_privileged_token(decoded_token: dict) -> bool:
+    """
+    Token admin atau service account ditandai dengan custom claim Firebase
+    (`admin: true` atau `role: "admin" | "service"`).
+    """
+    return decoded_token.get("admin") is True or decoded_token.get("role") in ("admin", "service")
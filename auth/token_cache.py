@@ -0,0 +1,239 @@
+import os
+import re
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+import httpx
+from google.auth import jwt
+
+# Sertifikat publik Google untuk menandatangani Firebase ID token
+GOOGLE_CERTS_URL = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+FIREBASE_ISSUER_PREFIX = "https://securetoken.google.com/"
+
+TOKEN_CACHE_MAX_SIZE = int(os.getenv("TOKEN_CACHE_MAX_SIZE", "10000"))
+REVOCATION_CACHE_TTL = float(os.getenv("REVOCATION_CACHE_TTL", "60"))
+CERT_REFRESH_MARGIN = 300  # refresh sertifikat 5 menit sebelum kedaluwarsa
+CERT_DEFAULT_MAX_AGE = 3600
+CLOCK_SKEW_SECONDS = 5
+# Refresh paksa karena `kid` tidak dikenal paling sering sekali per interval ini
+CERT_FORCED_REFRESH_INTERVAL = float(os.getenv("CERT_FORCED_REFRESH_INTERVAL", "60"))
+# Format `kid` sertifikat Google: SHA-1 heksadesimal
+KID_PATTERN = re.compile(r"[0-9a-f]{40}")
+
+class GoogleCertCache:
+    """
+    Keeps Google's token signing certificates in memory. Certificates are
+    prefetched at startup and refreshed by a background thread before the
+    `Cache-Control: max-age` of the last response runs out.
+    """
+
+    def __init__(self, url: str = GOOGLE_CERTS_URL):
+        self.url = url
+        self._certs = {}
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._refresh_lock = threading.Lock()
+        self._last_forced_refresh = 0.0
+        self.refresh_count = 0
+        self.forced_refresh_count = 0
+        self.unknown_kid_rejections = 0
+
+    def refresh(self) -> dict:
+        response = httpx.get(self.url, timeout=10)
+        response.raise_for_status()
+        match = re.search(r"max-age=(\d+)", response.headers.get("cache-control", ""))
+        max_age = int(match.group(1)) if match else CERT_DEFAULT_MAX_AGE
+
+        with self._lock:
+            self._certs = response.json()
+            self._expires_at = time.time() + max_age
+            self.refresh_count += 1
+        logging.info(f"Google signing certificates refreshed ({len(self._certs)} keys, max-age {max_age}s)")
+        return self._certs
+
+    def get_certs(self) -> dict:
+        if not self._certs or time.time() >= self._expires_at:
+            return self.refresh()
+        return self._certs
+
+    def refresh_for_unknown_kid(self, kid) -> dict:
+        """
+        Refreshes early for a `kid` that is not in the cached certificates (a
+        key rotated before the scheduled refresh), at most once per
+        CERT_FORCED_REFRESH_INTERVAL. Tokens are free to forge, so a `kid`
+        that does not look like a Google key never triggers a fetch, and in
+        between refreshes unknown keys are rejected without one.
+        """
+        if not isinstance(kid, str) or not KID_PATTERN.fullmatch(kid):
+            with self._lock:
+                self.unknown_kid_rejections += 1
+            return self._certs
+        with self._refresh_lock:
+            if kid in self._certs:
+                # Sudah di-refresh oleh thread lain selagi menunggu
+                return self._certs
+            if time.time() - self._last_forced_refresh < CERT_FORCED_REFRESH_INTERVAL:
+                with self._lock:
+                    self.unknown_kid_rejections += 1
+                return self._certs
+            self._last_forced_refresh = time.time()
+            with self._lock:
+                self.forced_refresh_count += 1
+            return self.refresh()
+
+    def start_background_refresh(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, name="cert-refresh", daemon=True)
+        self._thread.start()
+
+    def stop_background_refresh(self):
+        self._stop.set()
+        self._thread = None
+
+    def _refresh_loop(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+                delay = max(self._expires_at - time.time() - CERT_REFRESH_MARGIN, 60)
+            except Exception as e:
+                logging.error(f"Failed to refresh Google signing certificates: {e}")
+                delay = 30
+            self._stop.wait(delay)
+
+class TokenVerificationCache:
+    """
+    Verifies Firebase ID tokens locally against the cached certificates and
+    keeps each decoded token, keyed by its SHA-256 hash, until its `exp`.
+    """
+
+    def __init__(self, cert_cache: GoogleCertCache, max_size: int = TOKEN_CACHE_MAX_SIZE):
+        self.cert_cache = cert_cache
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def verify(self, id_token: str, project_id: str) -> dict:
+        key = hashlib.sha256(id_token.encode("utf-8")).hexdigest()
+        now = time.time()
+
+        with self._lock:
+            decoded = self._entries.get(key)
+            if decoded is not None and decoded["exp"] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return decoded
+            self.misses += 1
+
+        decoded = self._verify_signature(id_token, project_id)
+
+        with self._lock:
+            self._entries[key] = decoded
+            self._entries.move_to_end(key)
+            # Buang token kedaluwarsa, lalu entri paling lama jika cache penuh
+            if len(self._entries) > self.max_size:
+                for expired_key in [k for k, v in self._entries.items() if v["exp"] <= now]:
+                    del self._entries[expired_key]
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return decoded
+
+    def _verify_signature(self, id_token: str, project_id: str) -> dict:
+        header = jwt.decode_header(id_token)
+        if header.get("alg") != "RS256":
+            raise ValueError(f"Firebase ID token has incorrect algorithm: {header.get('alg')}")
+
+        certs = self.cert_cache.get_certs()
+        if header.get("kid") not in certs:
+            # Kunci baru dirotasi sebelum jadwal refresh
+            certs = self.cert_cache.refresh_for_unknown_kid(header.get("kid"))
+            if header.get("kid") not in certs:
+                raise ValueError("Firebase ID token has an unknown 'kid' header")
+
+        decoded = jwt.decode(
+            id_token, certs=certs, audience=project_id, clock_skew_in_seconds=CLOCK_SKEW_SECONDS
+        )
+        if decoded.get("iss") != FIREBASE_ISSUER_PREFIX + project_id:
+            raise ValueError(f"Firebase ID token has incorrect 'iss' claim: {decoded.get('iss')}")
+        subject = decoded.get("sub")
+        if not isinstance(subject, str) or not subject or len(subject) > 128:
+            raise ValueError("Firebase ID token has an invalid 'sub' claim")
+
+        decoded["uid"] = subject
+        return decoded
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+            }
+
+class RevocationCache:
+    """
+    Caches each user's `tokens_valid_after` and `disabled` flag for a short
+    TTL so that revocation checks do not need a Firebase Auth lookup on
+    every request.
+    """
+
+    def __init__(self, fetch_user_state, ttl: float = REVOCATION_CACHE_TTL):
+        # fetch_user_state(uid) -> (detik epoch sejak token dianggap valid, akun dinonaktifkan)
+        self.fetch_user_state = fetch_user_state
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_user_state(self, uid: str) -> tuple:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(uid)
+            if entry is not None and entry[2] > now:
+                self.hits += 1
+                return entry[0], entry[1]
+            self.misses += 1
+
+        valid_after, disabled = self.fetch_user_state(uid)
+        self.set_user_state(uid, valid_after, disabled)
+        return valid_after, disabled
+
+    def set_user_state(self, uid: str, valid_after: float, disabled: bool = False):
+        now = time.time()
+        with self._lock:
+            self._entries[uid] = (valid_after, disabled, now + self.ttl)
+            if len(self._entries) > TOKEN_CACHE_MAX_SIZE:
+                for expired_uid in [k for k, v in self._entries.items() if v[2] <= now]:
+                    del self._entries[expired_uid]
+
+    def is_revoked(self, decoded_token: dict) -> bool:
+        """
+        Like the Admin SDK's `check_revoked=True`: a token issued before
+        `tokens_valid_after` or belonging to a disabled user is rejected.
+        """
+        valid_after, disabled = self.get_user_state(decoded_token["uid"])
+        return disabled or decoded_token["iat"] < valid_after
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+            }
@@ -0,0 +1,94 @@
+"""
+Mengukur biaya autentikasi per request: verifikasi ID token tanpa cache,
+dengan cache token, dan dengan cek pencabutan (tokens_valid_after) yang di-cache.
+
+Jalankan dari root repository:
+    python -m benchmarks.auth_verification --iterations 2000
+"""
+import time
+import argparse
+import datetime
+from cryptography import x509
+from cryptography.x509.oid import NameOID
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from google.auth import crypt, jwt
+from auth.token_cache import GoogleCertCache, TokenVerificationCache, RevocationCache, FIREBASE_ISSUER_PREFIX
+
+PROJECT_ID = "bench-project"
+KEY_ID = "bench-key"
+
+def make_signing_material():
+    """
+    Membuat pasangan kunci RSA dan sertifikat self-signed seperti milik Google.
+    """
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "bench")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name).issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    private_pem = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    signer = crypt.RSASigner.from_string(private_pem, key_id=KEY_ID)
+    return signer, {KEY_ID: cert.public_bytes(serialization.Encoding.PEM).decode("utf-8")}
+
+def make_token(signer, uid: str) -> str:
+    now = int(time.time())
+    payload = {
+        "iss": FIREBASE_ISSUER_PREFIX + PROJECT_ID,
+        "aud": PROJECT_ID,
+        "sub": uid,
+        "iat": now,
+        "exp": now + 3600,
+        "auth_time": now,
+    }
+    return jwt.encode(signer, payload).decode("utf-8")
+
+def timed(label: str, iterations: int, func):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    per_call = (time.perf_counter() - started) / iterations * 1e6
+    print(f"{label:<45} {per_call:10.1f} us/request")
+    return per_call
+
+def main(iterations: int):
+    signer, certs = make_signing_material()
+
+    cert_cache = GoogleCertCache()
+    cert_cache._certs = certs
+    cert_cache._expires_at = time.time() + 3600
+    token_cache = TokenVerificationCache(cert_cache)
+    revocation_cache = RevocationCache(lambda uid: (0.0, False))
+    token = make_token(signer, "bench-user")
+
+    def uncached():
+        token_cache.clear()
+        token_cache.verify(token, PROJECT_ID)
+
+    def cached():
+        token_cache.verify(token, PROJECT_ID)
+
+    def cached_with_revocation():
+        decoded = token_cache.verify(token, PROJECT_ID)
+        revocation_cache.is_revoked(decoded)
+
+    baseline = timed("signature verification (no cache)", iterations, uncached)
+    hit = timed("token cache hit", iterations, cached)
+    timed("token cache hit + cached revocation check", iterations, cached_with_revocation)
+    print(f"speedup on cache hit: {baseline / hit:.0f}x")
+    print(f"token cache: {token_cache.get_stats()}")
+    print(f"revocation cache: {revocation_cache.get_stats()}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=2000)
+    main(parser.parse_args().iterations)
@@ -0,0 +1,108 @@
+"""
+Mengukur biaya cold start: waktu import `main` (dengan `-X importtime`) dan
+waktu sampai request pertama dilayani, masing-masing di proses Python baru.
+Gagal (exit code 1) jika median melewati budget atau modul berat ikut dimuat
+saat import, sehingga regresi time-to-first-request langsung terlihat.
+
+Jalankan dari root repository:
+    python -m benchmarks.cold_start --runs 5 --budget-ms 1500
+"""
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+# Modul yang seharusnya baru dimuat saat dipakai atau oleh warm-up di background
+DEFERRED_MODULES = [
+    "tensorflow",
+    "vertexai",
+    "google.cloud.storage",
+    "google.cloud.secretmanager",
+    "google.cloud.firestore",
+    "pandas",
+    "sklearn",
+]
+
+FIRST_REQUEST_SCRIPT = """
+import time
+started = time.perf_counter()
+import main
+from fastapi.testclient import TestClient
+response = TestClient(main.app).get("/openapi.json")
+assert response.status_code == 200, response.status_code
+print(time.perf_counter() - started)
+"""
+
+def parse_importtime(stderr: str) -> tuple:
+    """
+    Returns ({module: cumulative microseconds}, {direct import of main: cumulative
+    microseconds}) from `-X importtime` output. Nested imports are printed
+    before their parent, indented by two spaces per level.
+    """
+    modules = {}
+    direct = {}
+    pending = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, raw_name = line[len("import time:"):].split("|")
+        name = raw_name.strip()
+        depth = (len(raw_name) - len(raw_name.lstrip()) - 1) // 2
+        modules[name] = int(cumulative)
+        if depth == 1:
+            pending[name] = int(cumulative)
+        elif depth == 0:
+            if name == "main":
+                direct = pending
+            pending = {}
+    return modules, direct
+
+def measure_import() -> tuple:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        capture_output=True, text=True, check=True,
+    )
+    return parse_importtime(result.stderr)
+
+def measure_first_request() -> float:
+    result = subprocess.run([sys.executable, "-c", FIRST_REQUEST_SCRIPT], capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+def main(runs: int, budget_ms: float, top: int) -> int:
+    import_times = []
+    first_request_times = []
+    modules, direct = {}, {}
+    for _ in range(runs):
+        modules, direct = measure_import()
+        import_times.append(modules["main"] / 1000)
+        first_request_times.append(measure_first_request() * 1000)
+
+    import_ms = statistics.median(import_times)
+    first_request_ms = statistics.median(first_request_times)
+    print(f"import main        median {import_ms:8.1f} ms  (min {min(import_times):.1f}, max {max(import_times):.1f})")
+    print(f"first request      median {first_request_ms:8.1f} ms  (min {min(first_request_times):.1f}, max {max(first_request_times):.1f})")
+
+    print("\nSlowest direct imports of main (last run):")
+    for name, us in sorted(direct.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    failed = False
+    loaded = [name for name in DEFERRED_MODULES if name in modules]
+    if loaded:
+        print(f"\nFAIL: heavy modules imported by main: {', '.join(loaded)}")
+        failed = True
+    if first_request_ms > budget_ms:
+        print(f"\nFAIL: first request took {first_request_ms:.1f} ms, budget is {budget_ms:.0f} ms")
+        failed = True
+    if not failed:
+        print(f"\nOK: within the {budget_ms:.0f} ms budget")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1500)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+    sys.exit(main(args.runs, args.budget_ms, args.top))
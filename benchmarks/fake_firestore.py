@@ -0,0 +1,142 @@
+"""
+In-memory pengganti Firestore `AsyncClient` untuk benchmark lokal. Hanya
+mendukung operasi yang dipakai repository (get, get_all, query where ==/in,
+WriteBatch set/create, set dengan merge dan ArrayUnion) dan menambahkan latensi per RPC yang bisa diatur.
+"""
+import asyncio
+import secrets
+import string
+import itertools
+from datetime import datetime, timezone, timedelta
+from google.cloud.firestore_v1.transforms import ArrayUnion
+
+_AUTO_ID_CHARS = string.ascii_letters + string.digits
+_clock = itertools.count()
+
+def _now():
+    # Waktu yang selalu naik agar update_time bisa dibandingkan
+    return datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(microseconds=next(_clock))
+
+class FakeSnapshot:
+    def __init__(self, reference, data, update_time):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+        self.exists = data is not None
+        self.update_time = update_time
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+class FakeDocumentReference:
+    def __init__(self, client, collection: str, document_id: str):
+        self._client = client
+        self.collection = collection
+        self.id = document_id
+
+    def _snapshot(self):
+        data, update_time = self._client.store.get(self.collection, {}).get(self.id, (None, None))
+        return FakeSnapshot(self, data, update_time)
+
+    async def get(self):
+        await self._client.rpc()
+        return self._snapshot()
+
+    async def set(self, data: dict):
+        await self._client.rpc()
+        self._client.put(self.collection, self.id, data)
+
+class FakeQuery:
+    def __init__(self, client, collection: str, field: str, op: str, value):
+        self._client = client
+        self._collection = collection
+        self._field = field
+        self._op = op
+        self._value = value
+
+    def _matches(self, data: dict) -> bool:
+        if self._op == "==":
+            return data.get(self._field) == self._value
+        if self._op == "in":
+            return data.get(self._field) in self._value
+        raise ValueError(f"Unsupported operator: {self._op}")
+
+    async def stream(self):
+        await self._client.rpc()
+        for document_id, (data, update_time) in list(self._client.store.get(self._collection, {}).items()):
+            if self._matches(data):
+                yield FakeSnapshot(FakeDocumentReference(self._client, self._collection, document_id), data, update_time)
+
+class FakeCollection:
+    def __init__(self, client, name: str):
+        self._client = client
+        self.name = name
+
+    def document(self, document_id: str = None):
+        document_id = document_id or "".join(secrets.choice(_AUTO_ID_CHARS) for _ in range(20))
+        return FakeDocumentReference(self._client, self.name, document_id)
+
+    def where(self, field: str, op: str, value):
+        return FakeQuery(self._client, self.name, field, op, value)
+
+class FakeWriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def set(self, reference, data: dict, merge: bool = False):
+        self._writes.append(("merge" if merge else "set", reference, data))
+
+    def create(self, reference, data: dict):
+        self._writes.append(("create", reference, data))
+
+    @staticmethod
+    def _merged(existing: dict, data: dict) -> dict:
+        merged = dict(existing or {})
+        for field, value in data.items():
+            if isinstance(value, ArrayUnion):
+                current = list(merged.get(field, []))
+                merged[field] = current + [item for item in value.values if item not in current]
+            else:
+                merged[field] = value
+        return merged
+
+    async def commit(self):
+        await self._client.rpc()
+        for kind, reference, _ in self._writes:
+            if kind == "create" and reference._snapshot().exists:
+                raise RuntimeError(f"Document {reference.collection}/{reference.id} already exists")
+        for kind, reference, data in self._writes:
+            if kind == "merge":
+                data = self._merged(reference._snapshot().to_dict(), data)
+            self._client.put(reference.collection, reference.id, data)
+        self._client.commits += 1
+
+class FakeAsyncFirestore:
+    """
+    Dict-backed async client; every RPC waits `latency` seconds.
+    """
+
+    def __init__(self, latency: float = 0.02):
+        self.latency = latency
+        self.store = {}
+        self.rpcs = 0
+        self.commits = 0
+
+    async def rpc(self):
+        self.rpcs += 1
+        await asyncio.sleep(self.latency)
+
+    def put(self, collection: str, document_id: str, data: dict):
+        self.store.setdefault(collection, {})[document_id] = (dict(data), _now())
+
+    def collection(self, name: str):
+        return FakeCollection(self, name)
+
+    def batch(self):
+        return FakeWriteBatch(self)
+
+    async def get_all(self, references):
+        await self.rpc()
+        for reference in references:
+            yield reference._snapshot()
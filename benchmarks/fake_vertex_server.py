@@ -0,0 +1,98 @@
+"""
+Server generasi palsu pengganti Vertex AI untuk pengujian lokal. Latensi dan
+tingkat error bisa diatur per region. Arahkan aplikasi ke server ini dengan
+VERTEX_FAKE_URL=http://127.0.0.1:8090.
+
+Jalankan dari root repository:
+    python -m benchmarks.fake_vertex_server --latency asia-southeast1=2.0 --latency us-central1=0.5 --error-rate asia-southeast1=0.1
+"""
+import json
+import random
+import asyncio
+import argparse
+import uvicorn
+from fastapi import FastAPI, Body, HTTPException
+from fastapi.responses import StreamingResponse
+
+# Respons contoh dengan format yang sama seperti keluaran Gemini
+SAMPLE_MEAL_PLANS = [
+    {
+        "mealPlan": [
+            {"meal": "Breakfast", "dishName": "Nasi Uduk dengan Telur Dadar", "ingredients": ["1 piring nasi uduk", "1 butir telur"], "calories": "~450 kalori"},
+            {"meal": "Lunch", "dishName": "Sayur Asem dengan Ikan Bandeng", "ingredients": ["1 mangkuk sayur asem", "1 potong ikan bandeng"], "calories": "~600 kalori"},
+            {"meal": "Dinner", "dishName": "Tumis Kangkung dan Tempe Bacem", "ingredients": ["1 piring kangkung", "2 potong tempe"], "calories": "~500 kalori"},
+        ]
+    }
+] * 3
+SAMPLE_RESPONSE = "```json\n" + json.dumps(SAMPLE_MEAL_PLANS, indent=2, ensure_ascii=False) + "\n```"
+# Respons JSON mode (response_schema diisi): JSON tanpa fence
+SAMPLE_JSON_RESPONSE = json.dumps(SAMPLE_MEAL_PLANS, ensure_ascii=False)
+
+def estimate_tokens(text: str) -> int:
+    # Perkiraan kasar tokenizer Gemini: sekitar 4 karakter per token
+    return -(-len(text or "") // 4)
+
+def create_fake_vertex_app(latencies: dict = None, error_rates: dict = None, default_latency: float = 1.0, chunks: int = 20, input_latency: float = 0.0) -> FastAPI:
+    """
+    Builds the fake generation app. `latencies` and `error_rates` are keyed by region;
+    `input_latency` adds seconds per 1000 input tokens (prompt plus system instruction).
+    """
+    latencies = latencies or {}
+    error_rates = error_rates or {}
+    app = FastAPI()
+
+    def check_failure(region: str):
+        if random.random() < error_rates.get(region, 0.0):
+            raise HTTPException(status_code=503, detail=f"Simulated failure in {region}")
+
+    def prefill_seconds(payload: dict) -> float:
+        tokens = estimate_tokens(payload.get("prompt")) + estimate_tokens(payload.get("system_instruction"))
+        return tokens / 1000 * input_latency
+
+    @app.post("/generate")
+    async def generate(payload: dict = Body(...)):
+        region = payload.get("region", "")
+        await asyncio.sleep(prefill_seconds(payload) + latencies.get(region, default_latency))
+        check_failure(region)
+        return {"text": SAMPLE_JSON_RESPONSE if payload.get("response_schema") else SAMPLE_RESPONSE}
+
+    @app.post("/stream")
+    async def stream(payload: dict = Body(...)):
+        region = payload.get("region", "")
+        check_failure(region)
+        delay = latencies.get(region, default_latency) / chunks
+        text = SAMPLE_JSON_RESPONSE if payload.get("response_schema") else SAMPLE_RESPONSE
+        size = -(-len(text) // chunks)
+        prefill = prefill_seconds(payload)
+
+        async def body():
+            await asyncio.sleep(prefill)
+            for start in range(0, len(text), size):
+                await asyncio.sleep(delay)
+                yield text[start:start + size]
+
+        return StreamingResponse(body(), media_type="text/plain")
+
+    return app
+
+def parse_region_values(values: list) -> dict:
+    parsed = {}
+    for value in values or []:
+        region, number = value.split("=", 1)
+        parsed[region.strip()] = float(number)
+    return parsed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", action="append", help="region=seconds")
+    parser.add_argument("--error-rate", action="append", help="region=probability")
+    parser.add_argument("--default-latency", type=float, default=1.0)
+    parser.add_argument("--chunks", type=int, default=20)
+    parser.add_argument("--input-latency", type=float, default=0.0, help="seconds per 1000 input tokens")
+    args = parser.parse_args()
+
+    app = create_fake_vertex_app(
+        parse_region_values(args.latency), parse_region_values(args.error_rate), args.default_latency, args.chunks, args.input_latency
+    )
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
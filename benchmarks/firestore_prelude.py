@@ -0,0 +1,70 @@
+"""
+Mengukur "prelude" /mealPlan (membaca healthData dan userPrediction sebelum
+generate) terhadap Firestore palsu di memori dengan latensi per RPC:
+pembacaan berurutan seperti sebelumnya dibandingkan dengan get_user_data
+yang membaca kedua dokumen secara bersamaan lewat repository async.
+
+Jalankan dari root repository:
+    python -m benchmarks.firestore_prelude --latency 0.02 --requests 200
+"""
+import time
+import asyncio
+import argparse
+import statistics
+from benchmarks.fake_firestore import FakeAsyncFirestore
+from health.firestore_repository import firestore_repository
+from health.health_data_cache import health_data_cache
+from health.text_generation_service import get_user_data
+from services.firestore_writer import FirestoreWriter
+
+USERS = 50
+
+def seed(fake: FakeAsyncFirestore):
+    for index in range(USERS):
+        uid = f"user-{index}"
+        fake.put("healthDataCurrent", uid, {
+            "uid": uid, "age": 30, "gender": 0, "height_cm": 170.0, "weight_kg": 65.0, "food_allergies": "udang",
+        })
+        fake.put("userPrediction", uid, {"weight_category": "Ideal", "predicted_bmr": 1650.0})
+
+async def sequential_prelude(uid: str):
+    # Bentuk lama: healthData lalu userPrediction, satu per satu
+    health_data = await firestore_repository.get_current_health_data(uid)
+    user_prediction = await firestore_repository.get_user_prediction(uid)
+    return health_data, user_prediction
+
+async def concurrent_prelude(uid: str):
+    return await get_user_data(uid)
+
+async def measure(label: str, prelude, requests: int, fake: FakeAsyncFirestore, clear_cache: bool):
+    latencies = []
+    rpcs_before = fake.rpcs
+    for index in range(requests):
+        if clear_cache:
+            health_data_cache.invalidate(f"user-{index % USERS}")
+        started = time.perf_counter()
+        await prelude(f"user-{index % USERS}")
+        latencies.append((time.perf_counter() - started) * 1000)
+    print(
+        f"{label:<34} p50 {statistics.median(latencies):6.1f} ms  "
+        f"mean {statistics.mean(latencies):6.1f} ms  rpcs/request {(fake.rpcs - rpcs_before) / requests:.1f}"
+    )
+    return statistics.median(latencies)
+
+async def main(latency: float, requests: int):
+    fake = FakeAsyncFirestore(latency)
+    seed(fake)
+    firestore_repository.client_factory = lambda: fake
+    firestore_repository.writer = FirestoreWriter(client_factory=lambda: fake)
+
+    before = await measure("sequential reads (before)", sequential_prelude, requests, fake, clear_cache=True)
+    after = await measure("get_user_data, concurrent reads", concurrent_prelude, requests, fake, clear_cache=True)
+    await measure("get_user_data, health data cached", concurrent_prelude, requests, fake, clear_cache=False)
+    print(f"\nPrelude p50 {before:.1f} ms -> {after:.1f} ms ({after / before:.0%} of before)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per Firestore RPC")
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.latency, args.requests))
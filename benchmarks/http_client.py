@@ -0,0 +1,138 @@
+"""
+Membandingkan client httpx baru per request (perilaku lama) dengan client bersama
+yang memakai keep-alive, untuk panggilan gaya /login dan /refresh ke server stub lokal
+dengan TLS. Melaporkan p50/p99 per skenario di bawah concurrency.
+
+Jalankan dari root repository:
+    python -m benchmarks.http_client --requests 500 --concurrency 20
+"""
+import os
+import time
+import asyncio
+import argparse
+import datetime
+import tempfile
+import statistics
+import multiprocessing
+import uvicorn
+import httpx
+from fastapi import FastAPI, Body
+from cryptography import x509
+from cryptography.x509.oid import NameOID
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from services.http_client import create_http_client, post_with_retry
+
+stub_app = FastAPI()
+
+@stub_app.post("/v1/accounts:signInWithPassword")
+async def stub_login(payload: dict = Body(...)):
+    return {"idToken": "stub-id-token", "refreshToken": "stub-refresh-token", "expiresIn": "3600"}
+
+@stub_app.post("/v1/token")
+async def stub_refresh(payload: dict = Body(...)):
+    return {"id_token": "stub-id-token", "refresh_token": "stub-refresh-token", "expires_in": "3600"}
+
+def write_self_signed_cert(directory: str):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name).issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.DNSName("localhost")]), critical=False)
+        .sign(key, hashes.SHA256())
+    )
+    cert_path = os.path.join(directory, "cert.pem")
+    key_path = os.path.join(directory, "key.pem")
+    with open(cert_path, "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as f:
+        f.write(key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ))
+    return cert_path, key_path
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+async def run_scenario(label: str, send, requests: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            response = await send()
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(requests)])
+    elapsed = time.perf_counter() - started
+    print(
+        f"{label:<32} p50 {percentile(latencies, 50):7.2f} ms  p99 {percentile(latencies, 99):7.2f} ms  "
+        f"mean {statistics.mean(latencies):7.2f} ms  {requests / elapsed:8.1f} req/s"
+    )
+
+def serve_stub(port: int, cert_path: str, key_path: str):
+    uvicorn.run(
+        stub_app, host="127.0.0.1", port=port, log_level="warning",
+        ssl_certfile=cert_path, ssl_keyfile=key_path,
+    )
+
+async def wait_for_server(base_url: str, cert_path: str):
+    async with httpx.AsyncClient(verify=cert_path) as client:
+        for _ in range(100):
+            try:
+                await client.post(f"{base_url}/v1/token", json={})
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError("Stub server did not start")
+
+async def main(requests: int, concurrency: int, port: int):
+    with tempfile.TemporaryDirectory() as directory:
+        cert_path, key_path = write_self_signed_cert(directory)
+        # Server stub di proses terpisah agar tidak berbagi event loop dengan client
+        server = multiprocessing.Process(target=serve_stub, args=(port, cert_path, key_path), daemon=True)
+        server.start()
+
+        base_url = f"https://localhost:{port}"
+        await wait_for_server(base_url, cert_path)
+        endpoints = {
+            "/login": (f"{base_url}/v1/accounts:signInWithPassword", {"email": "a@b.c", "password": "x", "returnSecureToken": True}),
+            "/refresh": (f"{base_url}/v1/token", {"grant_type": "refresh_token", "refresh_token": "stub"}),
+        }
+
+        shared_client = create_http_client(verify=cert_path)
+        try:
+            for name, (url, payload) in endpoints.items():
+                async def fresh_client():
+                    async with httpx.AsyncClient(verify=cert_path) as client:
+                        return await client.post(url, json=payload)
+
+                async def pooled_client():
+                    return await post_with_retry(url, client=shared_client, json=payload)
+
+                await run_scenario(f"{name} new client per request", fresh_client, requests, concurrency)
+                # Client bersama hidup sepanjang umur aplikasi, jadi koneksinya dipanaskan dulu
+                await asyncio.gather(*[pooled_client() for _ in range(concurrency)])
+                await run_scenario(f"{name} shared keep-alive client", pooled_client, requests, concurrency)
+        finally:
+            await shared_client.aclose()
+            server.terminate()
+            server.join()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8443)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.port))
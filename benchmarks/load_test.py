@@ -0,0 +1,283 @@
+"""
+Load test offline untuk /login, /healthData, /healthData/history, /predict, /mealPlan dan /mealPlans. Aplikasi
+dijalankan di proses terpisah dengan pengganti lokal untuk layanan Google:
+
+- verifikasi token palsu (token berbentuk "loadtest-user-<n>", uid = token)
+- Firestore in-memory (benchmarks/fake_firestore.py) dengan latensi per RPC
+- storage palsu (benchmarks/model_provisioning.py): model di ./assets dipakai apa adanya
+- server stub untuk Vertex AI dan Identity Toolkit (benchmarks/fake_vertex_server.py)
+
+Setiap endpoint diuji di beberapa tingkat konkurensi; hasil (RPS, p50/p95/p99)
+disimpan sebagai JSON dan bisa dibandingkan dengan baseline.
+
+Jalankan dari root repository:
+    python -m benchmarks.load_test --concurrency 1,8,32 --requests 200 --output load_test.json
+    python -m benchmarks.load_test --baseline load_test.json --tolerance 0.15
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import platform
+import multiprocessing
+from datetime import datetime, timezone, timedelta
+import httpx
+import uvicorn
+
+ENDPOINTS = ("/login", "/healthData", "/healthData/history", "/predict", "/mealPlan", "/mealPlans")
+FAKE_API_KEY = "loadtest-api-key"
+TOKEN_PREFIX = "loadtest-user-"
+
+def serve_stub(port: int, vertex_latency: float, login_latency: float):
+    """
+    Stub server: endpoint generasi palsu Vertex AI plus signInWithPassword Identity Toolkit.
+    """
+    from fastapi import Body
+    from benchmarks.fake_vertex_server import create_fake_vertex_app
+
+    app = create_fake_vertex_app(default_latency=vertex_latency)
+
+    @app.post("/v1/accounts:signInWithPassword")
+    async def sign_in(payload: dict = Body(...)):
+        await asyncio.sleep(login_latency)
+        user = payload.get("email", "").split("@")[0]
+        return {"idToken": TOKEN_PREFIX + user, "refreshToken": "refresh-" + user, "expiresIn": "3600"}
+
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+def health_data_for(user: int) -> dict:
+    return {
+        "age": 20 + user % 50,
+        "gender": user % 2,
+        "height_cm": 150.0 + user % 40,
+        "weight_kg": 45.0 + user % 60,
+        "food_allergies": ["udang"] if user % 3 == 0 else None,
+    }
+
+def install_fakes(stub_url: str, firestore_latency: float, storage_latency: float, users: int):
+    """
+    Mengganti titik akses layanan Google di proses aplikasi. Harus dipanggil
+    setelah `main` di-import dan sebelum startup.
+    """
+    import main
+    from auth import auth_service
+    from services import gcs_service
+    from services.firestore_writer import firestore_writer
+    from services.metrics import span
+    from health.firestore_repository import (
+        firestore_repository, HEALTH_DATA_CURRENT_COLLECTION, USER_PREDICTION_COLLECTION, HEALTH_HISTORY_COLLECTION,
+        MEAL_PLAN_COLLECTION,
+    )
+    from benchmarks.fake_vertex_server import SAMPLE_MEAL_PLANS
+    from health.health_history import build_sample, bucket_month
+    from benchmarks.fake_firestore import FakeAsyncFirestore
+    from benchmarks.model_provisioning import FakeStorageClient
+
+    db = FakeAsyncFirestore(latency=firestore_latency)
+    for user in range(users):
+        uid = f"{TOKEN_PREFIX}{user}"
+        db.put(HEALTH_DATA_CURRENT_COLLECTION, uid, health_data_for(user))
+        db.put(USER_PREDICTION_COLLECTION, uid, {"weight_category": "Normal", "predicted_bmr": 1400.0 + user % 10 * 100})
+        # Riwayat harian 120 hari terakhir untuk /healthData/history
+        buckets = {}
+        for day in range(120):
+            moment = datetime.now(timezone.utc) - timedelta(days=day)
+            buckets.setdefault(bucket_month(moment), []).append(build_sample(health_data_for(user), moment, f"{uid}-{day}"))
+        for month, samples in buckets.items():
+            db.put(HEALTH_HISTORY_COLLECTION, f"{uid}_{month}", {"uid": uid, "month": month, "samples": samples})
+        # Meal plan tersimpan untuk /mealPlans
+        for index, meal_plan in enumerate(SAMPLE_MEAL_PLANS, 1):
+            db.put(MEAL_PLAN_COLLECTION, f"{uid}_mealPlan_{index}", {"mealPlan": meal_plan["mealPlan"], "timestamp": "2026-01-01T00:00:00"})
+    firestore_repository.client_factory = lambda: db
+    firestore_writer.client_factory = lambda: db
+
+    def fake_verify_id_token(id_token: str, check_revoked: bool = True):
+        with span("verify_id_token"):
+            if not id_token.startswith(TOKEN_PREFIX):
+                raise ValueError("Token verification failed: unknown load test token")
+            return {"uid": id_token}
+
+    main.verify_id_token = fake_verify_id_token
+    main.warm_up_firestore = lambda: None
+    auth_service.FIREBASE_LOGIN_URL = f"{stub_url}/v1/accounts:signInWithPassword"
+    auth_service.get_firebase_web_api_key = lambda: FAKE_API_KEY
+    gcs_service.get_storage_client = lambda: FakeStorageClient(gcs_service.MODEL_DIR, storage_latency)
+
+def serve_app(port: int, stub_url: str, options: dict):
+    # Konfigurasi dibaca saat import, jadi env diisi sebelum `main` di-import
+    os.environ["VERTEX_FAKE_URL"] = stub_url
+    os.environ["MODEL_BACKEND"] = options["model_backend"]
+    if not options["meal_plan_cache"]:
+        os.environ["MEAL_PLAN_CACHE_SIZE"] = "0"
+    if not options["admission_control"]:
+        os.environ["ADMISSION_CONTROL_ENABLED"] = "false"
+    os.environ.pop("GOOGLE_CLOUD_PROJECT", None)
+
+    import main
+    install_fakes(stub_url, options["firestore_latency"], options["storage_latency"], options["users"])
+    logging.getLogger().setLevel(logging.WARNING)
+    if not options["verbose"]:
+        sys.stdout = open(os.devnull, "w")
+    uvicorn.run(main.app, host="127.0.0.1", port=port, log_level="warning")
+
+def wait_for(url: str, timeout: float = 120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=5)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not start within {timeout:.0f}s")
+
+def build_request(endpoint: str, n: int, users: int) -> dict:
+    user = n % users
+    headers = {"Authorization": f"Bearer {TOKEN_PREFIX}{user}"}
+    if endpoint == "/login":
+        return {"method": "POST", "url": endpoint, "json": {"email": f"{user}@loadtest.local", "password": "password"}}
+    if endpoint == "/healthData":
+        return {"method": "POST", "url": endpoint, "json": health_data_for(user), "headers": headers}
+    return {"method": "GET", "url": endpoint, "headers": headers}
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+async def run_level(client: httpx.AsyncClient, endpoint: str, concurrency: int, requests: int, users: int) -> dict:
+    latencies = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for n in counter:
+            started = time.perf_counter()
+            try:
+                response = await client.request(**build_request(endpoint, n, users))
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "errors": errors,
+        "seconds": elapsed,
+        "rps": requests / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+async def run_load(base_url: str, endpoints: list, levels: list, requests: int, users: int, warmup: int) -> dict:
+    results = {}
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as client:
+        for endpoint in endpoints:
+            if warmup:
+                await run_level(client, endpoint, 1, warmup, users)
+            results[endpoint] = {}
+            for concurrency in levels:
+                result = await run_level(client, endpoint, concurrency, requests, users)
+                results[endpoint][str(concurrency)] = result
+                print(
+                    f"{endpoint:<20} c={concurrency:<4} {result['rps']:8.1f} rps  p50 {result['p50_ms']:8.1f} ms  "
+                    f"p95 {result['p95_ms']:8.1f} ms  p99 {result['p99_ms']:8.1f} ms  errors {result['errors']}"
+                )
+    return results
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Returns regressions: RPS below, or p95/p99 above, the baseline by more than `tolerance`.
+    """
+    regressions = []
+    for endpoint, levels in results.items():
+        for concurrency, result in levels.items():
+            base = baseline.get("results", {}).get(endpoint, {}).get(concurrency)
+            if base is None:
+                continue
+            if result["rps"] < base["rps"] * (1 - tolerance):
+                regressions.append(f"{endpoint} c={concurrency}: rps {result['rps']:.1f} < baseline {base['rps']:.1f}")
+            for field in ("p95_ms", "p99_ms"):
+                if result[field] > base[field] * (1 + tolerance):
+                    regressions.append(f"{endpoint} c={concurrency}: {field} {result[field]:.1f} > baseline {base[field]:.1f}")
+            if result["errors"] > base["errors"]:
+                regressions.append(f"{endpoint} c={concurrency}: errors {result['errors']} > baseline {base['errors']}")
+    return regressions
+
+def main(args) -> int:
+    levels = [int(level) for level in args.concurrency.split(",")]
+    endpoints = [endpoint if endpoint.startswith("/") else "/" + endpoint for endpoint in args.endpoints.split(",")]
+    options = {
+        "model_backend": args.model_backend,
+        "meal_plan_cache": args.meal_plan_cache,
+        "admission_control": args.admission_control,
+        "firestore_latency": args.firestore_latency,
+        "storage_latency": args.storage_latency,
+        "users": args.users,
+        "verbose": args.verbose,
+    }
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    stub = multiprocessing.Process(target=serve_stub, args=(args.stub_port, args.vertex_latency, args.login_latency), daemon=True)
+    server = multiprocessing.Process(target=serve_app, args=(args.port, stub_url, options), daemon=True)
+    stub.start()
+    server.start()
+    try:
+        wait_for(f"{stub_url}/docs")
+        wait_for(f"{base_url}/metrics")
+        results = asyncio.run(run_load(base_url, endpoints, levels, args.requests, args.users, args.warmup))
+    finally:
+        server.terminate()
+        stub.terminate()
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "config": {**options, "vertex_latency": args.vertex_latency, "login_latency": args.login_latency,
+                   "requests": args.requests, "concurrency": levels},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    print(f"{len(regressions)} regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint and level")
+    parser.add_argument("--warmup", type=int, default=5, help="sequential requests per endpoint before measuring")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--vertex-latency", type=float, default=1.0)
+    parser.add_argument("--login-latency", type=float, default=0.05)
+    parser.add_argument("--firestore-latency", type=float, default=0.01)
+    parser.add_argument("--storage-latency", type=float, default=0.0)
+    parser.add_argument("--model-backend", default="numpy", choices=["numpy", "tensorflow"])
+    parser.add_argument("--meal-plan-cache", action="store_true", help="keep the meal plan cache enabled")
+    parser.add_argument("--admission-control", action="store_true", help="keep rate limits and load shedding enabled (rejections count as errors)")
+    parser.add_argument("--port", type=int, default=8095)
+    parser.add_argument("--stub-port", type=int, default=8096)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="compare against a previous --output file")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    parser.add_argument("--verbose", action="store_true", help="keep application logs")
+    sys.exit(main(parser.parse_args()))
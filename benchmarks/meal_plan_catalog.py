@@ -0,0 +1,111 @@
+"""
+Membangun katalog meal plan dengan generator lokal (tanpa Vertex AI), lalu
+mengukur retrieval untuk pengguna acak: latensi lookup, hit rate, selisih
+kalori, dan keamanan alergen (setiap plan yang dikembalikan tidak boleh
+menyebut alergi pengguna; jika ada, exit code 1).
+
+Jalankan dari root repository:
+    python -m benchmarks.meal_plan_catalog --users 20000
+    python -m scripts.build_meal_plan_catalog --generator benchmarks.meal_plan_catalog:fake_generate --output /tmp/catalog.json.gz
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from services.model_service import BMI_CATEGORIES
+from health.meal_plan_catalog import MealPlanCatalog, catalog_grid, build_catalog, save_catalog, mentioned_allergens
+from scripts.build_meal_plan_catalog import parse_calories, parse_allergy_sets, DEFAULT_ALLERGY_SETS
+
+# Hidangan contoh dan bahan yang mengandung alergen
+DISHES = [
+    ("Nasi Uduk dengan Telur Dadar", ["1 piring nasi uduk", "1 butir telur"]),
+    ("Bubur Ayam", ["1 mangkuk bubur", "50 gram ayam suwir"]),
+    ("Sayur Asem dengan Ikan Bandeng", ["1 mangkuk sayur asem", "1 potong ikan bandeng"]),
+    ("Gado-Gado", ["1 piring sayuran rebus", "3 sendok makan saus kacang"]),
+    ("Tumis Kangkung dan Tempe Bacem", ["1 piring kangkung", "2 potong tempe"]),
+    ("Udang Balado dengan Nasi", ["1 piring nasi", "100 gram udang"]),
+    ("Sop Ayam Sayur", ["1 mangkuk kuah kaldu", "75 gram ayam", "1 buah wortel"]),
+    ("Roti Bakar Susu", ["2 lembar roti", "1 gelas susu"]),
+    ("Pepes Tahu", ["2 potong tahu", "1 lembar daun pisang"]),
+    ("Nasi Merah dengan Pecel", ["1 piring nasi merah", "1 piring sayuran rebus", "2 sendok makan sambal pecel"]),
+]
+
+# Alergi acak pengguna: sebagian besar kombinasi umum, sebagian alergi langka (tidak ada di katalog)
+USER_ALLERGY_SETS = [[], [], [], ["udang"], ["kacang"], ["susu"], ["telur"], ["ikan"], ["udang", "kacang"], ["kedelai"]]
+
+PROMPT_PATTERN = re.compile(r"Total daily calorie intake: (\d+) cal\.\nWeight category: (.*)\.\nAllergies: (.*)\.")
+
+async def fake_generate(prompt: str) -> str:
+    """
+    Local generator for the catalog builder: three plans without any dish
+    that contains one of the prompt's allergies.
+    """
+    calories, _, allergies = PROMPT_PATTERN.search(prompt).groups()
+    excluded = [] if allergies == "None" else [allergy.strip() for allergy in allergies.split(",")]
+    rng = random.Random(prompt)
+    dishes = [dish for dish in DISHES if not mentioned_allergens([{"mealPlan": [{"dishName": dish[0], "ingredients": dish[1]}]}], excluded)]
+    plans = []
+    for _ in range(3):
+        meals = rng.sample(dishes, 3)
+        plans.append({"mealPlan": [
+            {"meal": meal, "dishName": name, "ingredients": ingredients, "calories": f"~{int(calories) // 3} kalori"}
+            for meal, (name, ingredients) in zip(("Breakfast", "Lunch", "Dinner"), meals)
+        ]})
+    return json.dumps(plans, ensure_ascii=False)
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+def main(args) -> int:
+    categories = [str(category) for category in BMI_CATEGORIES]
+    keys = catalog_grid(parse_calories(args.calories), categories, parse_allergy_sets(DEFAULT_ALLERGY_SETS))
+
+    started = time.perf_counter()
+    catalog = asyncio.run(build_catalog(keys, fake_generate, concurrency=16))
+    build_seconds = time.perf_counter() - started
+    path = os.path.join(tempfile.mkdtemp(), "meal_plan_catalog.json.gz")
+    save_catalog(catalog, path)
+
+    index = MealPlanCatalog(max_distance=args.max_distance, enabled=True)
+    started = time.perf_counter()
+    index.load(path)
+    load_ms = (time.perf_counter() - started) * 1000
+    print(
+        f"catalog: {len(catalog['calories'])} entries ({len(catalog['failures'])} failed), built in {build_seconds:.1f}s, "
+        f"{os.path.getsize(path) / 1024:.0f} KiB gzip, loaded in {load_ms:.0f} ms"
+    )
+
+    rng = random.Random(args.seed)
+    latencies = []
+    unsafe = 0
+    for _ in range(args.users):
+        calories = rng.uniform(800, 3600)
+        allergies = tuple(sorted(rng.choice(USER_ALLERGY_SETS)))
+        key = (int(round(calories / 100) * 100), rng.choice(categories), allergies)
+        lookup_started = time.perf_counter()
+        meal_plans = index.find(key, calories)
+        latencies.append(time.perf_counter() - lookup_started)
+        if meal_plans is not None and mentioned_allergens(meal_plans, allergies):
+            unsafe += 1
+
+    stats = index.get_stats()
+    print(
+        f"{args.users} users: hit rate {stats['hit_ratio']:.0%}, mean distance {stats['mean_distance_kcal']:.0f} kcal, "
+        f"lookup p50 {percentile(latencies, 50) * 1e6:.1f} µs, p99 {percentile(latencies, 99) * 1e6:.1f} µs, "
+        f"unsafe plans {unsafe}"
+    )
+    return 1 if unsafe else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calories", default="1000:3200:100", help="catalog grid, start:stop:step in kcal")
+    parser.add_argument("--max-distance", type=float, default=150.0)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=7)
+    sys.exit(main(parser.parse_args()))
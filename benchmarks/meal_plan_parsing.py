@@ -0,0 +1,87 @@
+"""
+Menjalankan parser meal plan terhadap korpus respons model
+(benchmarks/data/meal_plan_responses.json): setiap respons harus berakhir
+sesuai `expect` (parsed, repaired atau failed) dengan perbaikan yang tercatat.
+Menampilkan tingkat repair dan kegagalan, lalu membandingkan waktu parse
+dengan parser lama (split fence + json.loads tanpa validasi).
+
+Jalankan dari root repository:
+    python -m benchmarks.meal_plan_parsing --iterations 2000
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from health.meal_plan_parser import MealPlanParser, MealPlanParseError
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "data", "meal_plan_responses.json")
+
+def legacy_parse(raw_response: str):
+    if "```json" not in raw_response:
+        raise ValueError("No JSON content found in the response.")
+    json_part = raw_response.split("```json")[1].strip()
+    if "```" in json_part:
+        json_part = json_part.split("```")[0].strip()
+    return json.loads(json_part)
+
+def outcome(parser: MealPlanParser, response: str) -> tuple:
+    before = dict(parser.repairs), parser.repaired
+    try:
+        parser.parse(response)
+    except MealPlanParseError:
+        return "failed", []
+    if parser.repaired == before[1]:
+        return "parsed", []
+    return "repaired", sorted(name for name, count in parser.repairs.items() if count > before[0].get(name, 0))
+
+def legacy_outcome(response: str) -> str:
+    try:
+        legacy_parse(response)
+        return "parsed"
+    except ValueError:
+        return "failed"
+
+def time_per_call(func, response: str, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func(response)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+def main(iterations: int) -> int:
+    with open(CORPUS_PATH) as f:
+        corpus = json.load(f)
+
+    parser = MealPlanParser()
+    mismatches = 0
+    legacy_failures = 0
+    print(f"{'case':<24} {'expected':<9} {'result':<9} {'legacy':<7} repairs")
+    for case in corpus:
+        result, repairs = outcome(parser, case["response"])
+        legacy = legacy_outcome(case["response"])
+        legacy_failures += legacy == "failed"
+        ok = result == case["expect"] and repairs == sorted(case["repairs"])
+        mismatches += not ok
+        print(f"{case['name']:<24} {case['expect']:<9} {result:<9} {legacy:<7} {', '.join(repairs)}{'' if ok else '  <-- MISMATCH'}")
+
+    stats = parser.get_stats()
+    print(
+        f"\nrepair rate {stats['repair_rate']:.0%}, failure rate {stats['failure_rate']:.0%} "
+        f"(legacy parser failed {legacy_failures}/{len(corpus)})"
+    )
+
+    cases = {case["name"]: case["response"] for case in corpus}
+    fenced = cases["fenced_json"]
+    print(f"legacy parser, fenced:        {time_per_call(legacy_parse, fenced, iterations):7.1f} µs")
+    print(f"validated parser, fenced:     {time_per_call(parser.parse, fenced, iterations):7.1f} µs")
+    print(f"validated parser, JSON mode:  {time_per_call(parser.parse, cases['json_mode'], iterations):7.1f} µs")
+
+    if mismatches:
+        print(f"{mismatches} responses did not match their expected outcome")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    sys.exit(main(parser.parse_args().iterations))
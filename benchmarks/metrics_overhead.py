@@ -0,0 +1,37 @@
+"""
+Mengukur overhead satu span (`services.metrics.span`) dibandingkan blok kosong.
+Dengan METRICS_OTEL_ENABLED=true ikut mengukur biaya span OpenTelemetry.
+
+Jalankan dari root repository:
+    python -m benchmarks.metrics_overhead --iterations 200000
+"""
+import time
+import argparse
+from services.metrics import span, current_endpoint, METRICS_OTEL_ENABLED
+
+def empty_loop(iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        pass
+    return time.perf_counter() - started
+
+def span_loop(iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        with span("benchmark"):
+            pass
+    return time.perf_counter() - started
+
+def main(iterations: int, repeat: int):
+    current_endpoint.set("/benchmark")
+    baseline = min(empty_loop(iterations) for _ in range(repeat))
+    with_span = min(span_loop(iterations) for _ in range(repeat))
+    overhead_us = (with_span - baseline) / iterations * 1e6
+    print(f"span overhead {overhead_us:.2f} us per span (OpenTelemetry {'on' if METRICS_OTEL_ENABLED else 'off'})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.iterations, args.repeat)
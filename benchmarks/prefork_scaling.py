@@ -0,0 +1,187 @@
+"""
+Mengukur mode pre-fork (gunicorn.conf.py): throughput untuk beberapa jumlah
+worker, dan memori setiap proses (RSS, PSS, USS dari /proc/<pid>/smaps_rollup).
+Biaya worker tambahan = kenaikan total PSS dibanding satu worker. Dengan
+--no-preload setiap worker memuat aplikasi dan model sendiri, sebagai pembanding.
+
+Layanan Google diganti seperti pada benchmarks/load_test.py. Throughput hanya
+naik selama masih ada core kosong; jalankan di mesin dengan beberapa CPU.
+
+Jalankan dari root repository (Linux):
+    python -m benchmarks.prefork_scaling --workers 1,2,4 --endpoints /predict,/healthData
+    python -m benchmarks.prefork_scaling --workers 1,2,4 --model-backend tensorflow
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import multiprocessing
+import httpx
+from benchmarks.load_test import serve_stub, install_fakes, wait_for, run_level
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "gunicorn.conf.py")
+
+def serve_prefork(port: int, stub_url: str, workers: int, options: dict):
+    from gunicorn.app.base import Application
+
+    # Konfigurasi dibaca saat import, jadi env diisi sebelum gunicorn.conf.py dan `main`
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    os.environ["VERTEX_FAKE_URL"] = stub_url
+    os.environ["MODEL_BACKEND"] = options["model_backend"]
+    os.environ["MEAL_PLAN_CACHE_SIZE"] = "0"
+    os.environ["ADMISSION_CONTROL_ENABLED"] = "false"
+    os.environ["LOG_LEVEL"] = "WARNING"
+    os.environ.pop("GOOGLE_CLOUD_PROJECT", None)
+
+    class BenchmarkApplication(Application):
+        def init(self, parser, opts, args):
+            return {}
+
+        def load_config(self):
+            self.load_config_from_file(CONFIG_PATH)
+            self.cfg.set("bind", f"127.0.0.1:{port}")
+            self.cfg.set("preload_app", options["preload"])
+            self.cfg.set("loglevel", "warning")
+            if not options["preload"]:
+                self.cfg.set("on_starting", lambda server: None)
+
+        def load(self):
+            import main
+            install_fakes(stub_url, options["firestore_latency"], 0.0, options["users"])
+            logging.getLogger().setLevel(logging.WARNING)
+            return main.app
+
+    if not options["verbose"]:
+        sys.stdout = open(os.devnull, "w")
+    BenchmarkApplication().run()
+
+def child_pids(pid: int) -> list:
+    children = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as f:
+            children.extend(int(child) for child in f.read().split())
+    return children
+
+def memory_of(pid: int) -> dict:
+    """
+    RSS, PSS (shared pages split between the processes sharing them) and USS
+    (pages only this process uses), in MB.
+    """
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "rss_mb": fields["Rss"],
+        "pss_mb": fields["Pss"],
+        "uss_mb": fields["Private_Clean"] + fields["Private_Dirty"],
+    }
+
+def wait_for_workers(master: int, workers: int, base_url: str, timeout: float = 300):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if len(child_pids(master)) >= workers:
+            wait_for(f"{base_url}/metrics", timeout=deadline - time.monotonic())
+            return
+        time.sleep(0.2)
+    raise RuntimeError(f"{workers} workers did not start within {timeout:.0f}s")
+
+async def run_endpoints(base_url: str, endpoints: list, concurrency: int, requests: int, users: int) -> dict:
+    results = {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as client:
+        for endpoint in endpoints:
+            # Setiap worker menerima beberapa request sebelum pengukuran
+            await run_level(client, endpoint, concurrency, concurrency * 4, users)
+            results[endpoint] = await run_level(client, endpoint, concurrency, requests, users)
+    return results
+
+def measure(workers: int, args, options: dict) -> dict:
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = multiprocessing.Process(target=serve_prefork, args=(args.port, args.stub_url, workers, options), daemon=True)
+    started = time.perf_counter()
+    server.start()
+    try:
+        wait_for_workers(server.pid, workers, base_url)
+        ready = time.perf_counter() - started
+        results = asyncio.run(run_endpoints(base_url, args.endpoints, args.concurrency, args.requests, args.users))
+        master = memory_of(server.pid)
+        worker_memory = [memory_of(pid) for pid in child_pids(server.pid)]
+    finally:
+        server.terminate()
+        server.join(30)
+
+    total_pss = master["pss_mb"] + sum(memory["pss_mb"] for memory in worker_memory)
+    return {
+        "workers": workers,
+        "ready_seconds": ready,
+        "results": results,
+        "master": master,
+        "worker_memory": worker_memory,
+        "total_pss_mb": total_pss,
+    }
+
+def main(args) -> int:
+    args.endpoints = [endpoint if endpoint.startswith("/") else "/" + endpoint for endpoint in args.endpoints.split(",")]
+    args.stub_url = f"http://127.0.0.1:{args.stub_port}"
+    options = {
+        "model_backend": args.model_backend,
+        "preload": not args.no_preload,
+        "firestore_latency": args.firestore_latency,
+        "users": args.users,
+        "verbose": args.verbose,
+    }
+    levels = [int(level) for level in args.workers.split(",")]
+
+    stub = multiprocessing.Process(target=serve_stub, args=(args.stub_port, 0.0, 0.0), daemon=True)
+    stub.start()
+    runs = []
+    try:
+        wait_for(f"{args.stub_url}/docs")
+        for workers in levels:
+            runs.append(measure(workers, args, options))
+    finally:
+        stub.terminate()
+
+    base = runs[0]
+    print(f"\n{args.model_backend} backend, preload {'on' if options['preload'] else 'off'}, {os.cpu_count()} CPUs, concurrency {args.concurrency}")
+    header = "".join(f"{endpoint + ' rps':>18} {'speedup':>8}" for endpoint in args.endpoints)
+    print(f"{'workers':>7} {'ready s':>8}{header} {'master PSS':>11} {'worker USS':>11} {'total PSS':>10} {'per extra worker':>17}")
+    for run in runs:
+        columns = "".join(
+            f"{run['results'][endpoint]['rps']:18.1f} {run['results'][endpoint]['rps'] / base['results'][endpoint]['rps']:7.2f}x"
+            for endpoint in args.endpoints
+        )
+        worker_uss = sum(memory["uss_mb"] for memory in run["worker_memory"]) / max(len(run["worker_memory"]), 1)
+        extra = (run["total_pss_mb"] - base["total_pss_mb"]) / (run["workers"] - base["workers"]) if run is not base else 0.0
+        print(
+            f"{run['workers']:7d} {run['ready_seconds']:8.1f}{columns} {run['master']['pss_mb']:9.0f}MB "
+            f"{worker_uss:9.0f}MB {run['total_pss_mb']:8.0f}MB {extra:15.0f}MB"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"config": options, "runs": runs}, f, indent=2)
+        print(f"Results saved to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts; the first is the baseline")
+    parser.add_argument("--endpoints", default="/predict,/healthData")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=2000, help="requests per endpoint and worker count")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--firestore-latency", type=float, default=0.0)
+    parser.add_argument("--model-backend", default="numpy", choices=["numpy", "tensorflow"])
+    parser.add_argument("--no-preload", action="store_true", help="let every worker import the app and load the models itself")
+    parser.add_argument("--port", type=int, default=8097)
+    parser.add_argument("--stub-port", type=int, default=8098)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--verbose", action="store_true", help="keep application logs")
+    sys.exit(main(parser.parse_args()))
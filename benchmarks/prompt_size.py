@@ -0,0 +1,154 @@
+"""
+Membandingkan prompt meal plan lama (seluruh instruksi sebagai konten
+pengguna di setiap request) dengan system instruction statis plus payload
+per pengguna: jumlah token per request dan latensi generasi terhadap server
+generasi palsu yang menambahkan waktu prefill per 1000 token input. Skenario
+"context cache" mengirim payload saja, seperti saat system instruction sudah
+tersimpan di Vertex AI.
+
+Jumlah token diperkirakan (4 karakter per token); dengan --count-tokens dan
+GOOGLE_CLOUD_PROJECT dihitung oleh Vertex AI.
+
+Jalankan dari root repository:
+    python -m benchmarks.prompt_size --requests 20 --input-latency 0.2
+"""
+import time
+import asyncio
+import argparse
+import statistics
+import multiprocessing
+import uvicorn
+from benchmarks.fake_vertex_server import create_fake_vertex_app, estimate_tokens
+from benchmarks.vertex_client import wait_for_server
+from health.text_generation_service import generate_prompt, MEAL_PLAN_SYSTEM_INSTRUCTION
+from services.vertex_client import VertexClientManager, HttpGenerationBackend, VertexSDKBackend, VERTEX_REGIONS
+
+HEALTH_DATA = {"food_allergies": ["udang", "kacang"]}
+USER_PREDICTION = {"predicted_bmr": 1650, "weight_category": "Ideal"}
+
+def legacy_prompt(health_data: dict, user_prediction: dict) -> str:
+    """
+    The prompt as it was built before the system instruction existed.
+    """
+    total_calories = int(float(user_prediction.get("predicted_bmr", 2000)))
+    weight_category = str(user_prediction.get("weight_category", "Unknown")).strip()
+    dietary_restrictions = ", ".join(health_data.get("food_allergies") or ["None"])
+
+    prompt = f"""
+        You are a professional nutritionist specializing in personalized meal planning with a deep understanding 
+        of diverse dietary needs, cultural sensitivities, and local cuisines. You excel at creating balanced meal plans 
+        tailored to specific caloric and nutritional goals while considering individual preferences, dietary restrictions, 
+        and allergies. Your expertise in Indonesian cuisine ensures your recommendations are practical, affordable, and 
+        easily accessible. Your task is to generate 3 daily meal plan variations, each consisting of breakfast, lunch, 
+        and dinner. Also, you have to customized the meal based on user's weight category whether is in underweight, ideal,
+        overweight or obese to ensure that they have ideal daily nutrient intake.
+
+        Nutritional Goals:
+        - Total daily calorie intake: {total_calories} cal.
+        - User's weight category: {weight_category}.
+        - The calorie distribution among meals (breakfast, lunch, and dinner) should be dynamically determined.
+
+        Dietary Restrictions:
+        The user is allergic to {dietary_restrictions}, so avoid using this ingredient or any related items at any cost.
+        Ensure the names of dishes do not reference the user allergy or imply its exclusion (e.g., "Bubur Ayam (tanpa ayam)", "Bubur Manis dengan Pisang dan Kacang Hijau (tanpa kacang)", "Ayam Goreng (tanpa ayam) dengan Nasi Putih dan Sayur Tumis",
+        "Lontong Sayur Tanpa Telur dengan Ikan", "Mie Goreng Jawa (tanpa daging ayam)").
+        Similarly, for any other specified allergies, avoid dish names that reference excluded ingredients or imply their absence.
+
+        Focus on Indonesian Cuisine:
+        - Meals must primarily feature local, affordable, and readily available ingredients.
+        - Follow Indonesia's balanced nutrition principle (gizi seimbang) with a balance of carbohydrates, protein, vegetables, and fats.
+
+        Output Requirements:
+        - Use Bahasa Indonesia.
+        - For the "ingredients" use a specific measurements, for example: 1 table spoon of sugar, 2 tea spoon of water, 1 bowl of rice, 1 plate of oil, 3 cups of milk.
+        - For the "calories" use "~" symbol and use word "kalori", DO NOT USE the word "sekitar".
+        - Present the 3 daily meal plans in strict JSON format:
+        [
+          {{
+            "mealPlan": [
+              {{
+                "meal": "Breakfast",
+                "dishName": "Dish name",
+                "ingredients": ["Ingredient 1", "Ingredient 2"],
+                "calories": "Dynamic"
+              }},
+              {{
+                "meal": "Lunch",
+                "dishName": "Dish name",
+                "ingredients": ["Ingredient 1", "Ingredient 2"],
+                "calories": "Dynamic"
+              }},
+              {{
+                "meal": "Dinner",
+                "dishName": "Dish name",
+                "ingredients": ["Ingredient 1", "Ingredient 2"],
+                "calories": "Dynamic"
+              }}
+            ]
+          }},
+          {{"mealPlan": [...]}},
+          {{"mealPlan": [...]}},
+        ]
+
+        Ensure strict JSON formatting.
+        """
+    return prompt.strip()
+
+def serve_fake(port: int, latency: float, input_latency: float):
+    app = create_fake_vertex_app(default_latency=latency, input_latency=input_latency)
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+def scenarios() -> list:
+    """
+    (label, prompt, system instruction sent with the request).
+    """
+    return [
+        ("legacy prompt", legacy_prompt(HEALTH_DATA, USER_PREDICTION), None),
+        ("system instruction", generate_prompt(HEALTH_DATA, USER_PREDICTION), MEAL_PLAN_SYSTEM_INSTRUCTION),
+        ("context cache", generate_prompt(HEALTH_DATA, USER_PREDICTION), None),
+    ]
+
+def report_tokens(count_tokens: bool):
+    backend = VertexSDKBackend() if count_tokens else None
+    print(f"{'scenario':<20} {'chars':>7} {'input tokens':>13}")
+    for label, prompt, system_instruction in scenarios():
+        chars = len(prompt) + len(system_instruction or "")
+        if backend is not None:
+            tokens = backend.count_tokens(VERTEX_REGIONS[0], prompt, system_instruction)
+        else:
+            tokens = estimate_tokens(prompt) + estimate_tokens(system_instruction)
+        print(f"{label:<20} {chars:>7} {tokens:>13}")
+
+async def measure(manager: VertexClientManager, prompt: str, system_instruction: str, requests: int) -> list:
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        await manager.generate(prompt, system_instruction=system_instruction)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+async def main(requests: int, port: int, latency: float, input_latency: float):
+    server = multiprocessing.Process(target=serve_fake, args=(port, latency, input_latency), daemon=True)
+    server.start()
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_for_server(base_url)
+        manager = VertexClientManager(backend=HttpGenerationBackend(base_url), regions=["fake"], timeout=60)
+        for label, prompt, system_instruction in scenarios():
+            latencies = await measure(manager, prompt, system_instruction, requests)
+            print(f"{label:<20} mean {statistics.mean(latencies) * 1000:7.1f} ms  max {max(latencies) * 1000:7.1f} ms")
+    finally:
+        server.terminate()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8093)
+    parser.add_argument("--latency", type=float, default=0.05, help="generation time independent of the input")
+    parser.add_argument("--input-latency", type=float, default=0.2, help="seconds per 1000 input tokens")
+    parser.add_argument("--count-tokens", action="store_true", help="count tokens with Vertex AI instead of estimating")
+    args = parser.parse_args()
+
+    report_tokens(args.count_tokens)
+    print()
+    asyncio.run(main(args.requests, args.port, args.latency, args.input_latency))
@@ -0,0 +1,46 @@
+"""
+Membandingkan biaya respons GET /mealPlans untuk tiga meal plan tersimpan:
+serialisasi (json vs orjson), kompresi (gzip, brotli jika paket `brotli`
+terpasang) dan jalur 304 (If-None-Match cocok, tanpa body).
+
+Jalankan dari root repository:
+    python -m benchmarks.response_encoding --iterations 5000
+"""
+import sys
+import json
+import time
+import argparse
+import orjson
+from benchmarks.fake_vertex_server import SAMPLE_MEAL_PLANS
+from services.response_encoding import cached_json_response, encode_body, strong_etag, _get_brotli
+
+def time_per_call(func, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+def main(iterations: int) -> int:
+    payload = {
+        "mealPlans": [{"mealPlan": plan["mealPlan"]} for plan in SAMPLE_MEAL_PLANS],
+        "updatedAt": "2026-10-18T10:00:00",
+    }
+    etag = strong_etag("uid_mealPlan_1@2026-10-18T10:00:00")
+    body = orjson.dumps(payload)
+
+    print(f"json.dumps:                {time_per_call(lambda: json.dumps(payload).encode('utf-8'), iterations):7.1f} µs")
+    print(f"orjson.dumps:              {time_per_call(lambda: orjson.dumps(payload), iterations):7.1f} µs")
+    encodings = ["identity", "gzip"] + (["br"] if _get_brotli() else [])
+    for encoding in encodings:
+        size = len(encode_body(body, encoding))
+        print(f"{encoding + ' body':<26} {time_per_call(lambda: encode_body(body, encoding), iterations):7.1f} µs  {size:6d} bytes")
+    print(f"full 200 response (gzip):  {time_per_call(lambda: cached_json_response(payload, etag, None, 'gzip, br'), iterations):7.1f} µs")
+    print(f"304 (If-None-Match):       {time_per_call(lambda: cached_json_response(payload, etag, etag, 'gzip, br'), iterations):7.1f} µs")
+    if not _get_brotli():
+        print("brotli not installed: only gzip is offered")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5000)
+    sys.exit(main(parser.parse_args().iterations))
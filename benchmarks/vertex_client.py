@@ -0,0 +1,92 @@
+"""
+Menjalankan VertexClientManager terhadap server generasi palsu dengan dua region:
+region utama lambat dan kadang gagal, region kedua cepat. Membandingkan latensi
+tanpa hedging dan dengan hedging, serta menampilkan skor region.
+
+Jalankan dari root repository:
+    python -m benchmarks.vertex_client --requests 40 --concurrency 8
+"""
+import time
+import asyncio
+import argparse
+import multiprocessing
+import httpx
+import uvicorn
+from benchmarks.fake_vertex_server import create_fake_vertex_app
+from services.vertex_client import VertexClientManager, HttpGenerationBackend
+
+REGIONS = ["asia-southeast1", "us-central1"]
+
+def serve_fake(port: int, slow_latency: float, fast_latency: float, error_rate: float):
+    app = create_fake_vertex_app(
+        latencies={REGIONS[0]: slow_latency, REGIONS[1]: fast_latency},
+        error_rates={REGIONS[0]: error_rate},
+    )
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+def wait_for_server(base_url: str):
+    for _ in range(100):
+        try:
+            httpx.post(f"{base_url}/generate", json={"region": "warmup"}, timeout=10)
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise RuntimeError("Fake generation server did not start")
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+async def run_scenario(label: str, manager: VertexClientManager, requests: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    failures = 0
+
+    async def one():
+        nonlocal failures
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await manager.generate("prompt")
+                latencies.append(time.perf_counter() - started)
+            except RuntimeError:
+                failures += 1
+
+    await asyncio.gather(*[one() for _ in range(requests)])
+    stats = manager.get_stats()
+    print(
+        f"{label:<12} p50 {percentile(latencies, 50):6.2f} s  p99 {percentile(latencies, 99):6.2f} s  "
+        f"failures {failures}  hedges {stats['hedges']}  failovers {stats['failovers']}  ranking {stats['ranking']}"
+    )
+
+async def main(requests: int, concurrency: int, port: int, slow: float, fast: float, error_rate: float):
+    server = multiprocessing.Process(target=serve_fake, args=(port, slow, fast, error_rate), daemon=True)
+    server.start()
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_for_server(base_url)
+        backend = HttpGenerationBackend(base_url)
+        await run_scenario(
+            "no hedging",
+            VertexClientManager(backend=backend, regions=REGIONS, max_concurrency=concurrency, timeout=30, hedge_after=0),
+            requests, concurrency,
+        )
+        await run_scenario(
+            "hedging",
+            VertexClientManager(backend=backend, regions=REGIONS, max_concurrency=concurrency * 2, timeout=30, hedge_after=fast * 1.5),
+            requests, concurrency,
+        )
+    finally:
+        server.terminate()
+        server.join()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--slow-latency", type=float, default=2.0)
+    parser.add_argument("--fast-latency", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.2)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.port, args.slow_latency, args.fast_latency, args.error_rate))
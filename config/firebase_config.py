@@ -1,16 +1,56 @@
+import threading
 import firebase_admin
-from firebase_admin import credentials, firestore
 
-# Initialize Firebase Admin SDK
-if not firebase_admin._apps:
-    # Use Application Default Credentials for authentication
-    cred = credentials.ApplicationDefault()
-    firebase_admin.initialize_app(cred)
+# Firebase Admin SDK dan Firestore client dibuat saat pertama kali dipakai
+# (atau oleh warm-up di startup), bukan saat modul di-import
+_lock = threading.Lock()
+db = None
+async_db = None
 
-# Firestore client
-db = firestore.client()
+def initialize_firebase():
+    """
+    Initialize the Firebase Admin SDK with Application Default Credentials.
+    Safe to call more than once and from several threads.
+    """
+    if not firebase_admin._apps:
+        with _lock:
+            if not firebase_admin._apps:
+                from firebase_admin import credentials
+                cred = credentials.ApplicationDefault()
+                firebase_admin.initialize_app(cred)
 
 # Function to get Firestore client
 def get_firestore_client():
-    
-    return db
\ No newline at end of file
+    global db
+    if db is None:
+        initialize_firebase()
+        with _lock:
+            if db is None:
+                from firebase_admin import firestore
+                db = firestore.client()
+    return db
+
+def get_async_firestore_client():
+    """
+    Native async Firestore client (google-cloud-firestore `AsyncClient`) with
+    the same project and credentials as the Firebase Admin app. Create it
+    from inside the running event loop.
+    """
+    global async_db
+    if async_db is None:
+        initialize_firebase()
+        with _lock:
+            if async_db is None:
+                from google.cloud import firestore as cloud_firestore
+                app = firebase_admin.get_app()
+                async_db = cloud_firestore.AsyncClient(project=app.project_id, credentials=app.credential.get_credential())
+    return async_db
+
+def warm_up_firestore():
+    """
+    Initializes the Admin SDK and imports the Firestore library ahead of the
+    first request. Safe to run in a background thread: the async client
+    itself is created later inside the event loop.
+    """
+    initialize_firebase()
+    from google.cloud import firestore  # noqa: F401
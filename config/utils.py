@@ -1,14 +1,81 @@
 import os
-from google.cloud import secretmanager
+import time
+import logging
+import threading
+
+# Interval refresh secret di background (detik)
+SECRET_REFRESH_INTERVAL = float(os.getenv("SECRET_REFRESH_INTERVAL", "3600"))
 
 def get_secret(secret_name: str) -> str:
     """
     Mengambil secret dari Google Cloud Secret Manager.
     """
+    from google.cloud import secretmanager
+
     client = secretmanager.SecretManagerServiceClient()
     project_id = os.getenv("GOOGLE_CLOUD_PROJECT")
     if not project_id:
         raise RuntimeError("GOOGLE_CLOUD_PROJECT environment variable is not set")
     name = f"projects/{project_id}/secrets/{secret_name}/versions/latest"
     response = client.access_secret_version(name=name)
-    return response.payload.data.decode("utf-8").strip()
\ No newline at end of file
+    return response.payload.data.decode("utf-8").strip()
+
+class SecretCache:
+    """
+    Keeps Secret Manager values in memory. A secret is fetched on first use
+    (or by the background thread started at startup) and then refreshed every
+    `SECRET_REFRESH_INTERVAL` seconds; a failed refresh keeps the old value.
+    """
+
+    def __init__(self, fetch=get_secret, refresh_interval: float = SECRET_REFRESH_INTERVAL):
+        self.fetch = fetch
+        self.refresh_interval = refresh_interval
+        self._values = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self.fetch_count = 0
+
+    def refresh(self, secret_name: str) -> str:
+        value = self.fetch(secret_name)
+        with self._lock:
+            self._values[secret_name] = value
+            self.fetch_count += 1
+        return value
+
+    def get(self, secret_name: str) -> str:
+        value = self._values.get(secret_name)
+        if value is None:
+            return self.refresh(secret_name)
+        return value
+
+    def start_background_refresh(self, *secret_names: str):
+        """
+        Fetch the given secrets in a background thread and keep them fresh.
+        """
+        with self._lock:
+            for secret_name in secret_names:
+                self._values.setdefault(secret_name, None)
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._refresh_loop, name="secret-refresh", daemon=True)
+        self._thread.start()
+
+    def stop_background_refresh(self):
+        self._stop.set()
+        self._thread = None
+
+    def _refresh_loop(self):
+        while not self._stop.is_set():
+            delay = self.refresh_interval
+            for secret_name in list(self._values):
+                try:
+                    self.refresh(secret_name)
+                except Exception as e:
+                    logging.error(f"Failed to refresh secret {secret_name}: {e}")
+                    delay = min(delay, 30)
+            self._stop.wait(delay)
+
+# Instance global yang dipakai oleh layanan auth
+secret_cache = SecretCache()
@@ -0,0 +1,33 @@
+"""
+Konfigurasi gunicorn untuk mode pre-fork (opsional; container default
+menjalankan satu proses `uvicorn main:app`). Master memuat aplikasi sekali,
+lalu mem-fork worker uvicorn. Model hanya dibagi antar worker (copy-on-write)
+dengan backend NumPy, default di mode ini; dengan MODEL_BACKEND=tensorflow
+setiap worker memuat model sendiri. WEB_CONCURRENCY mengatur jumlah worker
+(default 1, "auto" mengikuti batas CPU dan memori container), lihat
+services/prefork_service.py dan README untuk state yang harus dibagi antar worker.
+
+    WEB_CONCURRENCY=auto gunicorn -c gunicorn.conf.py main:app
+"""
+import os
+from services.prefork_service import (
+    prefork_server, WORKER_MAX_REQUESTS, WORKER_MAX_REQUESTS_JITTER, WORKER_GRACEFUL_TIMEOUT
+)
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+worker_class = "uvicorn_worker.UvicornWorker"
+workers = prefork_server.configure()
+
+# Import `main` di master sebelum fork
+preload_app = True
+
+# Daur ulang worker secara bertahap: request yang sedang berjalan diselesaikan dulu
+max_requests = WORKER_MAX_REQUESTS
+max_requests_jitter = WORKER_MAX_REQUESTS_JITTER
+graceful_timeout = WORKER_GRACEFUL_TIMEOUT
+
+def on_starting(server):
+    prefork_server.preload()
+
+def post_fork(server, worker):
+    prefork_server.after_fork()
@@ -0,0 +1,227 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from config.firebase_config import get_async_firestore_client
+from services.firestore_writer import firestore_writer, WriteOp, FIRESTORE_WRITE_BEHIND
+from services.metrics import span
+from services.admission_control import firestore_breaker
+from health.health_history import build_sample, bucket_month
+
+# Riwayat disimpan di 'healthData' (ID acak per submit), data terbaru per
+# pengguna di 'healthDataCurrent' dengan UID sebagai ID dokumen, dan deret waktu
+# per pengguna di 'healthHistory' (satu dokumen per bulan, "<uid>_<YYYY-MM>")
+HEALTH_DATA_COLLECTION = "healthData"
+HEALTH_DATA_CURRENT_COLLECTION = "healthDataCurrent"
+HEALTH_HISTORY_COLLECTION = "healthHistory"
+USER_PREDICTION_COLLECTION = "userPrediction"
+MEAL_PLAN_COLLECTION = "mealPlans"
+# Job meal plan asinkron (POST /mealPlan/jobs), satu dokumen per jobId
+MEAL_PLAN_JOB_COLLECTION = "mealPlanJobs"
+CURRENT_METADATA_FIELDS = ("updatedAt", "sourceDocId")
+
+# Variasi meal plan per generasi, disimpan sebagai "<uid>_mealPlan_<1..n>"
+MEAL_PLAN_VARIATIONS = 3
+
+# Batas Firestore: maksimal 30 nilai untuk operator "in"; get_all dipecah per 100 dokumen
+FIRESTORE_IN_QUERY_LIMIT = 30
+FIRESTORE_GET_ALL_LIMIT = 100
+
+def build_current_document(data: dict, source_doc_id: str, updated_at) -> dict:
+    current = dict(data)
+    current["updatedAt"] = updated_at
+    current["sourceDocId"] = source_doc_id
+    return current
+
+def strip_current_metadata(current: dict) -> dict:
+    return {key: value for key, value in current.items() if key not in CURRENT_METADATA_FIELDS}
+
+def latest_history_documents(docs) -> dict:
+    """
+    Picks the most recently written 'healthData' document per uid, using the
+    Firestore update time because older documents carry no timestamp field.
+    Returns {uid: snapshot}.
+    """
+    latest = {}
+    for doc in docs:
+        uid = doc.to_dict().get("uid")
+        current = latest.get(uid)
+        if current is None or doc.update_time > current.update_time:
+            latest[uid] = doc
+    return latest
+
+class FirestoreRepository:
+    """
+    Async access to the 'healthData', 'userPrediction', 'mealPlans' and
+    'mealPlanJobs' collections on Firestore's native `AsyncClient`.
+    Independent reads run concurrently; writes go through the batching
+    Firestore writer.
+    """
+
+    def __init__(self, client_factory=get_async_firestore_client, writer=firestore_writer):
+        self.client_factory = client_factory
+        self.writer = writer
+
+    @property
+    def db(self):
+        return self.client_factory()
+
+    async def get_current_health_data(self, uid: str):
+        with span("firestore_read"), firestore_breaker.track():
+            doc = await self.db.collection(HEALTH_DATA_CURRENT_COLLECTION).document(uid).get()
+            if doc.exists:
+                return strip_current_metadata(doc.to_dict())
+            return (await self._backfill_current([uid])).get(uid)
+
+    async def get_current_health_data_many(self, uids: list) -> dict:
+        with span("firestore_read"), firestore_breaker.track():
+            return await self._get_current_health_data_many(uids)
+
+    async def _get_current_health_data_many(self, uids: list) -> dict:
+        db = self.db
+        current_collection = db.collection(HEALTH_DATA_CURRENT_COLLECTION)
+        found = {}
+        for start in range(0, len(uids), FIRESTORE_GET_ALL_LIMIT):
+            refs = [current_collection.document(uid) for uid in uids[start:start + FIRESTORE_GET_ALL_LIMIT]]
+            async for doc in db.get_all(refs):
+                if doc.exists:
+                    found[doc.id] = strip_current_metadata(doc.to_dict())
+
+        missing = [uid for uid in uids if uid not in found]
+        chunks = [missing[start:start + FIRESTORE_IN_QUERY_LIMIT] for start in range(0, len(missing), FIRESTORE_IN_QUERY_LIMIT)]
+        for backfilled in await asyncio.gather(*[self._backfill_current(chunk) for chunk in chunks]):
+            found.update(backfilled)
+        return found
+
+    async def _backfill_current(self, uids: list) -> dict:
+        """
+        Builds 'current' documents from history for users written before
+        'healthDataCurrent' existed (see scripts/migrate_health_data_current.py).
+        """
+        db = self.db
+        history = db.collection(HEALTH_DATA_COLLECTION)
+        if len(uids) == 1:
+            query = history.where("uid", "==", uids[0])
+        else:
+            query = history.where("uid", "in", uids)
+        docs = [doc async for doc in query.stream()]
+
+        backfilled = {}
+        batch = db.batch()
+        for uid, doc in latest_history_documents(docs).items():
+            data = doc.to_dict()
+            batch.create(
+                db.collection(HEALTH_DATA_CURRENT_COLLECTION).document(uid),
+                build_current_document(data, doc.id, doc.update_time),
+            )
+            backfilled[uid] = data
+        if backfilled:
+            try:
+                await batch.commit()
+            except Exception as e:
+                # Misalnya dokumen 'current' sudah dibuat oleh penulisan lain: pakai data riwayat saja
+                logging.warning(f"Could not backfill current health data for {list(backfilled)}: {e}")
+        return backfilled
+
+    def health_data_writes(self, uid: str, data: dict) -> list:
+        """
+        Riwayat (dokumen baru dengan ID unik), dokumen 'current' milik pengguna dan
+        pengukuran di bucket bulan ini, ditulis bersama dalam satu WriteBatch.
+        """
+        from google.cloud.firestore import ArrayUnion
+
+        history_id = self.db.collection(HEALTH_DATA_COLLECTION).document().id
+        now = datetime.now(timezone.utc)
+        month = bucket_month(now)
+        return [
+            WriteOp(HEALTH_DATA_COLLECTION, history_id, data),
+            WriteOp(
+                HEALTH_DATA_CURRENT_COLLECTION, uid,
+                build_current_document(data, history_id, now),
+            ),
+            WriteOp(
+                HEALTH_HISTORY_COLLECTION, f"{uid}_{month}",
+                {"uid": uid, "month": month, "samples": ArrayUnion([build_sample(data, now, history_id)])},
+                merge=True,
+            ),
+        ]
+
+    async def save_health_data(self, uid: str, data: dict):
+        # Data kesehatan adalah input pengguna: selalu ditunggu sebelum respons
+        with span("firestore_write"):
+            await self.writer.write(self.health_data_writes(uid, data))
+
+    async def get_health_history_samples(self, uid: str, months: list) -> list:
+        """
+        Samples of the given monthly history buckets, read with one `get_all`.
+        """
+        with span("firestore_read"), firestore_breaker.track():
+            db = self.db
+            refs = [db.collection(HEALTH_HISTORY_COLLECTION).document(f"{uid}_{month}") for month in months]
+            samples = []
+            async for doc in db.get_all(refs):
+                if doc.exists:
+                    samples.extend(doc.to_dict().get("samples", []))
+            return samples
+
+    async def get_user_prediction(self, uid: str):
+        with span("firestore_read"), firestore_breaker.track():
+            doc = await self.db.collection(USER_PREDICTION_COLLECTION).document(uid).get()
+            return doc.to_dict() if doc.exists else None
+
+    async def save_user_predictions(self, predictions: dict, background: bool = False):
+        """
+        Saves {uid: prediction dict}, using the UID as the document ID.
+        """
+        ops = [WriteOp(USER_PREDICTION_COLLECTION, uid, prediction) for uid, prediction in predictions.items()]
+        with span("firestore_write"):
+            await self.writer.write(ops, background=background)
+
+    async def get_meal_plans(self, uid: str) -> list:
+        """
+        The user's stored meal plan documents as (document ID, data), in plan
+        order, read with one `get_all`.
+        """
+        with span("firestore_read"), firestore_breaker.track():
+            db = self.db
+            refs = [
+                db.collection(MEAL_PLAN_COLLECTION).document(f"{uid}_mealPlan_{index}")
+                for index in range(1, MEAL_PLAN_VARIATIONS + 1)
+            ]
+            found = {doc.id: doc.to_dict() async for doc in db.get_all(refs) if doc.exists}
+            return [(ref.id, found[ref.id]) for ref in refs if ref.id in found]
+
+    async def save_meal_plans(self, uid: str, meal_plans: list, start_index: int = 0, background: bool = FIRESTORE_WRITE_BEHIND):
+        ops = []
+        for offset, meal_plan in enumerate(meal_plans):
+            # Generate a unique document ID using the UID and index
+            document_id = f"{uid}_mealPlan_{start_index + offset + 1}"
+            ops.append(WriteOp(MEAL_PLAN_COLLECTION, document_id, {
+                "mealPlan": meal_plan.get("mealPlan", []),
+                "timestamp": datetime.utcnow().isoformat()  # Save timestamp in ISO 8601 format
+            }))
+        with span("firestore_write"):
+            await self.writer.write(ops, background=background)
+
+    async def get_meal_plan_job(self, job_id: str):
+        with span("firestore_read"), firestore_breaker.track():
+            doc = await self.db.collection(MEAL_PLAN_JOB_COLLECTION).document(job_id).get()
+            return doc.to_dict() if doc.exists else None
+
+    async def find_meal_plan_jobs(self, dedup_key: str) -> list:
+        """
+        Job documents with the given single-flight key as (job ID, data).
+        """
+        with span("firestore_read"), firestore_breaker.track():
+            query = self.db.collection(MEAL_PLAN_JOB_COLLECTION).where("dedupKey", "==", dedup_key)
+            return [(doc.id, doc.to_dict()) async for doc in query.stream()]
+
+    async def save_meal_plan_jobs(self, jobs: dict):
+        """
+        Saves {job ID: job document}. Always awaited: a poll may reach another process right away.
+        """
+        ops = [WriteOp(MEAL_PLAN_JOB_COLLECTION, job_id, record) for job_id, record in jobs.items()]
+        with span("firestore_write"):
+            await self.writer.write(ops)
+
+# Instance global yang dipakai oleh layanan di health/
+firestore_repository = FirestoreRepository()
@@ -0,0 +1,114 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+# Konfigurasi cache data kesehatan terbaru per pengguna
+HEALTH_DATA_CACHE_SIZE = int(os.getenv("HEALTH_DATA_CACHE_SIZE", "10000"))
+HEALTH_DATA_CACHE_TTL = float(os.getenv("HEALTH_DATA_CACHE_TTL", "300"))
+
+class HealthDataCache:
+    """
+    In-process read-through LRU cache of each user's current health data.
+    `/healthData` writes invalidate the uid on this instance; the TTL bounds
+    how long another instance can serve data older than a write.
+    """
+
+    def __init__(self, max_size: int = HEALTH_DATA_CACHE_SIZE, ttl: float = HEALTH_DATA_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        # Generasi invalidasi terakhir per uid, dibatasi sebesar cache (LRU).
+        # Untuk uid yang sudah dibuang dipakai generasi tertinggi yang pernah dibuang.
+        self._generation = 0
+        self._invalidated = OrderedDict()
+        self._evicted_generation = 0
+        self._lock = threading.Lock()
+
+        # Metrik
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get_or_load(self, uid: str, loader):
+        """
+        Returns the cached data for `uid`, or awaits `loader(uid)` and caches a
+        non-empty result. A load that overlaps an invalidation is returned
+        but not cached, so it cannot overwrite a newer write.
+        """
+        with self._lock:
+            entry = self._entries.get(uid)
+            if entry is not None and time.time() - entry[0] < self.ttl:
+                self._entries.move_to_end(uid)
+                self.hits += 1
+                return dict(entry[1])
+            self.misses += 1
+            generation = self._generation
+
+        data = await loader(uid)
+        if data:
+            self._store(uid, data, generation)
+        return data
+
+    async def get_many_or_load(self, uids: list, loader) -> dict:
+        """
+        Like `get_or_load` for many uids; `await loader(missing_uids)` returns
+        {uid: data} for the uids that were not cached.
+        """
+        found = {}
+        missing = []
+        now = time.time()
+        with self._lock:
+            generation = self._generation
+            for uid in dict.fromkeys(uids):
+                entry = self._entries.get(uid)
+                if entry is not None and now - entry[0] < self.ttl:
+                    self._entries.move_to_end(uid)
+                    self.hits += 1
+                    found[uid] = dict(entry[1])
+                else:
+                    self.misses += 1
+                    missing.append(uid)
+
+        if missing:
+            loaded = await loader(missing)
+            for uid, data in loaded.items():
+                if data:
+                    self._store(uid, data, generation)
+            found.update(loaded)
+        return found
+
+    def _store(self, uid: str, data: dict, generation: int):
+        with self._lock:
+            # Diinvalidasi setelah load dimulai (atau tidak diketahui lagi): jangan simpan
+            if self._invalidated.get(uid, self._evicted_generation) > generation:
+                return
+            self._entries[uid] = (time.time(), dict(data))
+            self._entries.move_to_end(uid)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, uid: str):
+        with self._lock:
+            self._entries.pop(uid, None)
+            self._generation += 1
+            self._invalidated[uid] = self._generation
+            self._invalidated.move_to_end(uid)
+            while len(self._invalidated) > self.max_size:
+                _, evicted = self._invalidated.popitem(last=False)
+                self._evicted_generation = max(self._evicted_generation, evicted)
+            self.invalidations += 1
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+# Instance global yang dipakai oleh pembaca data kesehatan
+health_data_cache = HealthDataCache()
@@ -1,47 +1,51 @@
+import logging
+from datetime import datetime, timezone, timedelta
 from fastapi import HTTPException
-from config.firebase_config import get_firestore_client
 from health.models import HealthData
+from health.health_data_cache import health_data_cache
+from health.firestore_repository import firestore_repository
+from health.health_history import get_history_page, HEALTH_HISTORY_DEFAULT_DAYS
 
-def save_health_data(uid: str, input_data: HealthData):
+logger = logging.getLogger(__name__)
+
+async def save_health_data(uid: str, input_data: HealthData):
     """
-    Menyimpan data kesehatan ke koleksi 'healthData' di Firestore.
+    Menyimpan data kesehatan ke koleksi 'healthData' di Firestore, bersama
+    dokumen 'healthDataCurrent' milik pengguna dalam satu WriteBatch.
     Field 'uid' akan ditambahkan ke data yang disimpan.
     """
     try:
-        # Gunakan Firestore client dari firebase_config
-        db = get_firestore_client()
-        collection_ref = db.collection("healthData")
-
         # Konversi input_data menjadi dictionary dan tambahkan 'uid'
         data_to_save = input_data.dict()
         data_to_save["uid"] = uid  # Tambahkan UID pengguna ke data yang akan disimpan
 
-        # Simpan data ke Firestore
-        doc_ref = collection_ref.document()  # Buat dokumen baru dengan ID unik
-        doc_ref.set(data_to_save)
+        await firestore_repository.save_health_data(uid, data_to_save)
+        health_data_cache.invalidate(uid)
 
         return {"message": "Health data saved successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error saving health data: {e}")
 
-def get_ordered_health_data(uid: str) -> dict:
+async def get_latest_health_data(uid: str):
+    """
+    Returns the current health data of a user (one document read, cached
+    in-process), or None if the user never submitted health data.
+    """
+    return await health_data_cache.get_or_load(uid, firestore_repository.get_current_health_data)
+
+async def get_latest_health_data_many(uids: list) -> dict:
+    """
+    Returns {uid: current health data} for the users that have health data.
+    """
+    return await health_data_cache.get_many_or_load(uids, firestore_repository.get_current_health_data_many)
+
+async def get_ordered_health_data(uid: str) -> dict:
     """
     Mengambil data kesehatan dari Firestore untuk pengguna tertentu,
     mengecualikan 'food_allergies' dan memastikan atribut diurutkan.
     """
     try:
-        # Inisialisasi klien Firestore
-        db = get_firestore_client()
-        collection_ref = db.collection("healthData")
-
-        # Ambil dokumen berdasarkan UID
-        query = collection_ref.where("uid", "==", uid).limit(1)
-        docs = query.stream()
-
-        health_data = None
-        for doc in docs:
-            health_data = doc.to_dict()
-            break
+        health_data = await get_latest_health_data(uid)
 
         if not health_data:
             raise HTTPException(status_code=404, detail="Health data not found.")
@@ -49,9 +53,28 @@ def get_ordered_health_data(uid: str) -> dict:
         # Filter field yang tidak relevan
         allowed_fields = ["age", "gender", "height_cm", "weight_kg"]
         filtered_data = {key: health_data[key] for key in allowed_fields if key in health_data}
-        print(f"Filtered health data: {filtered_data}")
+        logger.debug("Filtered health data", extra={"health_data": filtered_data})
 
         return filtered_data
 
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to fetch and process health data: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to fetch and process health data: {e}")
+
+async def get_health_history(uid: str, start: datetime = None, end: datetime = None, resolution: str = "raw", limit: int = 100, cursor: str = None) -> dict:
+    """
+    Returns one page of the user's measurements between `start` and `end`
+    (default: the last HEALTH_HISTORY_DEFAULT_DAYS days), raw or as daily,
+    weekly or monthly means. Times without a timezone are taken as UTC.
+    """
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(days=HEALTH_HISTORY_DEFAULT_DAYS)
+    start, end = (moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc) for moment in (start, end))
+    if start >= end:
+        raise ValueError("start must be before end")
+
+    page = await get_history_page(
+        firestore_repository.get_health_history_samples, uid, start, end, resolution, limit, cursor
+    )
+    return {"start": start.isoformat(), "end": end.isoformat(), **page}
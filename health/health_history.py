@@ -0,0 +1,167 @@
+import os
+import json
+import base64
+from datetime import datetime, timezone, timedelta
+
+# Riwayat per pengguna disimpan dalam dokumen bucket bulanan ("<uid>_<YYYY-MM>"),
+# sehingga satu halaman riwayat membaca paling banyak sekian dokumen
+HEALTH_HISTORY_MAX_BUCKETS = max(int(os.getenv("HEALTH_HISTORY_MAX_BUCKETS", "12")), 2)
+HEALTH_HISTORY_DEFAULT_DAYS = int(os.getenv("HEALTH_HISTORY_DEFAULT_DAYS", "90"))
+HEALTH_HISTORY_MAX_LIMIT = 1000
+
+RESOLUTIONS = ("raw", "day", "week", "month")
+# Field yang disimpan per pengukuran; rata-rata hanya untuk field numerik kontinu
+SAMPLE_FIELDS = ("age", "gender", "height_cm", "weight_kg")
+MEAN_FIELDS = ("age", "height_cm", "weight_kg")
+
+class InvalidCursorError(ValueError):
+    """
+    Raised when a `cursor` query parameter was not returned by this endpoint.
+    """
+
+def to_millis(moment: datetime) -> int:
+    return int(moment.timestamp() * 1000)
+
+def from_millis(millis: int) -> datetime:
+    return datetime.fromtimestamp(millis / 1000, timezone.utc)
+
+def month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def next_month(moment: datetime) -> datetime:
+    start = month_start(moment)
+    return start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+
+def bucket_month(moment: datetime) -> str:
+    return moment.strftime("%Y-%m")
+
+def build_sample(data: dict, moment: datetime, sample_id: str) -> dict:
+    """
+    One measurement as stored in a bucket's `samples` array. `sample_id` is
+    the ID of the measurement's 'healthData' document.
+    """
+    sample = {field: data[field] for field in SAMPLE_FIELDS if field in data}
+    sample["t"] = to_millis(moment)
+    sample["id"] = sample_id
+    return sample
+
+def period_start(moment: datetime, resolution: str) -> datetime:
+    if resolution == "raw":
+        return moment
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if resolution == "day":
+        return day
+    if resolution == "week":
+        return day - timedelta(days=day.weekday())
+    return month_start(moment)
+
+def next_period(start: datetime, resolution: str) -> datetime:
+    if resolution == "day":
+        return start + timedelta(days=1)
+    if resolution == "week":
+        return start + timedelta(weeks=1)
+    return next_month(start)
+
+def encode_cursor(millis: int, skip: int = 0) -> str:
+    raw = json.dumps({"t": millis, "n": skip}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return int(data["t"]), int(data.get("n", 0))
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {e}")
+
+def downsample(samples: list, resolution: str, range_end: datetime) -> list:
+    """
+    Groups time-sorted samples per period and returns one point per period
+    with the mean of `MEAN_FIELDS`, the weight range and the sample count.
+    """
+    points = []
+    group = []
+    group_start = None
+
+    def flush():
+        point = {
+            "start": group_start.isoformat(),
+            "end": min(next_period(group_start, resolution), range_end).isoformat(),
+            "count": len(group),
+        }
+        for field in MEAN_FIELDS:
+            values = [sample[field] for sample in group if sample.get(field) is not None]
+            point[field] = sum(values) / len(values) if values else None
+        weights = [sample["weight_kg"] for sample in group if sample.get("weight_kg") is not None]
+        point["weight_kg_min"] = min(weights) if weights else None
+        point["weight_kg_max"] = max(weights) if weights else None
+        points.append(point)
+
+    for sample in samples:
+        start = period_start(from_millis(sample["t"]), resolution)
+        if group and start != group_start:
+            flush()
+            group = []
+        group_start = start
+        group.append(sample)
+    if group:
+        flush()
+    return points
+
+async def get_history_page(load_buckets, uid: str, start: datetime, end: datetime, resolution: str, limit: int, cursor: str = None) -> dict:
+    """
+    One page of a user's health history between `start` and `end`, oldest
+    first. `load_buckets(uid, months)` returns the samples of the given
+    monthly buckets; at most HEALTH_HISTORY_MAX_BUCKETS are read per page, so
+    the cost of a page does not grow with the length of the history. For
+    aggregated resolutions `start` is rounded down to a period boundary and
+    a page only contains complete periods.
+    """
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Unknown resolution {resolution!r}, expected one of {', '.join(RESOLUTIONS)}")
+    limit = max(1, min(limit, HEALTH_HISTORY_MAX_LIMIT))
+    position, skip = decode_cursor(cursor) if cursor else (to_millis(period_start(start, resolution)), 0)
+    end_millis = to_millis(end)
+    page = {"resolution": resolution, "points": [], "nextCursor": None}
+    if position >= end_millis:
+        return page
+
+    months = []
+    month = month_start(from_millis(position))
+    while month < end and len(months) < HEALTH_HISTORY_MAX_BUCKETS:
+        months.append(month)
+        month = next_month(month)
+    covered_until = min(end_millis, to_millis(next_month(months[-1])))
+
+    samples = sorted(
+        (sample for sample in await load_buckets(uid, [bucket_month(month) for month in months])
+         if position <= sample.get("t", -1) < covered_until),
+        key=lambda sample: sample["t"],
+    )
+
+    if resolution == "raw":
+        points = [
+            {"time": from_millis(sample["t"]).isoformat(), **{field: sample[field] for field in SAMPLE_FIELDS if field in sample}}
+            for sample in samples[skip:]
+        ]
+        times = [sample["t"] for sample in samples[skip:]]
+    else:
+        if covered_until < end_millis:
+            # Periode terakhir belum lengkap (berlanjut ke bucket berikutnya): mulai halaman berikutnya di sana
+            covered_until = to_millis(period_start(from_millis(covered_until), resolution))
+            samples = [sample for sample in samples if sample["t"] < covered_until]
+        points = downsample(samples, resolution, end)
+        times = [to_millis(datetime.fromisoformat(point["start"])) for point in points]
+
+    if len(points) > limit:
+        next_time = times[limit]
+        # Pengukuran dengan waktu yang sama persis sebelum batas halaman tidak diulang
+        returned_same_time = sum(1 for time in times[:limit] if time == next_time)
+        if resolution == "raw" and next_time == position:
+            returned_same_time += skip
+        page["points"] = points[:limit]
+        page["nextCursor"] = encode_cursor(next_time, returned_same_time)
+    else:
+        page["points"] = points
+        if covered_until < end_millis:
+            page["nextCursor"] = encode_cursor(covered_until)
+    return page
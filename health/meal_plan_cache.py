@@ -0,0 +1,174 @@
+import os
+import json
+import time
+import random
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from config.firebase_config import get_async_firestore_client
+
+# Konfigurasi cache meal plan
+MEAL_PLAN_CALORIE_BAND = int(os.getenv("MEAL_PLAN_CALORIE_BAND", "100"))
+MEAL_PLAN_CACHE_SIZE = int(os.getenv("MEAL_PLAN_CACHE_SIZE", "1024"))
+MEAL_PLAN_CACHE_TTL = float(os.getenv("MEAL_PLAN_CACHE_TTL", str(24 * 3600)))
+MEAL_PLAN_CACHE_FIRESTORE = os.getenv("MEAL_PLAN_CACHE_FIRESTORE", "false").lower() == "true"
+MEAL_PLAN_CACHE_COLLECTION = "mealPlanCache"
+
+# Kebijakan variasi: simpan beberapa varian per key, dan selama jumlahnya belum
+# penuh, generate ulang dengan probabilitas tertentu walaupun cache hit
+MEAL_PLAN_CACHE_VARIANTS = int(os.getenv("MEAL_PLAN_CACHE_VARIANTS", "3"))
+MEAL_PLAN_REGENERATE_PROBABILITY = float(os.getenv("MEAL_PLAN_REGENERATE_PROBABILITY", "0.2"))
+
+def normalize_meal_plan_inputs(health_data: dict, user_prediction: dict) -> tuple:
+    """
+    Normalizes the only inputs `generate_prompt` depends on into a cache key:
+    (calorie band, weight category, sorted lower-cased allergies).
+    """
+    predicted_bmr = float(user_prediction.get("predicted_bmr", 2000))
+    calorie_band = int(round(predicted_bmr / MEAL_PLAN_CALORIE_BAND) * MEAL_PLAN_CALORIE_BAND)
+
+    weight_category = str(user_prediction.get("weight_category") or "Unknown").strip()
+
+    allergies = health_data.get("food_allergies")
+    if allergies is None:
+        allergies = []
+    elif isinstance(allergies, str):
+        allergies = allergies.split(",")
+    allergies = {str(allergy).strip().lower() for allergy in allergies}
+    allergies.discard("")
+    allergies.discard("none")
+
+    return calorie_band, weight_category, tuple(sorted(allergies))
+
+def normalized_prompt_inputs(key: tuple) -> tuple:
+    """
+    Builds (health_data, user_prediction) for `generate_prompt` from a cache key,
+    so a cached plan always matches the inputs it is served for.
+    """
+    calorie_band, weight_category, allergies = key
+    health_data = {"food_allergies": list(allergies) or None}
+    user_prediction = {"predicted_bmr": calorie_band, "weight_category": weight_category}
+    return health_data, user_prediction
+
+def key_digest(key: tuple) -> str:
+    return hashlib.sha256(json.dumps(key).encode("utf-8")).hexdigest()
+
+class MealPlanCache:
+    """
+    Two-tier meal plan cache: an in-process LRU with TTL and an optional
+    shared Firestore tier. Each key holds up to `max_variants` generated plans.
+    """
+
+    def __init__(
+        self,
+        max_size: int = MEAL_PLAN_CACHE_SIZE,
+        ttl: float = MEAL_PLAN_CACHE_TTL,
+        max_variants: int = MEAL_PLAN_CACHE_VARIANTS,
+        regenerate_probability: float = MEAL_PLAN_REGENERATE_PROBABILITY,
+        use_firestore: bool = MEAL_PLAN_CACHE_FIRESTORE,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_variants = max(max_variants, 1)
+        self.regenerate_probability = regenerate_probability
+        self.use_firestore = use_firestore
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Metrik
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.variety_regenerations = 0
+        self.saved_generation_seconds = 0.0
+
+    def _fresh(self, variants: list) -> list:
+        now = time.time()
+        return [variant for variant in variants if now - variant["createdAt"] < self.ttl]
+
+    async def _get_shared(self, digest: str) -> list:
+        try:
+            doc = await get_async_firestore_client().collection(MEAL_PLAN_CACHE_COLLECTION).document(digest).get()
+            return doc.to_dict().get("variants", []) if doc.exists else []
+        except Exception as e:
+            logging.error(f"Failed to read shared meal plan cache: {e}")
+            return []
+
+    async def _set_shared(self, digest: str, key: tuple, variants: list):
+        try:
+            await get_async_firestore_client().collection(MEAL_PLAN_CACHE_COLLECTION).document(digest).set({
+                "key": {"calorieBand": key[0], "weightCategory": key[1], "allergies": list(key[2])},
+                "variants": variants,
+            })
+        except Exception as e:
+            logging.error(f"Failed to write shared meal plan cache: {e}")
+
+    async def get(self, key: tuple):
+        """
+        Returns cached meal plans for `key`, or None when the caller should
+        generate (cache miss, or the variety policy asks for a new variant).
+        """
+        digest = key_digest(key)
+        with self._lock:
+            variants = self._fresh(self._entries.get(digest, []))
+            if variants:
+                self._entries.move_to_end(digest)
+
+        from_shared = False
+        if not variants and self.use_firestore:
+            variants = self._fresh(await self._get_shared(digest))
+            from_shared = bool(variants)
+            if variants:
+                self._store_local(digest, variants)
+
+        with self._lock:
+            if not variants:
+                self.misses += 1
+                return None
+            if len(variants) < self.max_variants and random.random() < self.regenerate_probability:
+                self.variety_regenerations += 1
+                return None
+
+            variant = random.choice(variants)
+            self.hits += 1
+            if from_shared:
+                self.shared_hits += 1
+            self.saved_generation_seconds += variant.get("generationSeconds", 0.0)
+            return variant["mealPlans"]
+
+    def _store_local(self, digest: str, variants: list):
+        with self._lock:
+            self._entries[digest] = variants
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    async def put(self, key: tuple, meal_plans: list, generation_seconds: float = 0.0):
+        """
+        Adds a freshly generated plan as a new variant of `key`.
+        """
+        digest = key_digest(key)
+        variant = {"mealPlans": meal_plans, "createdAt": time.time(), "generationSeconds": generation_seconds}
+        with self._lock:
+            variants = self._fresh(self._entries.get(digest, [])) + [variant]
+        variants = variants[-self.max_variants:]
+        self._store_local(digest, variants)
+        if self.use_firestore:
+            await self._set_shared(digest, key, variants)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.variety_regenerations
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "variety_regenerations": self.variety_regenerations,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "saved_generation_seconds": self.saved_generation_seconds,
+            }
+
+# Instance global yang dipakai oleh endpoint /mealPlan
+meal_plan_cache = MealPlanCache()
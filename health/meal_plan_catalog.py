@@ -0,0 +1,240 @@
+import os
+import re
+import gzip
+import json
+import time
+import random
+import asyncio
+import logging
+import threading
+from bisect import bisect_left
+from health.meal_plan_cache import normalized_prompt_inputs
+from health.text_generation_service import generate_prompt, parse_meal_plan_response
+
+# Katalog meal plan yang dibangun offline (scripts/build_meal_plan_catalog.py)
+MEAL_PLAN_CATALOG_PATH = os.getenv("MEAL_PLAN_CATALOG_PATH", "./assets/meal_plan_catalog.json.gz")
+# Ambil meal plan dari katalog (jika ada) sebelum cache dan generasi langsung
+MEAL_PLAN_RETRIEVAL = os.getenv("MEAL_PLAN_RETRIEVAL", "true").lower() == "true"
+# Selisih kalori maksimum (kcal) antara kebutuhan pengguna dan plan katalog
+MEAL_PLAN_CATALOG_MAX_DISTANCE = float(os.getenv("MEAL_PLAN_CATALOG_MAX_DISTANCE", "150"))
+
+# Plan yang juga menghindari alergen lain tetap aman, tapi kurang bervariasi:
+# setiap alergen tambahan dihitung seperti selisih 50 kcal
+EXTRA_ALLERGEN_PENALTY = 50.0
+
+CATALOG_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
+def mentioned_allergens(meal_plans: list, allergens) -> list:
+    """
+    Allergens named in a dish name or ingredient. A plan generated to avoid
+    an allergen must not mention it; such plans are left out of the catalog.
+    """
+    text = " ".join(
+        " ".join([meal["dishName"], *meal["ingredients"]])
+        for plan in meal_plans for meal in plan["mealPlan"]
+    ).lower()
+    return [allergen for allergen in allergens if re.search(rf"\b{re.escape(allergen)}\b", text)]
+
+def catalog_grid(calories, weight_categories, allergy_sets) -> list:
+    """
+    Catalog keys in the cache key format (calories, weight category, sorted allergies).
+    """
+    allergy_keys = sorted({tuple(sorted({allergy.strip().lower() for allergy in allergies})) for allergies in allergy_sets})
+    return [
+        (int(calorie), weight_category, allergies)
+        for calorie in calories for weight_category in weight_categories for allergies in allergy_keys
+    ]
+
+async def build_catalog(keys: list, generate, concurrency: int = 4, on_entry=None) -> dict:
+    """
+    Generates meal plans for every key through the same prompt and parser as
+    live requests. `generate` is an async callable taking the prompt and
+    returning the raw model response (`generate_text_with_vertexai` by default
+    in the build script). Failed or unsafe generations are counted and skipped.
+    """
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    entries = []
+    failures = []
+
+    async def build(key: tuple):
+        async with semaphore:
+            try:
+                prompt = generate_prompt(*normalized_prompt_inputs(key))
+                meal_plans = parse_meal_plan_response(await generate(prompt))
+                unsafe = mentioned_allergens(meal_plans, key[2])
+                if unsafe:
+                    raise ValueError(f"plan mentions excluded allergens {unsafe}")
+                entries.append((key, meal_plans))
+                outcome = None
+            except Exception as e:
+                failures.append({"key": list(key), "error": str(e)})
+                outcome = e
+        if on_entry:
+            on_entry(key, outcome)
+
+    await asyncio.gather(*[build(key) for key in keys])
+    catalog = index_catalog(entries)
+    catalog["failures"] = failures
+    return catalog
+
+def index_catalog(entries: list) -> dict:
+    """
+    Compact catalog: entries sorted by calories (the sorted calorie index),
+    weight categories and allergens stored once and referenced by position,
+    plus an inverted index from each allergen to the entries that avoid it.
+    """
+    entries = sorted(entries, key=lambda entry: entry[0][0])
+    weight_categories = sorted({key[1] for key, _ in entries})
+    allergens = sorted({allergen for key, _ in entries for allergen in key[2]})
+    allergen_index = {allergen: [] for allergen in allergens}
+    for entry_id, (key, _) in enumerate(entries):
+        for allergen in key[2]:
+            allergen_index[allergen].append(entry_id)
+    return {
+        "version": CATALOG_VERSION,
+        "createdAt": time.time(),
+        "weightCategories": weight_categories,
+        "allergens": allergens,
+        "calories": [key[0] for key, _ in entries],
+        "categories": [weight_categories.index(key[1]) for key, _ in entries],
+        "allergenIndex": allergen_index,
+        "mealPlans": [meal_plans for _, meal_plans in entries],
+    }
+
+def save_catalog(catalog: dict, path: str = MEAL_PLAN_CATALOG_PATH):
+    data = json.dumps(catalog, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "wb") as f:
+        f.write(data)
+
+class MealPlanCatalog:
+    """
+    Read-only, in-memory meal plan catalog. A lookup intersects the inverted
+    allergen index (plans generated to avoid every allergy of the user) with
+    the user's weight category, then walks outward from the user's calories
+    in the sorted calorie index until no closer plan is possible.
+    """
+
+    def __init__(self, max_distance: float = MEAL_PLAN_CATALOG_MAX_DISTANCE, enabled: bool = MEAL_PLAN_RETRIEVAL):
+        self.max_distance = max_distance
+        self.enabled = enabled
+        self.path = None
+        self.created_at = None
+        self._calories = []
+        self._categories = []
+        self._category_ids = {}
+        self._allergen_ids = {}
+        self._allergen_counts = []
+        self._meal_plans = []
+        self._lock = threading.Lock()
+
+        # Metrik
+        self.hits = 0
+        self.misses = 0
+        self.total_distance = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self._calories)
+
+    def load(self, path: str = MEAL_PLAN_CATALOG_PATH) -> bool:
+        """
+        Loads a catalog file. Returns False (retrieval stays off) when it does not exist.
+        """
+        if not os.path.exists(path):
+            logger.info(f"No meal plan catalog at {path}, meal plans are generated live")
+            return False
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rb") as f:
+            catalog = json.loads(f.read())
+        if catalog.get("version") != CATALOG_VERSION:
+            raise ValueError(f"Unsupported meal plan catalog version: {catalog.get('version')}")
+
+        category_ids = {}
+        for entry_id, category in enumerate(catalog["categories"]):
+            category_ids.setdefault(catalog["weightCategories"][category], set()).add(entry_id)
+        allergen_counts = [0] * len(catalog["calories"])
+        for entry_ids in catalog["allergenIndex"].values():
+            for entry_id in entry_ids:
+                allergen_counts[entry_id] += 1
+
+        self._calories = catalog["calories"]
+        self._category_ids = category_ids
+        self._allergen_ids = {allergen: frozenset(entry_ids) for allergen, entry_ids in catalog["allergenIndex"].items()}
+        self._allergen_counts = allergen_counts
+        self._meal_plans = catalog["mealPlans"]
+        self.path = path
+        self.created_at = catalog.get("createdAt")
+        logger.info(f"Loaded meal plan catalog with {len(self._calories)} entries from {path}")
+        return True
+
+    def _candidates(self, weight_category: str, allergies: tuple):
+        candidates = self._category_ids.get(weight_category)
+        for allergen in allergies:
+            if not candidates:
+                break
+            candidates = candidates & self._allergen_ids.get(allergen, frozenset())
+        return candidates
+
+    def find(self, key: tuple, calories: float = None):
+        """
+        Returns the meal plans of the closest allergen-safe entry for a cache
+        key (calorie band, weight category, allergies), or None when retrieval
+        is off or nothing lies within `max_distance` kcal. `calories` is the
+        user's unrounded calorie need; the key's band is used without it.
+        """
+        if not self.enabled or not self.loaded:
+            return None
+        _, weight_category, allergies = key
+        target = key[0] if calories is None else calories
+
+        candidates = self._candidates(weight_category, allergies)
+        best_score, best_ids = None, []
+        if candidates:
+            calorie_index = self._calories
+            right = bisect_left(calorie_index, target)
+            left = right - 1
+            while left >= 0 or right < len(calorie_index):
+                # Ambil entry terdekat berikutnya dari kiri atau kanan
+                if right >= len(calorie_index) or (left >= 0 and target - calorie_index[left] <= calorie_index[right] - target):
+                    entry_id, left = left, left - 1
+                else:
+                    entry_id, right = right, right + 1
+                distance = abs(calorie_index[entry_id] - target)
+                if distance > self.max_distance or (best_score is not None and distance > best_score):
+                    break
+                if entry_id not in candidates:
+                    continue
+                score = distance + EXTRA_ALLERGEN_PENALTY * (self._allergen_counts[entry_id] - len(allergies))
+                if best_score is None or score < best_score:
+                    best_score, best_ids = score, [entry_id]
+                elif score == best_score:
+                    best_ids.append(entry_id)
+
+        with self._lock:
+            if not best_ids:
+                self.misses += 1
+                return None
+            entry_id = random.choice(best_ids)
+            self.hits += 1
+            self.total_distance += abs(self._calories[entry_id] - target)
+        return self._meal_plans[entry_id]
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._calories),
+                "path": self.path,
+                "created_at": self.created_at,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "mean_distance_kcal": self.total_distance / self.hits if self.hits else 0.0,
+            }
+
+# Instance global, dimuat saat startup aplikasi
+meal_plan_catalog = MealPlanCatalog()
@@ -0,0 +1,292 @@
+import os
+import re
+import time
+import uuid
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timezone
+from health.meal_plan_cache import normalize_meal_plan_inputs
+from health.meal_plan_service import create_meal_plans
+from health.firestore_repository import firestore_repository
+
+# Konfigurasi job queue meal plan
+MEAL_PLAN_JOB_WORKERS = int(os.getenv("MEAL_PLAN_JOB_WORKERS", "4"))
+MEAL_PLAN_JOB_QUEUE_SIZE = int(os.getenv("MEAL_PLAN_JOB_QUEUE_SIZE", "200"))
+MEAL_PLAN_JOB_TTL = float(os.getenv("MEAL_PLAN_JOB_TTL", "3600"))
+# Job yang belum selesai dan tidak diperbarui selama ini dianggap terputus
+# (proses yang menjalankannya berhenti atau didaur ulang)
+MEAL_PLAN_JOB_STALE_AFTER = float(os.getenv("MEAL_PLAN_JOB_STALE_AFTER", "600"))
+
+JOB_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+INTERRUPTED_ERROR = "Job was interrupted, submit it again"
+
+class JobQueueFullError(RuntimeError):
+    """
+    Raised when the job queue already holds `MEAL_PLAN_JOB_QUEUE_SIZE` jobs.
+    """
+
+def dedup_key(key: tuple) -> str:
+    return hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+
+class MealPlanJob:
+    def __init__(self, uid: str, key: tuple, health_data: dict, user_prediction: dict):
+        self.id = uuid.uuid4().hex
+        self.uid = uid
+        self.key = key
+        self.health_data = health_data
+        self.user_prediction = user_prediction
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @classmethod
+    def from_record(cls, job_id: str, record: dict) -> "MealPlanJob":
+        job = cls(record.get("uid"), None, None, None)
+        job.id = job_id
+        job.status = record.get("status", "queued")
+        job.result = record.get("mealPlans")
+        job.error = record.get("error")
+        job.created_at = record.get("createdAt")
+        job.started_at = record.get("startedAt")
+        job.finished_at = record.get("finishedAt")
+        return job
+
+    def to_record(self, ttl: float = MEAL_PLAN_JOB_TTL) -> dict:
+        """
+        The Firestore document of this job. `expiresAt` is meant for a
+        Firestore TTL policy on the collection.
+        """
+        updated_at = time.time()
+        record = {
+            "uid": self.uid,
+            "dedupKey": dedup_key(self.key) if self.key is not None else None,
+            "status": self.status,
+            "createdAt": self.created_at,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+            "updatedAt": updated_at,
+            "expiresAt": datetime.fromtimestamp(updated_at + ttl, timezone.utc),
+        }
+        if self.status == "done":
+            record["mealPlans"] = self.result
+        elif self.status == "failed":
+            record["error"] = self.error
+        return record
+
+    def to_dict(self) -> dict:
+        data = {
+            "jobId": self.id,
+            "status": self.status,
+            "createdAt": self.created_at,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+        }
+        if self.status == "done":
+            data["mealPlans"] = self.result
+        elif self.status == "failed":
+            data["error"] = self.error
+        return data
+
+def is_stale(record: dict, now: float, stale_after: float = MEAL_PLAN_JOB_STALE_AFTER) -> bool:
+    return record.get("status") in ("queued", "running") and now - record.get("updatedAt", 0) > stale_after
+
+class MealPlanJobQueue:
+    """
+    Runs meal plan generations on a bounded pool of asyncio workers. Job
+    records (status, result, error) are kept in Firestore, so any process
+    or instance can answer a poll; only the queue itself is in memory. A job
+    for the same uid and inputs that is still queued or running is reused
+    instead of starting a second generation: within this process through
+    `_in_flight`, across processes best effort through the `dedupKey` query.
+    """
+
+    def __init__(self, workers: int = MEAL_PLAN_JOB_WORKERS, max_queue: int = MEAL_PLAN_JOB_QUEUE_SIZE, ttl: float = MEAL_PLAN_JOB_TTL, repository=firestore_repository):
+        self.worker_count = max(workers, 1)
+        self.max_queue = max_queue
+        self.ttl = ttl
+        self.repository = repository
+        self._queue = None
+        self._workers = []
+        # {dedup key: future} per submit yang sedang berjalan; hasilnya job lokal
+        # yang tetap tercatat sampai selesai (None jika submit gagal)
+        self._in_flight = {}
+
+        # Metrik
+        self.submitted = 0
+        self.dedup_hits = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.interrupted = 0
+        self.running = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def start(self):
+        if not self._workers:
+            self._queue = asyncio.Queue()
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+            logging.info(f"Meal plan job queue started with {self.worker_count} workers")
+
+    async def stop(self):
+        """
+        Stops the workers. Jobs still queued or running in this process are
+        recorded as failed, so clients polling them get an error instead of
+        waiting for a job that will never finish.
+        """
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        interrupted = []
+        while self._queue is not None and not self._queue.empty():
+            job = self._queue.get_nowait()
+            job.status = "failed"
+            job.error = INTERRUPTED_ERROR
+            job.finished_at = time.time()
+            interrupted.append(job)
+            self._release(job)
+        if interrupted:
+            self.interrupted += len(interrupted)
+            await self._save(*interrupted)
+
+    async def _save(self, *jobs: MealPlanJob):
+        await self.repository.save_meal_plan_jobs({job.id: job.to_record(self.ttl) for job in jobs})
+
+    def _release(self, job: MealPlanJob):
+        self._in_flight.pop(dedup_key(job.key), None)
+
+    async def _find_in_flight(self, uid: str, digest: str):
+        now = time.time()
+        for job_id, record in await self.repository.find_meal_plan_jobs(digest):
+            if record.get("uid") == uid and record.get("status") in ("queued", "running") and not is_stale(record, now):
+                return MealPlanJob.from_record(job_id, record)
+        return None
+
+    async def submit(self, uid: str, health_data: dict, user_prediction: dict):
+        """
+        Returns (job, deduplicated). Raises JobQueueFullError when the queue is full.
+        """
+        await self.start()
+
+        key = (uid, normalize_meal_plan_inputs(health_data, user_prediction))
+        digest = dedup_key(key)
+        while digest in self._in_flight:
+            job = await asyncio.shield(self._in_flight[digest])
+            if job is not None:
+                self.dedup_hits += 1
+                return job, True
+            # Submit pertama gagal (misalnya antrean penuh): coba sendiri
+
+        # Dicatat sebelum await pertama, agar submit kembar di proses ini menunggu submit ini
+        pending = asyncio.get_running_loop().create_future()
+        self._in_flight[digest] = pending
+        result = None
+        queued = False
+        try:
+            existing = await self._find_in_flight(uid, digest)
+            if existing is not None:
+                self.dedup_hits += 1
+                result = existing
+                return existing, True
+
+            if self._queue.qsize() >= self.max_queue:
+                self.rejected += 1
+                raise JobQueueFullError("Meal plan job queue is full, try again later")
+
+            job = MealPlanJob(uid, key, health_data, user_prediction)
+            # Disimpan sebelum jobId dikembalikan, agar polling ke proses lain langsung menemukannya
+            await self._save(job)
+            self.submitted += 1
+            self._queue.put_nowait(job)
+            result = job
+            queued = True
+            return job, False
+        finally:
+            pending.set_result(result)
+            # Job lokal tetap tercatat sampai worker menyelesaikannya
+            if not queued and self._in_flight.get(digest) is pending:
+                del self._in_flight[digest]
+
+    async def get(self, job_id: str):
+        """
+        The job with this ID from Firestore, or None when it does not exist or
+        expired. An unfinished job that stopped being updated is reported as failed.
+        """
+        if not JOB_ID_PATTERN.fullmatch(job_id):
+            return None
+        record = await self.repository.get_meal_plan_job(job_id)
+        if record is None:
+            return None
+        now = time.time()
+        if record.get("finishedAt") is not None and now - record["finishedAt"] > self.ttl:
+            return None
+
+        job = MealPlanJob.from_record(job_id, record)
+        if is_stale(record, now):
+            job.status = "failed"
+            job.error = INTERRUPTED_ERROR
+        return job
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            job.status = "running"
+            job.started_at = time.time()
+            wait = job.started_at - job.created_at
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self.running += 1
+            try:
+                try:
+                    await self._save(job)
+                    job.result = await create_meal_plans(job.uid, job.health_data, job.user_prediction)
+                    job.status = "done"
+                    self.completed += 1
+                except asyncio.CancelledError:
+                    job.status = "failed"
+                    job.error = INTERRUPTED_ERROR
+                    self.interrupted += 1
+                    raise
+                except Exception as e:
+                    logging.error(f"Meal plan job {job.id} failed: {e}")
+                    job.status = "failed"
+                    job.error = str(e)
+                    self.failed += 1
+                finally:
+                    job.finished_at = time.time()
+                    job.health_data = job.user_prediction = None
+                    self.running -= 1
+                    self._release(job)
+                    self._queue.task_done()
+                    await self._save(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Hasil tidak tersimpan: job terlihat terputus setelah MEAL_PLAN_JOB_STALE_AFTER
+                logging.error(f"Failed to save meal plan job {job.id}: {e}")
+
+    def get_stats(self) -> dict:
+        started = self.completed + self.failed
+        return {
+            "workers": self.worker_count,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "running": self.running,
+            "in_flight": len(self._in_flight),
+            "submitted": self.submitted,
+            "dedup_hits": self.dedup_hits,
+            "completed": self.completed,
+            "failed": self.failed,
+            "interrupted": self.interrupted,
+            "rejected": self.rejected,
+            "avg_wait_ms": self.total_wait / started * 1000 if started else 0.0,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+# Instance global yang dipakai oleh endpoint /mealPlan/jobs
+meal_plan_jobs = MealPlanJobQueue()
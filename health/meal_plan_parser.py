@@ -0,0 +1,199 @@
+import re
+import json
+import threading
+from typing import List
+from pydantic import TypeAdapter, ValidationError
+from health.models import MealPlan
+
+MEAL_PLANS_ADAPTER = TypeAdapter(List[MealPlan])
+
+# Atribut JSON Schema yang diterima `response_schema` Vertex AI (subset OpenAPI)
+VERTEX_SCHEMA_KEYS = ("type", "description", "enum", "format", "nullable", "minItems", "maxItems", "required")
+
+_FENCE_OPEN = re.compile(r"```[a-zA-Z]*")
+_TRAILING_COMMA = re.compile(r",\s*[\]}]")
+
+class MealPlanParseError(ValueError):
+    """
+    Raised when a response is not valid meal plan JSON, even after repairs.
+    """
+
+def vertex_response_schema(schema: dict, definitions: dict = None) -> dict:
+    """
+    Converts a Pydantic JSON schema into the OpenAPI subset Vertex AI accepts
+    as `response_schema`: references are inlined, titles are dropped.
+    """
+    if definitions is None:
+        definitions = schema.get("$defs", {})
+    if "$ref" in schema:
+        return vertex_response_schema(definitions[schema["$ref"].rsplit("/", 1)[-1]], definitions)
+
+    converted = {key: schema[key] for key in VERTEX_SCHEMA_KEYS if key in schema}
+    if "properties" in schema:
+        converted["properties"] = {
+            name: vertex_response_schema(value, definitions) for name, value in schema["properties"].items()
+        }
+    if "items" in schema:
+        converted["items"] = vertex_response_schema(schema["items"], definitions)
+    return converted
+
+# Schema respons untuk generasi meal plan, dibangun sekali dari model Pydantic
+MEAL_PLAN_RESPONSE_SCHEMA = vertex_response_schema(MEAL_PLANS_ADAPTER.json_schema())
+
+def _remove_trailing_commas(text: str) -> str:
+    # Hapus koma sebelum ']' atau '}' yang berada di luar string
+    result = []
+    in_string = escaped = False
+    pending_comma = None
+    for char in text:
+        if in_string:
+            result.append(char)
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+        if pending_comma is not None:
+            if char.isspace():
+                pending_comma.append(char)
+                continue
+            if char not in "]}":
+                result.append(",")
+            result.extend(pending_comma)
+            pending_comma = None
+        if char == ",":
+            pending_comma = []
+            continue
+        if char == '"':
+            in_string = True
+        result.append(char)
+    if pending_comma is not None:
+        result.append(",")
+        result.extend(pending_comma)
+    return "".join(result)
+
+def repair_meal_plan_json(text: str) -> tuple:
+    """
+    Fixes recoverable defects: code fences (any language, or unclosed), text
+    around the JSON, and trailing commas. Returns (text, names of the repairs applied).
+    """
+    repairs = []
+    fence = _FENCE_OPEN.search(text)
+    if fence:
+        # Isi fence pertama; fence penutup boleh hilang (respons terpotong di akhir)
+        end = text.find("```", fence.end())
+        text = text[fence.end():end if end != -1 else len(text)]
+        repairs.append("code_fence")
+
+    starts = [index for index in (text.find("["), text.find("{")) if index != -1]
+    end = max(text.rfind("]"), text.rfind("}"))
+    if starts and end != -1:
+        stripped = text[min(starts):end + 1]
+        if stripped != text.strip():
+            repairs.append("surrounding_text")
+        text = stripped
+
+    # Pemindaian per karakter hanya jika pola koma berlebih memang ada
+    if _TRAILING_COMMA.search(text):
+        without_commas = _remove_trailing_commas(text)
+        if without_commas != text:
+            repairs.append("trailing_comma")
+            text = without_commas
+    return text, repairs
+
+def unwrap_meal_plans(data):
+    """
+    Accepts a single `{"mealPlan": [...]}` object or `{"mealPlans": [...]}`
+    in place of the top-level array. Returns (data, repair name or None).
+    """
+    if isinstance(data, dict):
+        if "mealPlan" in data:
+            return [data], "single_object"
+        if isinstance(data.get("mealPlans"), list):
+            return data["mealPlans"], "wrapped_array"
+    return data, None
+
+class MealPlanParser:
+    """
+    Validates generated meal plans against the `MealPlan` model. The strict
+    path is a single Pydantic `validate_json`; responses that fail it are
+    repaired locally before giving up, so a formatting slip does not cost a
+    new generation. Counts clean parses, repairs and failures.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.parsed = 0
+        self.repaired = 0
+        self.failed = 0
+        self.repairs = {}
+
+    def _record(self, outcome: str, repairs: list = ()):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            for repair in repairs:
+                self.repairs[repair] = self.repairs.get(repair, 0) + 1
+
+    def parse(self, raw_response: str) -> list:
+        """
+        Returns the meal plans as a list of dicts.
+        """
+        try:
+            plans = MEAL_PLANS_ADAPTER.validate_json(raw_response)
+            self._record("parsed")
+            return MEAL_PLANS_ADAPTER.dump_python(plans)
+        except ValidationError:
+            pass
+
+        text, repairs = repair_meal_plan_json(raw_response)
+        try:
+            plans = MEAL_PLANS_ADAPTER.validate_json(text)
+        except ValidationError:
+            try:
+                data, unwrapped = unwrap_meal_plans(json.loads(text))
+                if unwrapped:
+                    repairs.append(unwrapped)
+                plans = MEAL_PLANS_ADAPTER.validate_python(data)
+            except (ValueError, ValidationError) as e:
+                self._record("failed")
+                raise MealPlanParseError(f"Invalid meal plan response: {e}")
+
+        self._record("repaired", repairs)
+        return MEAL_PLANS_ADAPTER.dump_python(plans)
+
+    def parse_plan(self, raw_object: str) -> dict:
+        """
+        Validates one `{"mealPlan": [...]}` object (used while streaming).
+        """
+        try:
+            plan = MealPlan.model_validate_json(raw_object)
+            self._record("parsed")
+            return plan.model_dump()
+        except ValidationError:
+            pass
+
+        text, repairs = repair_meal_plan_json(raw_object)
+        try:
+            plan = MealPlan.model_validate_json(text)
+        except ValidationError as e:
+            self._record("failed")
+            raise MealPlanParseError(f"Invalid meal plan in stream: {e}")
+        self._record("repaired", repairs)
+        return plan.model_dump()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            total = self.parsed + self.repaired + self.failed
+            return {
+                "parsed": self.parsed,
+                "repaired": self.repaired,
+                "failed": self.failed,
+                "repair_rate": self.repaired / total if total else 0.0,
+                "failure_rate": self.failed / total if total else 0.0,
+                "repairs": dict(self.repairs),
+            }
+
+# Instance global yang dipakai oleh text generation service
+meal_plan_parser = MealPlanParser()
@@ -0,0 +1,70 @@
+import time
+import logging
+from services.metrics import span
+from services.response_encoding import strong_etag
+from health.firestore_repository import firestore_repository
+from health.meal_plan_cache import meal_plan_cache, normalize_meal_plan_inputs, normalized_prompt_inputs
+from health.meal_plan_catalog import meal_plan_catalog
+from health.text_generation_service import (
+    generate_prompt,
+    generate_text_with_vertexai,
+    parse_meal_plan_response,
+    save_separate_meal_plans_to_firestore
+)
+
+logger = logging.getLogger(__name__)
+
+async def create_meal_plans(uid: str, health_data: dict, user_prediction: dict) -> list:
+    """
+    Membuat meal plan untuk pengguna: cari di katalog offline, lalu cek cache,
+    generate lewat Vertex AI jika perlu, lalu simpan setiap variasi ke Firestore.
+    Dipakai oleh /mealPlan dan job queue.
+    """
+    cache_key = normalize_meal_plan_inputs(health_data, user_prediction)
+
+    # Closest allergen-safe plan from the offline catalog, if one is close enough
+    with span("meal_plan_catalog"):
+        meal_plans = meal_plan_catalog.find(cache_key, float(user_prediction.get("predicted_bmr", 2000)))
+
+    if meal_plans is not None:
+        logger.info("Serving meal plans from catalog")
+    else:
+        # Check the meal plan cache (calorie band, weight category, allergies)
+        with span("meal_plan_cache"):
+            meal_plans = await meal_plan_cache.get(cache_key)
+        if meal_plans is not None:
+            logger.info("Serving meal plans from cache")
+
+    if meal_plans is None:
+        # Generate the prompt from the normalized inputs so the cached plan matches its key
+        with span("generate_prompt"):
+            prompt = generate_prompt(*normalized_prompt_inputs(cache_key))
+
+        # Generate text using Vertex AI
+        generation_started = time.perf_counter()
+        raw_response = await generate_text_with_vertexai(prompt)
+
+        # Parse the raw response to extract meal plans
+        with span("parse_meal_plan"):
+            meal_plans = parse_meal_plan_response(raw_response)
+        await meal_plan_cache.put(cache_key, meal_plans, time.perf_counter() - generation_started)
+
+    # Save each meal plan variation as a separate document in Firestore (one batched commit)
+    await save_separate_meal_plans_to_firestore(uid, meal_plans)
+    return meal_plans
+
+async def get_stored_meal_plans(uid: str):
+    """
+    Mengambil meal plan terakhir yang tersimpan untuk pengguna tanpa generate
+    ulang. Mengembalikan (payload, ETag) atau None jika belum pernah dibuat.
+    ETag diturunkan dari ID dan timestamp dokumen, jadi berubah setiap kali plan disimpan ulang.
+    """
+    documents = await firestore_repository.get_meal_plans(uid)
+    if not documents:
+        return None
+    payload = {
+        "mealPlans": [{"mealPlan": data.get("mealPlan", [])} for _, data in documents],
+        "updatedAt": max(data.get("timestamp", "") for _, data in documents),
+    }
+    etag = strong_etag(*(f"{document_id}@{data.get('timestamp')}" for document_id, data in documents))
+    return payload, etag
@@ -13,3 +13,17 @@ class HealthData(BaseModel):
 class UserPrediction(BaseModel):
     weight_category: str = Field(..., description="Weight category predicted")
     predicted_bmr: float = Field(..., gt=0, description="Predicted Basal Metabolic Rate")
+
+class BatchPredictionRequest(BaseModel):
+    uids: List[str] = Field(default_factory=list, description="Users whose stored health data should be scored")
+    rows: List[HealthData] = Field(default_factory=list, description="Raw feature rows to score without saving")
+    save: bool = Field(True, description="Save predictions for the given uids to 'userPrediction'")
+
+class Meal(BaseModel):
+    meal: str = Field(..., description="Breakfast, Lunch or Dinner")
+    dishName: str = Field(..., description="Name of the dish in Bahasa Indonesia")
+    ingredients: List[str] = Field(..., min_length=1, description="Ingredients with measurements")
+    calories: str = Field(..., description="Approximate calories, e.g. '~450 kalori'")
+
+class MealPlan(BaseModel):
+    mealPlan: List[Meal] = Field(..., min_length=1, description="Breakfast, lunch and dinner of one daily plan")
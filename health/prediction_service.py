@@ -1,33 +1,55 @@
 from fastapi import HTTPException
-from config.firebase_config import get_firestore_client
 from health.models import UserPrediction, HealthData
+from health.health_data_service import get_latest_health_data, get_latest_health_data_many
+from health.firestore_repository import firestore_repository
+from services.firestore_writer import FIRESTORE_WRITE_BEHIND
 
-def save_user_prediction(uid: str, user_prediction: UserPrediction):
+async def save_user_prediction(uid: str, user_prediction: UserPrediction, background: bool = FIRESTORE_WRITE_BEHIND):
     """
     Menyimpan hasil prediksi pengguna ke koleksi 'userPrediction' di Firestore.
+    Snapshot prediksi tidak kritis, jadi dengan FIRESTORE_WRITE_BEHIND
+    penulisan terjadi setelah respons dikirim.
     """
     try:
-        db = get_firestore_client()
-        collection_ref = db.collection("userPrediction")
-        doc_ref = collection_ref.document(uid)  # Gunakan UID pengguna sebagai ID dokumen
-        doc_ref.set(user_prediction.dict())  # Konversi Pydantic model ke dictionary
+        await firestore_repository.save_user_predictions({uid: user_prediction.dict()}, background=background)
         return {"message": "User prediction saved successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error saving user prediction: {e}")
 
-def get_user_health_data(uid: str):
+async def get_user_health_data(uid: str):
     """
     Mengambil data kesehatan pengguna dari koleksi 'healthData' di Firestore.
     """
     try:
-        db = get_firestore_client()
-        health_data_collection = db.collection("healthData").where("uid", "==", uid).stream()
-        
-        # Ambil data pertama
-        health_data_list = [doc.to_dict() for doc in health_data_collection]
-        if not health_data_list:
+        health_data = await get_latest_health_data(uid)
+        if not health_data:
             raise HTTPException(status_code=404, detail="No health data found for this user.")
-        
-        return health_data_list[0]  # Kembalikan data pertama
+
+        return health_data
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving health data: {e}")
+
+async def get_bulk_health_data(uids: list) -> dict:
+    """
+    Mengambil data kesehatan terbaru banyak pengguna sekaligus (get_all pada 'healthDataCurrent').
+    Mengembalikan dict {uid: data kesehatan} untuk pengguna yang datanya ditemukan.
+    """
+    try:
+        return await get_latest_health_data_many(list(dict.fromkeys(uids)))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving bulk health data: {e}")
+
+async def save_user_predictions_batch(predictions: dict):
+    """
+    Menyimpan banyak hasil prediksi ({uid: UserPrediction}) dengan Firestore WriteBatch.
+    """
+    try:
+        await firestore_repository.save_user_predictions(
+            {uid: user_prediction.dict() for uid, user_prediction in predictions.items()}
+        )
+
+        return {"message": f"{len(predictions)} user predictions saved successfully"}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error retrieving health data: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error saving user predictions: {e}")
@@ -1,45 +1,82 @@
 import os
-import json
+import re
+import asyncio
 import logging
-from vertexai import init
-from vertexai.preview.generative_models import GenerativeModel
-from config.firebase_config import get_firestore_client
-from datetime import datetime
+from services.vertex_client import vertex_client
+from services.firestore_writer import FIRESTORE_WRITE_BEHIND
+from services.metrics import span
+from health.health_data_service import get_latest_health_data
+from health.firestore_repository import firestore_repository
+from health.meal_plan_parser import meal_plan_parser, MealPlanParseError, MEAL_PLAN_RESPONSE_SCHEMA
 
-def get_user_data(uid: str):
+logger = logging.getLogger(__name__)
+
+# Minta Vertex AI menghasilkan JSON sesuai schema MealPlan (response MIME type application/json)
+MEAL_PLAN_JSON_MODE = os.getenv("MEAL_PLAN_JSON_MODE", "true").lower() == "true"
+MEAL_PLAN_SCHEMA = MEAL_PLAN_RESPONSE_SCHEMA if MEAL_PLAN_JSON_MODE else None
+
+# Awal array meal plan di respons tanpa fence
+ARRAY_START_PATTERN = re.compile(r"\[\s*\{")
+
+async def get_user_data(uid: str):
     """
     Fetches health data and prediction data from Firestore for a given user ID.
+    Both documents are read concurrently.
     """
     try:
-        db = get_firestore_client()
-
-        # Fetch health data
-        logging.info("Fetching health data from Firestore...")
-        health_data_doc = db.collection("healthData").where(field_path="uid", op_string="==", value=uid).stream()
+        logger.info("Fetching health and prediction data from Firestore...")
+        health_data, user_prediction = await asyncio.gather(
+            get_latest_health_data(uid),
+            firestore_repository.get_user_prediction(uid),
+        )
 
-        health_data = next(health_data_doc, None)
         if not health_data:
             raise ValueError("No health data found for the user.")
-        health_data = health_data.to_dict()
-
-        # Fetch prediction data
-        logging.info("Fetching prediction data from Firestore...")
-        user_prediction_doc = db.collection("userPrediction").document(uid).get()
-
-        if not user_prediction_doc.exists:
+        if not user_prediction:
             raise ValueError("No prediction data found for the user.")
-        user_prediction = user_prediction_doc.to_dict()
 
-        logging.info(f"Health Data: {health_data}, User Prediction: {user_prediction}")
+        logger.debug("Fetched user data", extra={"health_data": health_data, "user_prediction": user_prediction})
         return health_data, user_prediction
 
     except Exception as e:
-        logging.error(f"Error fetching user data: {e}")
+        logger.error(f"Error fetching user data: {e}")
         raise RuntimeError(f"Failed to fetch user data: {e}")
 
+# Bagian statis prompt meal plan: dikirim sebagai system instruction (sekali
+# dibangun, bisa di-cache di Vertex AI), sehingga per request hanya kalori,
+# kategori berat badan dan alergi yang dikirim sebagai konten pengguna.
+MEAL_PLAN_SYSTEM_INSTRUCTION = """
+You are a professional nutritionist specializing in personalized meal planning, with a deep understanding of diverse dietary needs, cultural sensitivities and local cuisines. You create balanced meal plans tailored to specific caloric and nutritional goals while considering individual preferences, dietary restrictions and allergies. Your expertise in Indonesian cuisine ensures your recommendations are practical, affordable and easily accessible.
+
+Each request gives the user's total daily calorie intake, weight category (underweight, ideal, overweight or obese) and allergies. Generate 3 daily meal plan variations, each consisting of breakfast, lunch and dinner, customized to the weight category so the user gets an ideal daily nutrient intake.
+
+Nutritional goals:
+- Meet the given total daily calorie intake.
+- Determine the calorie distribution among breakfast, lunch and dinner dynamically.
+
+Dietary restrictions:
+- Avoid the allergy ingredients and any related items at any cost.
+- Dish names must not reference an allergy or imply its exclusion (e.g. "Bubur Ayam (tanpa ayam)", "Bubur Manis dengan Pisang dan Kacang Hijau (tanpa kacang)", "Ayam Goreng (tanpa ayam) dengan Nasi Putih dan Sayur Tumis", "Lontong Sayur Tanpa Telur dengan Ikan", "Mie Goreng Jawa (tanpa daging ayam)").
+
+Focus on Indonesian cuisine:
+- Meals must primarily feature local, affordable and readily available ingredients.
+- Follow Indonesia's balanced nutrition principle (gizi seimbang) with a balance of carbohydrates, protein, vegetables and fats.
+
+Output requirements:
+- Use Bahasa Indonesia.
+- For "ingredients" use specific measurements, for example: 1 table spoon of sugar, 2 tea spoon of water, 1 bowl of rice, 1 plate of oil, 3 cups of milk.
+- For "calories" use the "~" symbol and the word "kalori"; DO NOT USE the word "sekitar".
+- Present the 3 daily meal plans in strict JSON format:
+```json
+[{"mealPlan": [{"meal": "Breakfast", "dishName": "Dish name", "ingredients": ["Ingredient 1", "Ingredient 2"], "calories": "Dynamic"}, {"meal": "Lunch", ...}, {"meal": "Dinner", ...}]}, {"mealPlan": [...]}, {"mealPlan": [...]}]
+```
+Ensure strict JSON formatting.
+""".strip()
+
 def generate_prompt(health_data: dict, user_prediction: dict) -> str:
     """
-    Generates a text prompt based on user data and predictions using f-strings for inline formatting.
+    Builds the per-user part of the meal plan prompt. The instructions are in
+    `MEAL_PLAN_SYSTEM_INSTRUCTION`, sent by `generate_text_with_vertexai`.
     """
     try:
         # Safely retrieve values and provide default fallbacks
@@ -53,164 +90,203 @@ def generate_prompt(health_data: dict, user_prediction: dict) -> str:
             dietary_restrictions = ", ".join(dietary_restrictions)
         dietary_restrictions = str(dietary_restrictions).strip()
 
-        # Use f-strings for the prompt
-        prompt = f"""
-        You are a professional nutritionist specializing in personalized meal planning with a deep understanding 
-        of diverse dietary needs, cultural sensitivities, and local cuisines. You excel at creating balanced meal plans 
-        tailored to specific caloric and nutritional goals while considering individual preferences, dietary restrictions, 
-        and allergies. Your expertise in Indonesian cuisine ensures your recommendations are practical, affordable, and 
-        easily accessible. Your task is to generate 3 daily meal plan variations, each consisting of breakfast, lunch, 
-        and dinner. Also, you have to customized the meal based on user's weight category whether is in underweight, ideal,
-        overweight or obese to ensure that they have ideal daily nutrient intake.
-
-        Nutritional Goals:
-        - Total daily calorie intake: {total_calories} cal.
-        - User's weight category: {weight_category}.
-        - The calorie distribution among meals (breakfast, lunch, and dinner) should be dynamically determined.
-
-        Dietary Restrictions:
-        The user is allergic to {dietary_restrictions}, so avoid using this ingredient or any related items at any cost.
-        Ensure the names of dishes do not reference the user allergy or imply its exclusion (e.g., "Bubur Ayam (tanpa ayam)", "Bubur Manis dengan Pisang dan Kacang Hijau (tanpa kacang)", "Ayam Goreng (tanpa ayam) dengan Nasi Putih dan Sayur Tumis",
-        "Lontong Sayur Tanpa Telur dengan Ikan", "Mie Goreng Jawa (tanpa daging ayam)").
-        Similarly, for any other specified allergies, avoid dish names that reference excluded ingredients or imply their absence.
-
-        Focus on Indonesian Cuisine:
-        - Meals must primarily feature local, affordable, and readily available ingredients.
-        - Follow Indonesia's balanced nutrition principle (gizi seimbang) with a balance of carbohydrates, protein, vegetables, and fats.
-
-        Output Requirements:
-        - Use Bahasa Indonesia.
-        - For the "ingredients" use a specific measurements, for example: 1 table spoon of sugar, 2 tea spoon of water, 1 bowl of rice, 1 plate of oil, 3 cups of milk.
-        - For the "calories" use "~" symbol and use word "kalori", DO NOT USE the word "sekitar".
-        - Present the 3 daily meal plans in strict JSON format:
-        [
-          {{
-            "mealPlan": [
-              {{
-                "meal": "Breakfast",
-                "dishName": "Dish name",
-                "ingredients": ["Ingredient 1", "Ingredient 2"],
-                "calories": "Dynamic"
-              }},
-              {{
-                "meal": "Lunch",
-                "dishName": "Dish name",
-                "ingredients": ["Ingredient 1", "Ingredient 2"],
-                "calories": "Dynamic"
-              }},
-              {{
-                "meal": "Dinner",
-                "dishName": "Dish name",
-                "ingredients": ["Ingredient 1", "Ingredient 2"],
-                "calories": "Dynamic"
-              }}
-            ]
-          }},
-          {{"mealPlan": [...]}},
-          {{"mealPlan": [...]}},
-        ]
-
-        Ensure strict JSON formatting.
-        """
-
-        # Clean and log the generated prompt
-        prompt = prompt.strip()
-        logging.info(f"Generated Prompt: {prompt}")
+        prompt = (
+            f"Total daily calorie intake: {total_calories} cal.\n"
+            f"Weight category: {weight_category}.\n"
+            f"Allergies: {dietary_restrictions}."
+        )
+        logger.debug("Generated prompt", extra={"prompt": prompt})
         return prompt
 
     except Exception as e:
-        logging.error(f"Error generating prompt: {e}")
+        logger.error(f"Error generating prompt: {e}")
         raise RuntimeError(f"Failed to generate prompt: {e}")
 
-def generate_text_with_vertexai(prompt: str):
+async def generate_text_with_vertexai(prompt: str):
     """
-    Generates text using Vertex AI Generative Models in the us-central1 region.
+    Generates text using the shared Vertex AI client (concurrency limit,
+    deadline, hedging and region failover are handled by `vertex_client`).
     """
     try:
-        project_id = os.getenv("GOOGLE_CLOUD_PROJECT")
-        if not project_id:
-            raise RuntimeError("Environment variable 'GOOGLE_CLOUD_PROJECT' is not set.")
-
-        # Initialize Vertex AI environment
-        init(project=project_id, location="asia-southeast1")
-
-        # Initialize the generative model
-        generative_multimodal_model = GenerativeModel("gemini-1.5-pro-002")
-
-        logging.info(f"Sending prompt to Vertex AI: {repr(prompt)}")
-        response = generative_multimodal_model.generate_content([prompt])
+        logger.info("Sending prompt to Vertex AI", extra={"prompt": prompt})
+        with span("vertex"):
+            text = await vertex_client.generate(prompt, system_instruction=MEAL_PLAN_SYSTEM_INSTRUCTION, response_schema=MEAL_PLAN_SCHEMA)
 
-        if not response or not hasattr(response, "text"):
+        if not text:
             raise ValueError("Vertex AI response is empty or invalid")
 
-        logging.info(f"Received raw response from Vertex AI: {repr(response.text)}")
-        return response.text.strip()
+        logger.info("Received raw response from Vertex AI", extra={"response": text})
+        return text.strip()
 
     except Exception as e:
-        logging.error(f"Error generating text with Vertex AI: {e}")
+        logger.error(f"Error generating text with Vertex AI: {e}")
         raise RuntimeError(f"Failed to generate text: {e}")
 
+async def stream_text_with_vertexai(prompt: str):
+    """
+    Streams text chunks from Vertex AI as they are generated.
+    """
+    try:
+        logger.info("Streaming prompt to Vertex AI")
+        # Mencakup seluruh stream, termasuk waktu pengiriman ke klien
+        with span("vertex_stream"):
+            async for text in vertex_client.stream(prompt, system_instruction=MEAL_PLAN_SYSTEM_INSTRUCTION, response_schema=MEAL_PLAN_SCHEMA):
+                yield text
+
+    except Exception as e:
+        logger.error(f"Error streaming text with Vertex AI: {e}")
+        raise RuntimeError(f"Failed to stream text: {e}")
+
+class MealPlanStreamParser:
+    """
+    Incremental parser for the streamed meal plan JSON array. Text chunks are
+    fed as they arrive and every top-level `{"mealPlan": [...]}` object is
+    returned as soon as its closing brace is seen. Until the first plan has
+    been parsed, a wrong array start (a `[` in the preamble) is abandoned and
+    the text after it scanned again.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._position = 0
+        self._search_from = 0
+        self._array_start = 0
+        self._emitted = 0
+        self._started = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._object_start = None
+
+    def _find_array_start(self) -> bool:
+        # Setelah fence ```json: `[` pertama; tanpa fence: `[` yang diikuti `{`,
+        # sehingga "[three]" di teks pembuka tidak dianggap awal array
+        fence = self._buffer.find("```json", self._search_from)
+        if fence != -1:
+            start = self._buffer.find("[", fence + len("```json"))
+        else:
+            match = ARRAY_START_PATTERN.search(self._buffer, self._search_from)
+            start = match.start() if match else -1
+        if start == -1:
+            return False
+        self._started = True
+        self._array_start = start
+        self._position = start + 1
+        self._depth = 1
+        return True
+
+    def _restart(self):
+        # Awal array yang dipilih salah: cari lagi setelahnya
+        self._search_from = self._array_start + 1
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._object_start = None
+
+    def feed(self, chunk: str) -> list:
+        """
+        Adds a text chunk and returns the meal plan objects completed by it.
+        """
+        completed = []
+        if self._finished:
+            return completed
+        self._buffer += chunk
+        while self._started or self._find_array_start():
+            if self._scan(completed):
+                break
+        return completed
+
+    def _scan(self, completed: list) -> bool:
+        # False jika pemindaian harus diulang dari awal array berikutnya
+        buffer = self._buffer
+        position = self._position
+        while position < len(buffer):
+            char = buffer[position]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "[{":
+                if self._depth == 1 and char == "{":
+                    self._object_start = position
+                self._depth += 1
+            elif char in "]}":
+                self._depth -= 1
+                if self._depth == 1 and char == "}" and self._object_start is not None:
+                    try:
+                        completed.append(meal_plan_parser.parse_plan(buffer[self._object_start:position + 1]))
+                    except MealPlanParseError:
+                        if self._emitted:
+                            raise
+                        self._restart()
+                        return False
+                    self._emitted += 1
+                    self._object_start = None
+                elif self._depth == 0:
+                    if not self._emitted:
+                        self._restart()
+                        return False
+                    self._finished = True
+                    break
+            position += 1
+
+        # Buang teks yang sudah diproses, kecuali objek yang belum selesai
+        # (dan, sebelum plan pertama, teks setelah awal array untuk pemindaian ulang)
+        keep_from = self._object_start if self._object_start is not None else position
+        if not self._emitted:
+            keep_from = min(keep_from, self._array_start)
+        self._buffer = buffer[keep_from:]
+        self._position = position - keep_from
+        self._array_start -= keep_from
+        if self._object_start is not None:
+            self._object_start -= keep_from
+        return True
+
 def parse_meal_plan_response(raw_response: str):
     """
-    Parses the raw response from Vertex AI and extracts the JSON content.
-    
+    Parses and validates the meal plans in a Vertex AI response. Plain JSON
+    (JSON mode) is validated directly; fenced or slightly malformed JSON is
+    repaired by `meal_plan_parser` instead of being regenerated.
+
     Parameters:
         raw_response (str): The raw response string containing JSON.
 
     Returns:
-        dict: The parsed JSON content.
+        list: The validated meal plans.
     """
     try:
-        # Log the raw response for debugging
-        logging.info(f"Raw response received: {repr(raw_response)}")
-
-        # Extract the JSON part from the response
-        if "```json" in raw_response:
-            json_part = raw_response.split("```json")[1].strip()
-            if "```" in json_part:
-                json_part = json_part.split("```")[0].strip()
-        else:
-            raise ValueError("No JSON content found in the response.")
-
-        # Parse the extracted JSON content
-        parsed_json = json.loads(json_part)
-        logging.info(f"Parsed meal plan JSON: {parsed_json}")
+        meal_plans = meal_plan_parser.parse(raw_response)
+        logger.debug("Parsed meal plan JSON", extra={"meal_plans": meal_plans})
 
-        return parsed_json
+        return meal_plans
 
     except Exception as e:
-        logging.error(f"Failed to parse meal plan response: {e}")
+        logger.error(f"Failed to parse meal plan response: {e}")
         raise RuntimeError(f"Failed to parse meal plan response: {e}")
 
-def save_separate_meal_plans_to_firestore(uid: str, meal_plans: list):
+async def save_separate_meal_plans_to_firestore(uid: str, meal_plans: list, start_index: int = 0, background: bool = FIRESTORE_WRITE_BEHIND):
     """
     Save each meal plan variation to Firestore as a separate document with a timestamp.
+    All variations are written in one WriteBatch commit; with FIRESTORE_WRITE_BEHIND
+    the commit happens after the response is sent.
 
     Parameters:
         uid (str): The user ID to associate with the meal plans.
         meal_plans (list): The parsed meal plans to save.
+        start_index (int): Index of the first plan (the streaming endpoint saves plans one by one).
     """
     try:
-        # Initialize Firestore client
-        db = get_firestore_client()
-
-        # Iterate through the meal plans and save each as a separate document
-        for index, meal_plan in enumerate(meal_plans):
-            # Generate a unique document ID using the UID and index
-            document_id = f"{uid}_mealPlan_{index + 1}"
-
-            # Prepare the document data with a timestamp
-            document_data = {
-                "mealPlan": meal_plan.get("mealPlan", []),
-                "timestamp": datetime.utcnow().isoformat()  # Save timestamp in ISO 8601 format
-            }
-
-            # Save to Firestore under a collection named "mealPlans"
-            db.collection("mealPlans").document(document_id).set(document_data)
-
-            logging.info(f"Meal plan {index + 1} saved successfully for UID: {uid}")
+        await firestore_repository.save_meal_plans(uid, meal_plans, start_index=start_index, background=background)
+        logger.info(f"{len(meal_plans)} meal plans saved for UID: {uid}")
 
         return {"message": f"{len(meal_plans)} meal plans saved successfully", "uid": uid}
     except Exception as e:
-        logging.error(f"Error saving meal plans to Firestore: {e}")
-        raise RuntimeError(f"Failed to save meal plans to Firestore: {e}")
\ No newline at end of file
+        logger.error(f"Error saving meal plans to Firestore: {e}")
+        raise RuntimeError(f"Failed to save meal plans to Firestore: {e}")
@@ -1,48 +1,162 @@
 import os
+import time
 import tempfile
 import json
 import logging
-from fastapi import FastAPI, HTTPException, Header, Body
+import threading
+from datetime import datetime
+from fastapi import FastAPI, HTTPException, Header, Body, Query
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from fastapi.openapi.utils import get_openapi
 from auth.auth_service import (
     register_user,
     login_user,
     verify_id_token,
     logout_user,
-    refresh_user_token
+    refresh_user_token,
+    is_privileged_token,
+    start_token_verification,
+    get_auth_cache_stats
 )
-from health.models import HealthData, UserPrediction
-from health.prediction_service import save_user_prediction, get_user_health_data
-from health.health_data_service import save_health_data, get_ordered_health_data
-from services.model_service import predict_bmi_bmr
+from health.models import HealthData, UserPrediction, BatchPredictionRequest
+from health.prediction_service import (
+    save_user_prediction, get_user_health_data,
+    get_bulk_health_data, save_user_predictions_batch
+)
+from health.health_data_service import save_health_data, get_ordered_health_data, get_health_history
+from health.health_data_cache import health_data_cache
+from services.batching_service import prediction_batcher
+from services.model_service import predict_bmi_bmr_batch, warm_up_models, FEATURE_COLUMNS
 from services.gcs_service import download_models
+from services.http_client import start_http_client, close_http_client
+from services.executor_service import run_io, run_cpu, shutdown_executors, get_executor_stats
+from services.vertex_client import vertex_client
+from services.firestore_writer import firestore_writer
+from services.metrics import metrics, span, TimedRoute
+from services.logging_service import logging_pipeline
+from services.response_encoding import cached_json_response
+from services.prefork_service import prefork_server
+from services.admission_control import (
+    admission_controller, AdmissionMiddleware, vertex_breaker, firestore_breaker,
+    ADMISSION_VERTEX_QUEUE_LIMIT, ADMISSION_PREDICT_QUEUE_LIMIT
+)
 from health.text_generation_service import (
     get_user_data, generate_prompt,
-    generate_text_with_vertexai,
-    parse_meal_plan_response,
+    stream_text_with_vertexai,
+    MEAL_PLAN_SYSTEM_INSTRUCTION,
+    MealPlanStreamParser,
     save_separate_meal_plans_to_firestore
 )
-import firebase_admin
-from firebase_admin import credentials
-
-# Inisialisasi aplikasi FastAPI
+from health.meal_plan_cache import meal_plan_cache, normalize_meal_plan_inputs, normalized_prompt_inputs
+from health.meal_plan_service import create_meal_plans, get_stored_meal_plans
+from health.meal_plan_catalog import meal_plan_catalog
+from health.meal_plan_jobs import meal_plan_jobs, JobQueueFullError
+from health.meal_plan_parser import meal_plan_parser
+from config.firebase_config import warm_up_firestore
+
+# Inisialisasi aplikasi FastAPI; setiap route mencatat latensi per endpoint (lihat /metrics)
 app = FastAPI()
+app.router.route_class = TimedRoute
 
 PROJECT_ID = "sleek-backend"
-logging.basicConfig(level=logging.INFO)
+BATCH_PREDICTION_MAX_ITEMS = int(os.getenv("BATCH_PREDICTION_MAX_ITEMS", "10000"))
+# Log terstruktur (JSON) lewat antrean dan thread listener, lihat services/logging_service.py
+logging_pipeline.start()
+logger = logging.getLogger(__name__)
+
+# Admission control untuk endpoint mahal: budget per pengguna, per IP untuk token yang
+# tidak valid, dan global (token bucket),
+# batas request berjalan, load shedding saat antrean penuh, dan circuit breaker dependency
+admission_controller.register(
+    "generation", ["GET /mealPlan", "GET /mealPlan/stream", "POST /mealPlan/jobs"],
+    user_limit="0.1/3", global_limit="5/50", anonymous_limit="0.1/3", max_in_flight=64,
+    breakers=(vertex_breaker, firestore_breaker),
+    load_signals=(("vertex_queue", lambda: vertex_client.waiting, ADMISSION_VERTEX_QUEUE_LIMIT),),
+)
+admission_controller.register(
+    "inference", ["GET /predict"],
+    user_limit="2/10", global_limit="200/400", anonymous_limit="2/10", max_in_flight=512,
+    breakers=(firestore_breaker,),
+    load_signals=(("predict_queue", prediction_batcher.queue_depth, ADMISSION_PREDICT_QUEUE_LIMIT),),
+)
+app.add_middleware(
+    AdmissionMiddleware,
+    controller=admission_controller,
+    resolve_uid=lambda id_token: verify_id_token(id_token)["uid"],
+)
+
+def background_warm_up():
+    """
+    Buat Firestore client dan model Vertex AI di background agar request
+    pertama tidak menanggung biaya import dan inisialisasinya.
+    """
+    warm_up_vertex = lambda: vertex_client.warm_up(MEAL_PLAN_SYSTEM_INSTRUCTION)
+    for name, warm_up in (("firestore", warm_up_firestore), ("vertex", warm_up_vertex)):
+        started = time.perf_counter()
+        try:
+            warm_up()
+            logger.info(f"Background warm-up of {name} finished in {time.perf_counter() - started:.2f}s")
+        except Exception as e:
+            # Tidak fatal: inisialisasi diulang saat pertama kali dipakai
+            logger.warning(f"Background warm-up of {name} failed: {e}")
 
 @app.on_event("startup")
 async def startup_event():
     """
-    Unduh model dari Google Cloud Storage sebelum aplikasi berjalan.
+    Unduh model dari Google Cloud Storage (dilewati jika file lokal sudah sama),
+    lalu muat dan panaskan model sebelum aplikasi menerima request. Dalam mode
+    pre-fork, master sudah mengunduh (dan untuk backend NumPy memuat) model sebelum fork.
     """
     try:
-        print("Downloading models...")
-        download_models()
-        print("Models downloaded successfully.")
+        startup_started = time.perf_counter()
+        threading.Thread(target=background_warm_up, name="warm-up", daemon=True).start()
+
+        if prefork_server.preloaded:
+            downloads = prefork_server.downloads
+        else:
+            logger.info("Downloading models...")
+            downloads = await run_io(download_models)
+            logger.info("Models downloaded successfully.")
+        download_seconds = time.perf_counter() - startup_started
+
+        warm_up = await run_cpu(warm_up_models)
+        if meal_plan_catalog.enabled:
+            try:
+                await run_io(meal_plan_catalog.load)
+            except Exception as e:
+                # Tidak fatal: tanpa katalog meal plan di-generate langsung
+                logger.error(f"Failed to load meal plan catalog: {e}")
+
+        await prediction_batcher.start()
+        await meal_plan_jobs.start()
+        await firestore_writer.start()
+        await start_http_client()
+        start_token_verification()
+
+        breakdown = ", ".join(
+            [f"{d['blob']} {'downloaded' if d['downloaded'] else 'cached'} {d['seconds']:.2f}s" for d in downloads]
+            + [f"{stage} {seconds:.2f}s" for stage, seconds in warm_up.items()]
+        )
+        logger.info(
+            f"Startup finished in {time.perf_counter() - startup_started:.2f}s "
+            f"(models {download_seconds:.2f}s: {breakdown})"
+        )
     except Exception as e:
         raise RuntimeError(f"Failed to initialize models: {e}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """
+    Hentikan batcher prediksi, job queue, client HTTP dan executor, gagalkan permintaan yang masih mengantre.
+    Penulisan Firestore yang masih di buffer di-flush lebih dulu, log yang masih mengantre ditulis terakhir.
+    """
+    await prediction_batcher.stop()
+    await meal_plan_jobs.stop()
+    await firestore_writer.stop()
+    await close_http_client()
+    shutdown_executors()
+    logging_pipeline.stop()
+
 @app.post("/register")
 async def register(email: str = Body(...), password: str = Body(...)):
     try:
@@ -69,17 +183,46 @@ async def submit_health_data(payload: dict = Body(...), authorization: str = Hea
         raise HTTPException(status_code=401, detail="Authorization header missing")
     try:
         id_token = authorization.split("Bearer ")[-1]
-        decoded_token = verify_id_token(id_token)
+        decoded_token = await run_io(verify_id_token, id_token)
         uid = decoded_token["uid"]
 
         health_data = HealthData(**payload)
-        save_health_data(uid, health_data)
+        await save_health_data(uid, health_data)
         return {"message": "Health data saved successfully"}
     except HTTPException as e:
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/healthData/history")
+async def get_health_data_history(
+    authorization: str = Header(None),
+    start: datetime = Query(None),
+    end: datetime = Query(None),
+    resolution: str = Query("raw"),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str = Query(None),
+):
+    """
+    Riwayat data kesehatan pengguna (terlama lebih dulu) dalam rentang waktu,
+    mentah atau dirata-rata per hari/minggu/bulan (UTC). Jika `nextCursor`
+    tidak null, kirim sebagai `cursor` dengan parameter yang sama untuk halaman berikutnya.
+    """
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Authorization header missing")
+    try:
+        decoded_token = await run_io(verify_id_token, authorization.split("Bearer ")[-1])
+    except ValueError as e:
+        raise HTTPException(status_code=401, detail=str(e))
+
+    try:
+        return await get_health_history(decoded_token["uid"], start, end, resolution, limit, cursor)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        logger.error(f"Error fetching health history: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/predict")
 async def predict(authorization: str = Header(None)):
     if not authorization:
@@ -87,76 +230,320 @@ async def predict(authorization: str = Header(None)):
     try:
         # Verifikasi token
         id_token = authorization.split("Bearer ")[-1]
-        decoded_token = verify_id_token(id_token)
+        decoded_token = await run_io(verify_id_token, id_token)
         uid = decoded_token["uid"]
 
         # Ambil data kesehatan yang sudah difilter
-        input_data = get_ordered_health_data(uid)
-        print(f"Filtered and ordered input data: {input_data}")
+        input_data = await get_ordered_health_data(uid)
+        logger.debug("Filtered and ordered input data", extra={"input_data": input_data})
 
-        # Validasi dan lakukan prediksi
-        result = predict_bmi_bmr(input_data)
-        print(f"Prediction result: {result}")
+        # Validasi dan lakukan prediksi (digabung dengan request lain dalam satu batch)
+        with span("model_inference_batched"):
+            result = await prediction_batcher.predict(input_data)
+        logger.debug("Prediction result", extra={"result": result})
 
         # Simpan hasil prediksi
         user_prediction = UserPrediction(**result)
-        save_user_prediction(uid, user_prediction)
+        await save_user_prediction(uid, user_prediction)
 
         return result
     except HTTPException as he:
         raise he
     except Exception as e:
-        print(f"Unexpected error during prediction: {e}")
+        logger.error(f"Unexpected error during prediction: {e}")
         raise HTTPException(status_code=500, detail="An error occurred during prediction.")
 
+@app.post("/predict/batch")
+async def predict_batch(payload: BatchPredictionRequest, authorization: str = Header(None)):
+    """
+    Prediksi massal untuk admin/service account: banyak UID dan/atau baris fitur mentah
+    dinilai sebagai satu matriks, lalu hasil per UID disimpan dengan batched write.
+    """
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Authorization header missing")
+    try:
+        id_token = authorization.split("Bearer ")[-1]
+        try:
+            decoded_token = await run_io(verify_id_token, id_token)
+        except ValueError as ve:
+            raise HTTPException(status_code=401, detail=str(ve))
+        if not is_privileged_token(decoded_token):
+            raise HTTPException(status_code=403, detail="Admin or service account token required")
+
+        total_items = len(payload.uids) + len(payload.rows)
+        if total_items == 0:
+            raise HTTPException(status_code=422, detail="Provide at least one of 'uids' or 'rows'")
+        if total_items > BATCH_PREDICTION_MAX_ITEMS:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Too many items: {total_items} (max {BATCH_PREDICTION_MAX_ITEMS})"
+            )
+
+        # Ambil data kesehatan semua UID sekaligus
+        health_data = await get_bulk_health_data(payload.uids) if payload.uids else {}
+        found_uids = [uid for uid in dict.fromkeys(payload.uids) if uid in health_data]
+
+        # Susun satu matriks input: baris UID lalu baris fitur mentah
+        input_rows = [
+            {key: health_data[uid][key] for key in FEATURE_COLUMNS if key in health_data[uid]}
+            for uid in found_uids
+        ]
+        input_rows += [row.dict(include=set(FEATURE_COLUMNS)) for row in payload.rows]
+
+        results = await run_cpu(predict_bmi_bmr_batch, input_rows)
+        uid_results = dict(zip(found_uids, results[:len(found_uids)]))
+        row_results = results[len(found_uids):]
+
+        # Simpan hasil prediksi yang valid dalam batched write
+        if payload.save:
+            predictions = {}
+            for uid, result in uid_results.items():
+                if "error" in result:
+                    continue
+                try:
+                    predictions[uid] = UserPrediction(**result)
+                except ValueError as ve:
+                    uid_results[uid] = {"error": f"Invalid prediction: {ve}"}
+            if predictions:
+                await save_user_predictions_batch(predictions)
+
+        return {
+            "users": [
+                {"uid": uid, **uid_results.get(uid, {"error": "Health data not found."})}
+                for uid in dict.fromkeys(payload.uids)
+            ],
+            "rows": row_results
+        }
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.error(f"Unexpected error during batch prediction: {e}")
+        raise HTTPException(status_code=500, detail="An error occurred during batch prediction.")
+
 @app.get("/mealPlan")
 async def generate_meal_plan(authorization: str = Header(None)):
-    logging.info("Starting /mealPlan endpoint")
+    logger.info("Starting /mealPlan endpoint")
 
     if not authorization:
-        logging.error("Authorization header missing")
+        logger.error("Authorization header missing")
         raise HTTPException(status_code=401, detail="Authorization header missing")
 
     try:
         # Extract the user ID from the authorization token
         id_token = authorization.split("Bearer ")[-1].strip()
-        decoded_token = verify_id_token(id_token)
+        decoded_token = await run_io(verify_id_token, id_token)
         uid = decoded_token.get("uid")
 
         if not uid:
-            logging.error("Failed to decode UID from token")
+            logger.error("Failed to decode UID from token")
             raise HTTPException(status_code=401, detail="Invalid authorization token")
 
-        logging.info(f"Decoded UID: {uid}")
+        logger.info(f"Decoded UID: {uid}")
 
         # Fetch user data from Firestore
-        health_data, user_prediction = get_user_data(uid)
-
-        # Generate the prompt
-        prompt = generate_prompt(health_data, user_prediction)
-
-        # Generate text using Vertex AI
-        raw_response = generate_text_with_vertexai(prompt)
-
-        # Parse the raw response to extract meal plans
-        meal_plans = parse_meal_plan_response(raw_response)
+        health_data, user_prediction = await get_user_data(uid)
 
-        # Save each meal plan variation as a separate document in Firestore
-        save_separate_meal_plans_to_firestore(uid, meal_plans)
+        # Generate (or fetch cached) meal plans and save them to Firestore
+        meal_plans = await create_meal_plans(uid, health_data, user_prediction)
 
         # Return the parsed meal plans as a response
         return {"mealPlans": meal_plans}
 
     except ValueError as ve:
-        logging.error(f"Value error: {ve}")
+        logger.error(f"Value error: {ve}")
         raise HTTPException(status_code=400, detail=f"Value error: {ve}")
     except RuntimeError as re:
-        logging.error(f"Runtime error: {re}")
+        logger.error(f"Runtime error: {re}")
         raise HTTPException(status_code=500, detail=f"Runtime error: {re}")
     except Exception as e:
-        logging.error(f"Unexpected error: {e}")
+        logger.error(f"Unexpected error: {e}")
         raise HTTPException(status_code=500, detail=f"Unexpected error: {e}")
 
+@app.get("/mealPlans")
+async def read_meal_plans(
+    authorization: str = Header(None),
+    if_none_match: str = Header(None),
+    accept_encoding: str = Header(None),
+):
+    """
+    Meal plan yang terakhir disimpan (tanpa generate ulang), dibaca dalam satu
+    batch. Dengan ETag yang sama di `If-None-Match` jawabannya 304 tanpa body.
+    """
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Authorization header missing")
+    try:
+        decoded_token = await run_io(verify_id_token, authorization.split("Bearer ")[-1].strip())
+    except ValueError as e:
+        raise HTTPException(status_code=401, detail=str(e))
+
+    try:
+        stored = await get_stored_meal_plans(decoded_token["uid"])
+    except Exception as e:
+        logger.error(f"Error reading stored meal plans: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    if stored is None:
+        raise HTTPException(status_code=404, detail="No meal plans found. Generate them with /mealPlan first.")
+
+    payload, etag = stored
+    return cached_json_response(payload, etag, if_none_match, accept_encoding)
+
+@app.get("/mealPlan/stream")
+async def stream_meal_plan(authorization: str = Header(None)):
+    """
+    Versi streaming dari /mealPlan (NDJSON): setiap variasi meal plan dikirim dan
+    disimpan segera setelah objek JSON-nya lengkap di respons Vertex AI.
+    """
+    logger.info("Starting /mealPlan/stream endpoint")
+
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Authorization header missing")
+
+    try:
+        id_token = authorization.split("Bearer ")[-1].strip()
+        decoded_token = await run_io(verify_id_token, id_token)
+        uid = decoded_token.get("uid")
+        if not uid:
+            raise HTTPException(status_code=401, detail="Invalid authorization token")
+
+        health_data, user_prediction = await get_user_data(uid)
+    except HTTPException as he:
+        raise he
+    except ValueError as ve:
+        logger.error(f"Value error: {ve}")
+        raise HTTPException(status_code=400, detail=f"Value error: {ve}")
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {e}")
+
+    async def events():
+        started = time.perf_counter()
+        first_plan_ms = None
+        meal_plans = []
+        try:
+            cache_key = normalize_meal_plan_inputs(health_data, user_prediction)
+            cached_plans = meal_plan_catalog.find(cache_key, float(user_prediction.get("predicted_bmr", 2000)))
+            if cached_plans is None:
+                cached_plans = await meal_plan_cache.get(cache_key)
+
+            if cached_plans is not None:
+                first_plan_ms = (time.perf_counter() - started) * 1000
+                meal_plans = cached_plans
+                for index, meal_plan in enumerate(cached_plans):
+                    yield json.dumps({"event": "mealPlan", "index": index, **meal_plan}) + "\n"
+                await save_separate_meal_plans_to_firestore(uid, cached_plans)
+            else:
+                with span("generate_prompt"):
+                    prompt = generate_prompt(*normalized_prompt_inputs(cache_key))
+                parser = MealPlanStreamParser()
+                async for chunk in stream_text_with_vertexai(prompt):
+                    for meal_plan in parser.feed(chunk):
+                        index = len(meal_plans)
+                        meal_plans.append(meal_plan)
+                        if first_plan_ms is None:
+                            first_plan_ms = (time.perf_counter() - started) * 1000
+                        yield json.dumps({"event": "mealPlan", "index": index, **meal_plan}) + "\n"
+                        await save_separate_meal_plans_to_firestore(uid, [meal_plan], start_index=index)
+
+                if not meal_plans:
+                    raise RuntimeError("No meal plans found in the response.")
+                await meal_plan_cache.put(cache_key, meal_plans, time.perf_counter() - started)
+
+            total_ms = (time.perf_counter() - started) * 1000
+            logger.info(f"Streamed {len(meal_plans)} meal plans (first after {first_plan_ms:.0f} ms, total {total_ms:.0f} ms)")
+            yield json.dumps({
+                "event": "done",
+                "count": len(meal_plans),
+                "timeToFirstPlanMs": first_plan_ms,
+                "totalMs": total_ms
+            }) + "\n"
+        except Exception as e:
+            logger.error(f"Error while streaming meal plans: {e}")
+            yield json.dumps({"event": "error", "detail": str(e), "count": len(meal_plans)}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@app.post("/mealPlan/jobs", status_code=202)
+async def submit_meal_plan_job(authorization: str = Header(None)):
+    """
+    Mulai generate meal plan di background dan langsung kembalikan job id.
+    Request dengan UID dan input yang sama selama job masih berjalan memakai job yang sama.
+    """
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Authorization header missing")
+
+    try:
+        id_token = authorization.split("Bearer ")[-1].strip()
+        decoded_token = await run_io(verify_id_token, id_token)
+        uid = decoded_token.get("uid")
+        if not uid:
+            raise HTTPException(status_code=401, detail="Invalid authorization token")
+
+        health_data, user_prediction = await get_user_data(uid)
+        job, deduplicated = await meal_plan_jobs.submit(uid, health_data, user_prediction)
+        return {"jobId": job.id, "status": job.status, "deduplicated": deduplicated}
+    except HTTPException as he:
+        raise he
+    except JobQueueFullError as qe:
+        raise HTTPException(status_code=503, detail=str(qe), headers={"Retry-After": "5"})
+    except ValueError as ve:
+        logger.error(f"Value error: {ve}")
+        raise HTTPException(status_code=400, detail=f"Value error: {ve}")
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {e}")
+
+@app.get("/mealPlan/jobs/{job_id}")
+async def get_meal_plan_job(job_id: str, authorization: str = Header(None)):
+    """
+    Status dan hasil job meal plan milik pengguna.
+    """
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Authorization header missing")
+
+    try:
+        id_token = authorization.split("Bearer ")[-1].strip()
+        decoded_token = await run_io(verify_id_token, id_token)
+    except ValueError as ve:
+        raise HTTPException(status_code=401, detail=str(ve))
+
+    try:
+        job = await meal_plan_jobs.get(job_id)
+    except Exception as e:
+        logger.error(f"Error reading meal plan job {job_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {e}")
+    if job is None or job.uid != decoded_token.get("uid"):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Histogram latensi per endpoint dan tahap (verify_id_token, firestore_read,
+    generate_prompt, vertex, parse_meal_plan, firestore_write, ...) dalam format Prometheus.
+    """
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/stats")
+async def get_stats():
+    """
+    Statistik runtime: ukuran batch prediksi, kedalaman antrean dan waktu tunggu executor.
+    """
+    return {
+        "predict_batcher": prediction_batcher.get_stats(),
+        "executors": get_executor_stats(),
+        "auth": get_auth_cache_stats(),
+        "health_data_cache": health_data_cache.get_stats(),
+        "meal_plan_cache": meal_plan_cache.get_stats(),
+        "meal_plan_catalog": meal_plan_catalog.get_stats(),
+        "meal_plan_parsing": meal_plan_parser.get_stats(),
+        "vertex": vertex_client.get_stats(),
+        "meal_plan_jobs": meal_plan_jobs.get_stats(),
+        "firestore_writes": firestore_writer.get_stats(),
+        "logging": logging_pipeline.get_stats(),
+        "admission": admission_controller.get_stats(),
+        "server": prefork_server.get_stats()
+    }
+
 @app.post("/refresh")
 async def refresh_token(payload: dict = Body(...)):
     """
@@ -173,10 +560,10 @@ async def refresh_token(payload: dict = Body(...)):
 
         return refreshed_token
     except ValueError as ve:
-        logging.error(f"Value error: {ve}")
+        logger.error(f"Value error: {ve}")
         raise HTTPException(status_code=400, detail=f"Value error: {ve}")
     except Exception as e:
-        logging.error(f"Unexpected error during token refresh: {e}")
+        logger.error(f"Unexpected error during token refresh: {e}")
         raise HTTPException(status_code=500, detail=f"Unexpected error: {e}")
 
 @app.post("/logout")
@@ -195,10 +582,10 @@ async def logout(payload: dict = Body(...)):
 
         return result
     except ValueError as e:
-        logging.error(f"Value error during logout: {e}")
+        logger.error(f"Value error during logout: {e}")
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logging.error(f"Unexpected error during logout: {e}")
+        logger.error(f"Unexpected error during logout: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 def custom_openapi():
@@ -0,0 +1,73 @@
+"""
+Builds the offline meal plan catalog: one generation per (calories, weight
+category, allergy set) on the grid, through the same prompt and parser as
+/mealPlan. The result is served by `meal_plan_catalog` without calling
+Vertex AI (see health/meal_plan_catalog.py).
+
+The generator is pluggable: "vertex" (default, the shared Vertex AI client;
+VERTEX_FAKE_URL points it to benchmarks/fake_vertex_server.py) or any async
+function `module:function` taking the prompt and returning the raw response.
+
+Jalankan dari root repository:
+    python -m scripts.build_meal_plan_catalog --dry-run
+    python -m scripts.build_meal_plan_catalog --calories 1000:3200:100 --concurrency 4
+"""
+import sys
+import asyncio
+import argparse
+import importlib
+from services.model_service import BMI_CATEGORIES
+from health.meal_plan_catalog import catalog_grid, build_catalog, save_catalog, MEAL_PLAN_CATALOG_PATH
+
+# Kombinasi alergi yang paling sering diisi pengguna
+DEFAULT_ALLERGY_SETS = "none;udang;kacang;susu;telur;ikan;udang,kacang"
+
+def parse_calories(spec: str) -> list:
+    start, stop, step = (int(value) for value in spec.split(":"))
+    return list(range(start, stop + 1, step))
+
+def parse_allergy_sets(spec: str) -> list:
+    return [[] if allergies.strip().lower() == "none" else allergies.split(",") for allergies in spec.split(";")]
+
+def load_generator(name: str):
+    if name == "vertex":
+        from health.text_generation_service import generate_text_with_vertexai
+        return generate_text_with_vertexai
+    module_name, _, function_name = name.partition(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+def main(args) -> int:
+    keys = catalog_grid(
+        parse_calories(args.calories),
+        args.categories.split(",") if args.categories else [str(category) for category in BMI_CATEGORIES],
+        parse_allergy_sets(args.allergy_sets),
+    )
+    print(f"{len(keys)} catalog entries to generate")
+    if args.dry_run:
+        return 0
+
+    done = 0
+
+    def on_entry(key: tuple, error):
+        nonlocal done
+        done += 1
+        if error is not None:
+            print(f"FAILED {key}: {error}")
+        elif done % 50 == 0:
+            print(f"{done}/{len(keys)} generated")
+
+    catalog = asyncio.run(build_catalog(keys, load_generator(args.generator), args.concurrency, on_entry))
+    save_catalog(catalog, args.output)
+    print(f"Saved {len(catalog['calories'])} entries to {args.output} ({len(catalog['failures'])} failed)")
+    return 1 if catalog["failures"] and not catalog["calories"] else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calories", default="1000:3200:100", help="start:stop:step in kcal")
+    parser.add_argument("--categories", help="comma-separated weight categories (default: all model classes)")
+    parser.add_argument("--allergy-sets", default=DEFAULT_ALLERGY_SETS, help="';'-separated allergy sets, allergies separated by ','")
+    parser.add_argument("--generator", default="vertex", help='"vertex" or module:function')
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--output", default=MEAL_PLAN_CATALOG_PATH)
+    parser.add_argument("--dry-run", action="store_true", help="only print the number of entries")
+    sys.exit(main(parser.parse_args()))
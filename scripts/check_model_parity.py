@@ -0,0 +1,62 @@
+"""
+Checks that the NumPy backend produces the same predictions as TensorFlow.
+
+Jalankan dari root repository:
+    python -m scripts.check_model_parity --samples 2000 --atol 1e-3
+"""
+import sys
+import argparse
+import numpy as np
+from services.model_service import (
+    load_model,
+    CLASSIFICATION_MODEL_PATH,
+    REGRESSION_MODEL_PATH,
+)
+
+# Toleransi default: probabilitas kelas dan BMR (kalori)
+DEFAULT_ATOL = 1e-3
+DEFAULT_BMR_ATOL = 1e-2
+
+def generate_inputs(samples: int, seed: int) -> np.ndarray:
+    """
+    Random but realistic feature rows: age, gender, height_cm, weight_kg.
+    """
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.integers(10, 90, samples),
+        rng.integers(0, 2, samples),
+        rng.uniform(120, 210, samples),
+        rng.uniform(30, 180, samples),
+    ]).astype(np.float32)
+
+def check_parity(samples: int, seed: int, atol: float, bmr_atol: float) -> bool:
+    inputs = generate_inputs(samples, seed)
+    ok = True
+
+    for name, path, tolerance in [
+        ("classification", CLASSIFICATION_MODEL_PATH, atol),
+        ("regression", REGRESSION_MODEL_PATH, bmr_atol),
+    ]:
+        tf_preds = load_model(path, backend="tensorflow").predict(inputs, verbose=0)
+        np_preds = load_model(path, backend="numpy").predict(inputs)
+        max_diff = float(np.max(np.abs(tf_preds - np_preds)))
+        passed = max_diff <= tolerance
+        print(f"{name}: max abs diff {max_diff:.3e} (tolerance {tolerance:.1e}) {'OK' if passed else 'FAIL'}")
+        ok = ok and passed
+
+        if name == "classification":
+            mismatches = int(np.sum(np.argmax(tf_preds, axis=1) != np.argmax(np_preds, axis=1)))
+            print(f"classification: {mismatches} argmax mismatches out of {samples}")
+            ok = ok and mismatches == 0
+
+    return ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--samples", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--atol", type=float, default=DEFAULT_ATOL)
+    parser.add_argument("--bmr-atol", type=float, default=DEFAULT_BMR_ATOL)
+    args = parser.parse_args()
+
+    sys.exit(0 if check_parity(args.samples, args.seed, args.atol, args.bmr_atol) else 1)
@@ -0,0 +1,65 @@
+"""
+Builds the per-user 'healthDataCurrent' documents from the existing
+'healthData' history: for every uid the most recently written history
+document becomes the current one. Users that already have a current
+document are skipped unless --overwrite is given.
+
+Jalankan dari root repository:
+    python -m scripts.migrate_health_data_current --dry-run
+    python -m scripts.migrate_health_data_current
+"""
+import argparse
+from config.firebase_config import get_firestore_client
+from health.firestore_repository import (
+    HEALTH_DATA_COLLECTION,
+    HEALTH_DATA_CURRENT_COLLECTION,
+    FIRESTORE_GET_ALL_LIMIT,
+    build_current_document,
+    latest_history_documents,
+)
+
+# Batas Firestore: maksimal 500 operasi per WriteBatch
+FIRESTORE_BATCH_WRITE_LIMIT = 500
+
+def main(dry_run: bool, overwrite: bool):
+    db = get_firestore_client()
+    current_collection = db.collection(HEALTH_DATA_CURRENT_COLLECTION)
+
+    history_count = 0
+
+    def count(docs):
+        nonlocal history_count
+        for doc in docs:
+            history_count += 1
+            yield doc
+
+    latest = latest_history_documents(count(db.collection(HEALTH_DATA_COLLECTION).stream()))
+    uids = sorted(uid for uid in latest if uid)
+    print(f"Scanned {history_count} history documents for {len(uids)} users")
+
+    existing = set()
+    if not overwrite:
+        for start in range(0, len(uids), FIRESTORE_GET_ALL_LIMIT):
+            refs = [current_collection.document(uid) for uid in uids[start:start + FIRESTORE_GET_ALL_LIMIT]]
+            existing.update(doc.id for doc in db.get_all(refs) if doc.exists)
+    to_write = [uid for uid in uids if uid not in existing]
+    print(f"{len(existing)} users already have a current document, {len(to_write)} to write")
+
+    if dry_run:
+        print("Dry run, nothing written")
+        return
+
+    for start in range(0, len(to_write), FIRESTORE_BATCH_WRITE_LIMIT):
+        batch = db.batch()
+        for uid in to_write[start:start + FIRESTORE_BATCH_WRITE_LIMIT]:
+            doc = latest[uid]
+            batch.set(current_collection.document(uid), build_current_document(doc.to_dict(), doc.id, doc.update_time))
+        batch.commit()
+        print(f"Wrote {min(start + FIRESTORE_BATCH_WRITE_LIMIT, len(to_write))}/{len(to_write)} current documents")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be written")
+    parser.add_argument("--overwrite", action="store_true", help="replace existing current documents")
+    args = parser.parse_args()
+    main(args.dry_run, args.overwrite)
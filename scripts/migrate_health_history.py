@@ -0,0 +1,91 @@
+"""
+Fills the monthly 'healthHistory' buckets from the existing 'healthData'
+documents, so GET /healthData/history also covers measurements submitted
+before the buckets existed. The Firestore update time of a history document
+is its measurement time. Documents written since the buckets were deployed
+are already in them, with the app's own write time, so the deploy time is
+required as --before. Every sample carries the ID of its 'healthData'
+document, and samples already in a bucket are skipped, so running the
+migration again does not duplicate them.
+
+Jalankan dari root repository:
+    python -m scripts.migrate_health_history --before 2026-10-20T00:00:00Z --dry-run
+    python -m scripts.migrate_health_history --before 2026-10-20T00:00:00Z
+"""
+import argparse
+from datetime import datetime
+from google.cloud.firestore import ArrayUnion
+from config.firebase_config import get_firestore_client
+from health.firestore_repository import HEALTH_DATA_COLLECTION, HEALTH_HISTORY_COLLECTION
+from health.health_history import build_sample, bucket_month
+
+# Batas Firestore: maksimal 500 operasi per WriteBatch, get_all dipecah per 100 dokumen
+FIRESTORE_BATCH_WRITE_LIMIT = 500
+FIRESTORE_GET_ALL_LIMIT = 100
+
+def existing_samples(db, keys: list) -> dict:
+    """
+    {(uid, month): (sample IDs, times of samples without an ID)} of the
+    buckets that already exist. Samples without an ID were written by an
+    earlier version of this migration.
+    """
+    existing = {}
+    for start in range(0, len(keys), FIRESTORE_GET_ALL_LIMIT):
+        refs = [db.collection(HEALTH_HISTORY_COLLECTION).document(f"{uid}_{month}") for uid, month in keys[start:start + FIRESTORE_GET_ALL_LIMIT]]
+        for doc in db.get_all(refs):
+            if doc.exists:
+                data = doc.to_dict()
+                samples = data.get("samples", [])
+                existing[data["uid"], data["month"]] = (
+                    {sample["id"] for sample in samples if "id" in sample},
+                    {sample.get("t") for sample in samples if "id" not in sample},
+                )
+    return existing
+
+def main(dry_run: bool, before: datetime):
+    db = get_firestore_client()
+
+    buckets = {}
+    history_count = 0
+    for doc in db.collection(HEALTH_DATA_COLLECTION).stream():
+        data = doc.to_dict()
+        if not data.get("uid") or doc.update_time >= before:
+            continue
+        history_count += 1
+        key = (data["uid"], bucket_month(doc.update_time))
+        buckets.setdefault(key, []).append(build_sample(data, doc.update_time, doc.id))
+
+    skipped = 0
+    for key, (ids, legacy_times) in existing_samples(db, sorted(buckets)).items():
+        missing = [sample for sample in buckets[key] if sample["id"] not in ids and sample["t"] not in legacy_times]
+        skipped += len(buckets[key]) - len(missing)
+        if missing:
+            buckets[key] = missing
+        else:
+            del buckets[key]
+    users = len({uid for uid, _ in buckets})
+    print(f"Scanned {history_count} history documents ({skipped} already migrated): {len(buckets)} monthly buckets for {users} users")
+
+    if dry_run:
+        print("Dry run, nothing written")
+        return
+
+    keys = sorted(buckets)
+    for start in range(0, len(keys), FIRESTORE_BATCH_WRITE_LIMIT):
+        batch = db.batch()
+        for uid, month in keys[start:start + FIRESTORE_BATCH_WRITE_LIMIT]:
+            batch.set(
+                db.collection(HEALTH_HISTORY_COLLECTION).document(f"{uid}_{month}"),
+                {"uid": uid, "month": month, "samples": ArrayUnion(buckets[uid, month])},
+                merge=True,
+            )
+        batch.commit()
+        print(f"Wrote {min(start + FIRESTORE_BATCH_WRITE_LIMIT, len(keys))}/{len(keys)} buckets")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be written")
+    parser.add_argument("--before", required=True, type=lambda value: datetime.fromisoformat(value.replace("Z", "+00:00")),
+                        help="deploy time of the history buckets: only documents written before it are migrated (ISO 8601 with timezone)")
+    args = parser.parse_args()
+    main(args.dry_run, args.before)
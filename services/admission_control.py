@@ -0,0 +1,461 @@
+import os
+import json
+import math
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+from services.executor_service import run_io
+from services.metrics import metrics
+
+# Konfigurasi admission control. Budget per kelas endpoint dibaca dari
+# RATE_LIMIT_<KELAS>_USER / RATE_LIMIT_<KELAS>_GLOBAL dengan format
+# "token_per_detik/burst" (kosong atau 0 = tanpa batas), dan batas request
+# yang sedang berjalan dari ADMISSION_MAX_IN_FLIGHT_<KELAS>.
+ADMISSION_CONTROL_ENABLED = os.getenv("ADMISSION_CONTROL_ENABLED", "true").lower() == "true"
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")  # backend bersama (opsional, butuh paket redis)
+
+# Circuit breaker: terbuka jika tingkat error dalam jendela waktu melewati ambang
+CIRCUIT_BREAKER_ERROR_RATE = float(os.getenv("CIRCUIT_BREAKER_ERROR_RATE", "0.5"))
+CIRCUIT_BREAKER_MIN_CALLS = int(os.getenv("CIRCUIT_BREAKER_MIN_CALLS", "10"))
+CIRCUIT_BREAKER_WINDOW = float(os.getenv("CIRCUIT_BREAKER_WINDOW", "30"))
+CIRCUIT_BREAKER_COOLDOWN = float(os.getenv("CIRCUIT_BREAKER_COOLDOWN", "15"))
+
+# Load shedding: tolak request baru jika antrean dependency sudah sepanjang ini
+ADMISSION_VERTEX_QUEUE_LIMIT = int(os.getenv("ADMISSION_VERTEX_QUEUE_LIMIT", "32"))
+ADMISSION_PREDICT_QUEUE_LIMIT = int(os.getenv("ADMISSION_PREDICT_QUEUE_LIMIT", "1000"))
+
+# Jumlah proxy tepercaya di depan aplikasi (Cloud Run: 1); IP klien adalah entri
+# X-Forwarded-For ke-N dari kanan, karena entri di kirinya bisa diisi klien sendiri
+ADMISSION_TRUSTED_PROXY_HOPS = int(os.getenv("ADMISSION_TRUSTED_PROXY_HOPS", "1"))
+
+def parse_limit(spec: str):
+    """
+    Parses "rate/burst" (tokens per second / bucket size) into a tuple, or None for no limit.
+    """
+    if not spec or not spec.strip():
+        return None
+    rate, _, burst = spec.partition("/")
+    rate = float(rate)
+    if rate <= 0:
+        return None
+    return rate, float(burst) if burst else max(rate, 1.0)
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, burst: float, now: float):
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, rate: float, burst: float, now: float, cost: float = 1.0) -> float:
+        """
+        Takes `cost` tokens. Returns 0 when allowed, otherwise the seconds until enough tokens are available.
+        """
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / rate
+
+class InMemoryRateLimitBackend:
+    """
+    Token buckets in this process, at most `max_keys` (least recently used are dropped).
+    """
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def consume(self, key: str, rate: float, burst: float, cost: float = 1.0) -> float:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(burst, now)
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            return bucket.take(rate, burst, now, cost)
+
+class RedisRateLimitBackend:
+    """
+    Token buckets shared by all instances, kept in Redis and updated atomically
+    by a Lua script. Falls back to the in-process buckets while Redis fails.
+    """
+
+    SCRIPT = """
+    local rate = tonumber(ARGV[1])
+    local burst = tonumber(ARGV[2])
+    local cost = tonumber(ARGV[3])
+    local time = redis.call('TIME')
+    local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(state[1]) or burst
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+    local wait = 0
+    if tokens >= cost then tokens = tokens - cost else wait = (cost - tokens) / rate end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+    return tostring(wait)
+    """
+
+    def __init__(self, url: str, prefix: str = "sleek:ratelimit:"):
+        # Import di sini: redis hanya dibutuhkan jika backend bersama dipakai
+        import redis.asyncio as redis
+
+        self.prefix = prefix
+        self._client = redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+        self._fallback = InMemoryRateLimitBackend()
+        self.errors = 0
+
+    async def consume(self, key: str, rate: float, burst: float, cost: float = 1.0) -> float:
+        try:
+            return float(await self._script(keys=[self.prefix + key], args=[rate, burst, cost]))
+        except Exception as e:
+            self.errors += 1
+            logging.warning(f"Redis rate limit backend failed ({e}), using in-process buckets")
+            return await self._fallback.consume(key, rate, burst, cost)
+
+def create_rate_limit_backend():
+    if RATE_LIMIT_REDIS_URL:
+        try:
+            return RedisRateLimitBackend(RATE_LIMIT_REDIS_URL)
+        except ImportError:
+            logging.warning("RATE_LIMIT_REDIS_URL is set but the redis package is not installed; using in-process rate limits")
+    return InMemoryRateLimitBackend()
+
+class CircuitBreaker:
+    """
+    Opens when at least `min_calls` outcomes in the last `window` seconds
+    have an error rate of `error_rate` or more. While open, one probe is let
+    through per `cooldown`; a successful call closes the breaker again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        error_rate: float = CIRCUIT_BREAKER_ERROR_RATE,
+        min_calls: int = CIRCUIT_BREAKER_MIN_CALLS,
+        window: float = CIRCUIT_BREAKER_WINDOW,
+        cooldown: float = CIRCUIT_BREAKER_COOLDOWN,
+    ):
+        self.name = name
+        self.error_rate = error_rate
+        self.min_calls = max(min_calls, 1)
+        self.window = window
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._outcomes = deque()
+        self._failures = 0
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.opens = 0
+
+    def _prune(self, now: float):
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            _, ok = self._outcomes.popleft()
+            self._failures -= not ok
+
+    def record(self, ok: bool):
+        now = time.monotonic()
+        with self._lock:
+            if self.state == "open":
+                if ok:
+                    self.state = "closed"
+                    self._outcomes.clear()
+                    self._failures = 0
+                    logging.info(f"Circuit breaker '{self.name}' closed")
+                else:
+                    self.opened_at = now
+                return
+
+            self._outcomes.append((now, ok))
+            self._failures += not ok
+            self._prune(now)
+            calls = len(self._outcomes)
+            if calls >= self.min_calls and self._failures / calls >= self.error_rate:
+                self.state = "open"
+                self.opened_at = now
+                self.opens += 1
+                logging.warning(f"Circuit breaker '{self.name}' opened ({self._failures}/{calls} calls failed)")
+
+    def allow(self) -> float:
+        """
+        Returns 0 when a call may proceed, otherwise the seconds until the next probe.
+        """
+        if self.state == "closed":
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            if self.state == "closed":
+                return 0.0
+            remaining = self.cooldown - (now - self.opened_at)
+            if remaining <= 0:
+                # Probe: satu request diteruskan, berikutnya menunggu cooldown lagi
+                self.opened_at = now
+                return 0.0
+            return remaining
+
+    def track(self, ignore: tuple = ()):
+        """
+        Records the outcome of a block; cancellation and exceptions of the
+        `ignore` types (local capacity errors, not failures of the
+        dependency) are not counted:
+
+            with firestore_breaker.track():
+                await batch.commit()
+        """
+        return _Outcome(self, ignore)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            self._prune(time.monotonic())
+            calls = len(self._outcomes)
+            return {
+                "state": self.state,
+                "opens": self.opens,
+                "window_calls": calls,
+                "window_error_rate": self._failures / calls if calls else 0.0,
+            }
+
+class _Outcome:
+    __slots__ = ("breaker", "ignore")
+
+    def __init__(self, breaker: CircuitBreaker, ignore: tuple = ()):
+        self.breaker = breaker
+        self.ignore = ignore
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.breaker.record(True)
+        elif issubclass(exc_type, Exception) and not issubclass(exc_type, self.ignore):
+            self.breaker.record(False)
+        return False
+
+class EndpointClass:
+    """
+    Budgets, concurrency limit, load signals and circuit breakers shared by a group of endpoints.
+    """
+
+    def __init__(self, name: str, user_limit, global_limit, max_in_flight: int, breakers: list, load_signals: list, anonymous_limit=None):
+        self.name = name
+        self.user_limit = user_limit
+        self.global_limit = global_limit
+        self.anonymous_limit = anonymous_limit
+        self.max_in_flight = max_in_flight
+        self.breakers = breakers
+        self.load_signals = load_signals
+        self.in_flight = 0
+
+        # Metrik
+        self.admitted = 0
+        self.rejected = {}
+
+    def reject(self, reason: str, status: int, detail: str, retry_after: float) -> tuple:
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        return status, detail, retry_after
+
+    def get_stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "user_limit": self.user_limit,
+            "global_limit": self.global_limit,
+            "anonymous_limit": self.anonymous_limit,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+        }
+
+class AdmissionController:
+    """
+    Decides per request whether an expensive endpoint may run: open circuit
+    breakers and overload fail fast with 503, per-user budgets with 429 and
+    the global budget with 503, all with a `Retry-After` header.
+    """
+
+    def __init__(self, backend=None, enabled: bool = ADMISSION_CONTROL_ENABLED):
+        self._backend = backend
+        self.enabled = enabled
+        self.classes = {}
+        self._routes = {}
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = create_rate_limit_backend()
+        return self._backend
+
+    @backend.setter
+    def backend(self, backend):
+        self._backend = backend
+
+    def register(
+        self,
+        name: str,
+        routes: list,
+        user_limit: str = "",
+        global_limit: str = "",
+        max_in_flight: int = 0,
+        breakers: tuple = (),
+        load_signals: tuple = (),
+        anonymous_limit: str = "",
+    ) -> EndpointClass:
+        """
+        Registers an endpoint class for `routes` ("GET /mealPlan"). The limits
+        given here are defaults, overridden by the environment variables of
+        the class. `anonymous_limit` is the budget per client IP for requests
+        without a resolvable uid. `load_signals` are (name, callable, limit)
+        tuples: the class sheds load while a callable returns more than its limit.
+        """
+        env_name = name.upper()
+        endpoint_class = EndpointClass(
+            name,
+            parse_limit(os.getenv(f"RATE_LIMIT_{env_name}_USER", user_limit)),
+            parse_limit(os.getenv(f"RATE_LIMIT_{env_name}_GLOBAL", global_limit)),
+            int(os.getenv(f"ADMISSION_MAX_IN_FLIGHT_{env_name}", str(max_in_flight))),
+            list(breakers),
+            list(load_signals),
+            parse_limit(os.getenv(f"RATE_LIMIT_{env_name}_ANONYMOUS", anonymous_limit)),
+        )
+        self.classes[name] = endpoint_class
+        for route in routes:
+            method, path = route.split(" ", 1)
+            self._routes[(method, path)] = endpoint_class
+        return endpoint_class
+
+    def classify(self, method: str, path: str):
+        return self._routes.get((method, path))
+
+    async def admit(self, endpoint_class: EndpointClass, uid: str = None, client: str = None):
+        """
+        Returns None when the request is admitted, otherwise (status, detail, retry_after).
+        A request without uid but with a `client` address spends that client's
+        anonymous budget instead of the global one, so requests with invalid
+        tokens (answered 401 by the handler) cannot drain the budget of real users.
+        """
+        for breaker in endpoint_class.breakers:
+            wait = breaker.allow()
+            if wait > 0:
+                return endpoint_class.reject("circuit_open", 503, f"{breaker.name} is unavailable, try again later", wait)
+
+        if endpoint_class.max_in_flight and endpoint_class.in_flight >= endpoint_class.max_in_flight:
+            return endpoint_class.reject("overloaded", 503, "Server is busy, try again later", 1.0)
+        for name, signal, limit in endpoint_class.load_signals:
+            if signal() > limit:
+                return endpoint_class.reject(name, 503, "Server is busy, try again later", 1.0)
+
+        if endpoint_class.user_limit and uid:
+            wait = await self.backend.consume(f"{endpoint_class.name}:user:{uid}", *endpoint_class.user_limit)
+            if wait > 0:
+                return endpoint_class.reject("user_rate_limit", 429, "Too many requests, try again later", wait)
+        elif endpoint_class.anonymous_limit and client:
+            wait = await self.backend.consume(f"{endpoint_class.name}:anonymous:{client}", *endpoint_class.anonymous_limit)
+            if wait > 0:
+                return endpoint_class.reject("anonymous_rate_limit", 429, "Too many requests, try again later", wait)
+            endpoint_class.admitted += 1
+            return None
+        if endpoint_class.global_limit:
+            wait = await self.backend.consume(f"{endpoint_class.name}:global", *endpoint_class.global_limit)
+            if wait > 0:
+                return endpoint_class.reject("global_rate_limit", 503, "Server is busy, try again later", wait)
+
+        endpoint_class.admitted += 1
+        return None
+
+    def get_stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "backend": type(self._backend).__name__ if self._backend else None,
+            "classes": {name: endpoint_class.get_stats() for name, endpoint_class in self.classes.items()},
+            "circuit_breakers": {name: breaker.get_stats() for name, breaker in circuit_breakers.items()},
+        }
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware in front of the routes. `resolve_uid(id_token)` returns
+    the uid of a bearer token (verified, so one user cannot spend another
+    user's budget); requests it cannot resolve count against the anonymous
+    budget of the client IP, or the global budget if the class has none.
+    """
+
+    def __init__(self, app, controller: AdmissionController, resolve_uid=None):
+        self.app = app
+        self.controller = controller
+        self.resolve_uid = resolve_uid
+
+    async def _uid(self, scope):
+        if self.resolve_uid is None:
+            return None
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                id_token = value.decode("latin-1").split("Bearer ")[-1].strip()
+                try:
+                    return await run_io(self.resolve_uid, id_token)
+                except Exception:
+                    # Token tidak valid: handler yang menjawab 401
+                    return None
+        return None
+
+    @staticmethod
+    def _client(scope):
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-for":
+                hops = [hop.strip() for hop in value.decode("latin-1").split(",") if hop.strip()]
+                if hops and ADMISSION_TRUSTED_PROXY_HOPS > 0:
+                    return hops[-min(ADMISSION_TRUSTED_PROXY_HOPS, len(hops))]
+        client = scope.get("client")
+        return client[0] if client else None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.controller.enabled:
+            await self.app(scope, receive, send)
+            return
+        endpoint_class = self.controller.classify(scope["method"], scope["path"])
+        if endpoint_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        uid = await self._uid(scope) if endpoint_class.user_limit else None
+        client = self._client(scope) if uid is None and endpoint_class.anonymous_limit else None
+        rejection = await self.controller.admit(endpoint_class, uid, client)
+        if rejection is not None:
+            metrics.count_request(scope["path"], rejection[0])
+            await _send_rejection(send, *rejection)
+            return
+
+        endpoint_class.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            endpoint_class.in_flight -= 1
+
+async def _send_rejection(send, status: int, detail: str, retry_after: float):
+    body = json.dumps({"detail": detail}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+            (b"retry-after", str(max(math.ceil(retry_after), 1)).encode("latin-1")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+# Circuit breaker per dependency; hasil panggilan dicatat oleh client masing-masing
+vertex_breaker = CircuitBreaker("vertex")
+firestore_breaker = CircuitBreaker("firestore")
+circuit_breakers = {breaker.name: breaker for breaker in (vertex_breaker, firestore_breaker)}
+
+# Controller global; kelas endpoint didaftarkan di main.py
+admission_controller = AdmissionController()
@@ -0,0 +1,124 @@
+import os
+import time
+import asyncio
+import logging
+from services.model_service import predict_bmi_bmr_batch
+from services.executor_service import run_cpu
+
+# Konfigurasi micro-batching untuk /predict
+PREDICT_BATCH_WINDOW_MS = float(os.getenv("PREDICT_BATCH_WINDOW_MS", "5"))
+PREDICT_BATCH_MAX_SIZE = int(os.getenv("PREDICT_BATCH_MAX_SIZE", "32"))
+
+class PredictionBatcher:
+    """
+    Collects concurrent prediction requests for a short window (or until the
+    batch is full) and runs both models once per batch.
+    """
+
+    def __init__(self, window_ms: float = PREDICT_BATCH_WINDOW_MS, max_batch_size: int = PREDICT_BATCH_MAX_SIZE):
+        self.window = max(window_ms, 0) / 1000
+        self.max_batch_size = max(max_batch_size, 1)
+        self._queue = None
+        self._worker = None
+        # Batch yang sudah diambil dari antrean dan belum selesai diproses
+        self._batch = None
+
+        # Statistik batch dan waktu tunggu antrean
+        self.batch_count = 0
+        self.request_count = 0
+        self.max_batch_seen = 0
+        self.total_queue_wait = 0.0
+        self.max_queue_wait = 0.0
+
+    async def start(self):
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+            logging.info(
+                f"Prediction batcher started (window={self.window * 1000:.1f} ms, max_batch_size={self.max_batch_size})"
+            )
+
+    async def stop(self):
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+        # Gagalkan permintaan di batch yang terputus dan yang masih menunggu di antrean
+        pending = self._batch or []
+        self._batch = None
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for _, future, _ in pending:
+            if not future.done():
+                future.set_exception(RuntimeError("Prediction batcher stopped"))
+
+    async def predict(self, input_data: dict) -> dict:
+        """
+        Queues a single input and waits for its own result from the batch.
+        """
+        await self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((input_data, future, time.perf_counter()))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = self._batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._process(batch)
+            self._batch = None
+
+    async def _process(self, batch: list):
+        started = time.perf_counter()
+        for _, _, enqueued_at in batch:
+            wait = started - enqueued_at
+            self.total_queue_wait += wait
+            self.max_queue_wait = max(self.max_queue_wait, wait)
+        self.batch_count += 1
+        self.request_count += len(batch)
+        self.max_batch_seen = max(self.max_batch_seen, len(batch))
+
+        try:
+            results = await run_cpu(predict_bmi_bmr_batch, [input_data for input_data, _, _ in batch])
+        except Exception as e:
+            logging.error(f"Batch prediction failed: {e}")
+            results = [{"error": str(e)}] * len(batch)
+
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def get_stats(self) -> dict:
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch_size": self.max_batch_size,
+            "batches": self.batch_count,
+            "requests": self.request_count,
+            "avg_batch_size": self.request_count / self.batch_count if self.batch_count else 0.0,
+            "max_batch_seen": self.max_batch_seen,
+            "avg_queue_wait_ms": self.total_queue_wait / self.request_count * 1000 if self.request_count else 0.0,
+            "max_queue_wait_ms": self.max_queue_wait * 1000,
+            "queue_depth": self.queue_depth(),
+        }
+
+# Instance global yang dipakai oleh endpoint /predict
+prediction_batcher = PredictionBatcher()
@@ -0,0 +1,186 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+# Ukuran pool dan batas antrean, bisa diatur lewat environment variable
+IO_POOL_SIZE = int(os.getenv("IO_POOL_SIZE", "32"))
+CPU_POOL_SIZE = int(os.getenv("CPU_POOL_SIZE", str(os.cpu_count() or 2)))
+GENERATION_POOL_SIZE = int(os.getenv("GENERATION_POOL_SIZE", "16"))
+EXECUTOR_MAX_QUEUE = int(os.getenv("EXECUTOR_MAX_QUEUE", "1000"))
+
+class ExecutorSaturatedError(RuntimeError):
+    """
+    Raised when a pool already has `max_queue` tasks waiting for a thread.
+    """
+
+class ManagedExecutor:
+    """
+    Thread pool with a bounded wait queue and queue-depth / wait-time metrics.
+    Blocking calls are awaited from async handlers without stalling the event loop.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int = EXECUTOR_MAX_QUEUE):
+        self.name = name
+        self.max_workers = max(max_workers, 1)
+        self.max_queue = max_queue
+        self._executor = None
+        self._lock = threading.Lock()
+
+        # Metrik
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_run = 0.0
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"{self.name}-pool")
+        return self._executor
+
+    def _call(self, enqueued_at: float, func, args, kwargs):
+        started = time.perf_counter()
+        wait = started - enqueued_at
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+        try:
+            result = func(*args, **kwargs)
+        except BaseException:
+            with self._lock:
+                self.failed += 1
+            raise
+        else:
+            with self._lock:
+                self.completed += 1
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.total_run += time.perf_counter() - started
+        return result
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Runs `func(*args, **kwargs)` in this pool and awaits its result.
+        """
+        with self._lock:
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                raise ExecutorSaturatedError(f"{self.name} executor queue is full ({self.queued} waiting)")
+            self.queued += 1
+
+        try:
+            # Salin context agar contextvars (misalnya endpoint untuk metrik) ikut ke thread
+            context = contextvars.copy_context()
+            future = self._get_executor().submit(context.run, self._call, time.perf_counter(), func, args, kwargs)
+        except RuntimeError:
+            # Executor sudah dimatikan, task tidak pernah dijalankan
+            with self._lock:
+                self.queued -= 1
+            raise
+
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # Request dibatalkan sebelum task mulai: keluarkan dari antrean
+            if future.cancel():
+                with self._lock:
+                    self.queued -= 1
+            raise
+
+    async def stream(self, func, *args, **kwargs):
+        """
+        Runs a blocking generator `func(*args, stop_event=..., **kwargs)` in this
+        pool and yields its items as they are produced. Closing the async
+        generator sets `stop_event` so the producer thread can stop early.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        stop_event = threading.Event()
+        finished = object()
+
+        def produce():
+            try:
+                for item in func(*args, stop_event=stop_event, **kwargs):
+                    if stop_event.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, (item, None))
+            except BaseException as e:
+                loop.call_soon_threadsafe(queue.put_nowait, (finished, e))
+                return
+            loop.call_soon_threadsafe(queue.put_nowait, (finished, None))
+
+        def on_done(task):
+            # Task gagal sebelum produce berjalan (misalnya antrean penuh)
+            if not task.cancelled() and task.exception() is not None:
+                queue.put_nowait((finished, task.exception()))
+
+        producer = asyncio.ensure_future(self.run(produce))
+        producer.add_done_callback(on_done)
+        try:
+            while True:
+                item, error = await queue.get()
+                if item is finished:
+                    if error is not None:
+                        raise error
+                    return
+                yield item
+        finally:
+            stop_event.set()
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            # Waktu tunggu dan eksekusi dihitung untuk semua task yang sudah berjalan, termasuk yang gagal
+            finished = self.completed + self.failed
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queue_depth": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "avg_wait_ms": self.total_wait / finished * 1000 if finished else 0.0,
+                "max_wait_ms": self.max_wait * 1000,
+                "avg_run_ms": self.total_run / finished * 1000 if finished else 0.0,
+            }
+
+# Pool terpisah: I/O (Firestore, Firebase Auth, GCS), CPU (inferensi model),
+# dan generation (Vertex AI) agar panggilan Vertex yang lama tidak memakan thread I/O.
+io_executor = ManagedExecutor("io", IO_POOL_SIZE)
+cpu_executor = ManagedExecutor("cpu", CPU_POOL_SIZE)
+generation_executor = ManagedExecutor("generation", GENERATION_POOL_SIZE)
+
+async def run_io(func, *args, **kwargs):
+    return await io_executor.run(func, *args, **kwargs)
+
+async def run_cpu(func, *args, **kwargs):
+    return await cpu_executor.run(func, *args, **kwargs)
+
+async def run_generation(func, *args, **kwargs):
+    return await generation_executor.run(func, *args, **kwargs)
+
+def stream_generation(func, *args, **kwargs):
+    return generation_executor.stream(func, *args, **kwargs)
+
+def shutdown_executors(wait: bool = True):
+    for executor in (io_executor, cpu_executor, generation_executor):
+        executor.shutdown(wait=wait)
+    logging.info("Executors shut down")
+
+def get_executor_stats() -> dict:
+    return {executor.name: executor.get_stats() for executor in (io_executor, cpu_executor, generation_executor)}
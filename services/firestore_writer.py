@@ -0,0 +1,190 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from config.firebase_config import get_async_firestore_client
+from services.admission_control import firestore_breaker
+
+# Konfigurasi pipeline penulisan Firestore
+FIRESTORE_WRITE_BEHIND = os.getenv("FIRESTORE_WRITE_BEHIND", "false").lower() == "true"
+FIRESTORE_WRITE_BUFFER_SIZE = int(os.getenv("FIRESTORE_WRITE_BUFFER_SIZE", "1000"))
+FIRESTORE_WRITE_WORKERS = int(os.getenv("FIRESTORE_WRITE_WORKERS", "2"))
+FIRESTORE_WRITE_RETRIES = int(os.getenv("FIRESTORE_WRITE_RETRIES", "3"))
+FIRESTORE_WRITE_RETRY_BACKOFF = 0.2
+
+# Batas Firestore: maksimal 500 operasi per WriteBatch
+FIRESTORE_BATCH_WRITE_LIMIT = 500
+
+class WriteOp:
+    """
+    One `set` of a whole document, or of the given fields with `merge=True`.
+    """
+
+    __slots__ = ("collection", "document_id", "data", "merge")
+
+    def __init__(self, collection: str, document_id: str, data: dict, merge: bool = False):
+        self.collection = collection
+        self.document_id = document_id
+        self.data = data
+        self.merge = merge
+
+class FirestoreWriter:
+    """
+    Groups Firestore writes into WriteBatch commits. Writes that are queued
+    while a commit is in flight go into the next commit together (group
+    commit). With `background=True` the caller does not wait: the write is
+    buffered, retried on failure and flushed on shutdown.
+    """
+
+    def __init__(
+        self,
+        max_buffer: int = FIRESTORE_WRITE_BUFFER_SIZE,
+        workers: int = FIRESTORE_WRITE_WORKERS,
+        max_retries: int = FIRESTORE_WRITE_RETRIES,
+        client_factory=get_async_firestore_client,
+    ):
+        self.client_factory = client_factory
+        self.max_buffer = max_buffer
+        self.worker_count = max(workers, 1)
+        self.max_retries = max(max_retries, 0)
+        self._queue = None
+        self._workers = []
+
+        # Metrik
+        self.commits = 0
+        self.ops_written = 0
+        self.retries = 0
+        self.failed_ops = 0
+        self.buffer_full = 0
+        self.deferred_writes = 0
+        self.deferred_write_seconds = 0.0
+        self.total_commit_seconds = 0.0
+
+    async def start(self):
+        if not self._workers:
+            self._queue = asyncio.Queue()
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+            logging.info(f"Firestore writer started with {self.worker_count} workers (write-behind={FIRESTORE_WRITE_BEHIND})")
+
+    async def stop(self):
+        """
+        Flushes buffered writes, then stops the workers.
+        """
+        if not self._workers:
+            return
+        await self._queue.join()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def commit(self, ops: list):
+        """
+        Writes `ops` in WriteBatch commits of at most 500 operations,
+        retrying with backoff (every op is an idempotent `set`; merged
+        array fields only use ArrayUnion, which does not add duplicates).
+        """
+        db = self.client_factory()
+        for start in range(0, len(ops), FIRESTORE_BATCH_WRITE_LIMIT):
+            chunk = ops[start:start + FIRESTORE_BATCH_WRITE_LIMIT]
+            for attempt in range(self.max_retries + 1):
+                started = time.perf_counter()
+                try:
+                    batch = db.batch()
+                    for op in chunk:
+                        batch.set(db.collection(op.collection).document(op.document_id), op.data, merge=op.merge)
+                    with firestore_breaker.track():
+                        await batch.commit()
+                    break
+                except Exception as e:
+                    if attempt == self.max_retries:
+                        raise
+                    self.retries += 1
+                    delay = FIRESTORE_WRITE_RETRY_BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.5)
+                    logging.warning(f"Firestore commit failed ({e}), retrying in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+                finally:
+                    self.total_commit_seconds += time.perf_counter() - started
+            self.commits += 1
+            self.ops_written += len(chunk)
+
+    async def write(self, ops: list, background: bool = False):
+        """
+        Writes `ops` through the pipeline. With `background=True` returns as
+        soon as the ops are buffered; when the buffer is full the write runs
+        inline instead of being dropped.
+        """
+        if not ops:
+            return
+        if not self._workers:
+            await self.commit(ops)
+            return
+
+        if background:
+            if self._queue.qsize() >= self.max_buffer:
+                self.buffer_full += 1
+                await self.commit(ops)
+                return
+            self._queue.put_nowait((ops, None))
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((ops, future))
+        await future
+
+    async def _worker(self):
+        carry = None
+        while True:
+            items = [carry or await self._queue.get()]
+            carry = None
+            ops = list(items[0][0])
+            # Gabungkan penulisan yang sudah mengantre ke commit yang sama
+            while not self._queue.empty():
+                item = self._queue.get_nowait()
+                if len(ops) + len(item[0]) > FIRESTORE_BATCH_WRITE_LIMIT:
+                    carry = item
+                    break
+                items.append(item)
+                ops.extend(item[0])
+
+            started = time.perf_counter()
+            try:
+                await self.commit(ops)
+                error = None
+            except Exception as e:
+                error = e
+            elapsed = time.perf_counter() - started
+
+            for item_ops, future in items:
+                if future is None:
+                    if error is None:
+                        self.deferred_writes += 1
+                        self.deferred_write_seconds += elapsed
+                    else:
+                        self.failed_ops += len(item_ops)
+                        logging.error(f"Dropped {len(item_ops)} background Firestore writes: {error}")
+                elif not future.done():
+                    if error is None:
+                        future.set_result(None)
+                    else:
+                        future.set_exception(error)
+                self._queue.task_done()
+
+    def get_stats(self) -> dict:
+        return {
+            "write_behind": FIRESTORE_WRITE_BEHIND,
+            "buffered": self._queue.qsize() if self._queue else 0,
+            "commits": self.commits,
+            "ops_written": self.ops_written,
+            "avg_ops_per_commit": self.ops_written / self.commits if self.commits else 0.0,
+            "avg_commit_ms": self.total_commit_seconds / self.commits * 1000 if self.commits else 0.0,
+            "retries": self.retries,
+            "failed_ops": self.failed_ops,
+            "buffer_full": self.buffer_full,
+            "deferred_writes": self.deferred_writes,
+            "request_path_ms_saved": self.deferred_write_seconds * 1000,
+        }
+
+# Instance global yang dipakai oleh layanan health dan meal plan
+firestore_writer = FirestoreWriter()
@@ -1,34 +1,108 @@
 import os
-from google.cloud import storage
+import time
+import base64
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from services.metrics import span
+
+logger = logging.getLogger(__name__)
 
 # Configure bucket and file names
 GCS_BUCKET_NAME = "sleekstorage"
 CLASSIFICATION_MODEL_BLOB = "classification_model_tf.h5"
 REGRESSION_MODEL_BLOB = "bmr_regression_model.h5"
 
-def download_model_from_gcs(bucket_name: str, source_blob_name: str, destination_file_name: str):
+MODEL_DIR = "./assets"
+MODEL_FILES = {
+    CLASSIFICATION_MODEL_BLOB: "classification_model_tf.h5",
+    REGRESSION_MODEL_BLOB: "bmr_regression_model.h5",
+}
+
+def get_storage_client():
+    # Import di sini agar google.cloud.storage tidak ikut dimuat saat import aplikasi
+    from google.cloud import storage
+
+    # Use the default credentials from the Cloud Run service account
+    return storage.Client()
+
+def _generation_file(destination_file_name: str) -> str:
+    return destination_file_name + ".generation"
+
+def _local_md5(path: str) -> str:
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return base64.b64encode(digest.digest()).decode("utf-8")
+
+def is_local_copy_current(blob, destination_file_name: str) -> bool:
     """
-    Downloads a file from Google Cloud Storage to a local directory.
+    A local file is current when its recorded GCS generation matches the blob,
+    or (for files baked into the image or a mounted volume) when its MD5 matches.
     """
+    if not os.path.exists(destination_file_name):
+        return False
+
+    generation_file = _generation_file(destination_file_name)
+    if os.path.exists(generation_file):
+        with open(generation_file) as f:
+            if f.read().strip() == str(blob.generation):
+                return True
+
+    if blob.md5_hash and _local_md5(destination_file_name) == blob.md5_hash:
+        _write_generation(destination_file_name, blob.generation)
+        return True
+    return False
+
+def _write_generation(destination_file_name: str, generation):
     try:
-        # Use the default credentials from the Cloud Run service account
-        client = storage.Client()  
+        with open(_generation_file(destination_file_name), "w") as f:
+            f.write(str(generation))
+    except OSError as e:
+        # Volume read-only: cek MD5 tetap berjalan di start berikutnya
+        logger.warning(f"Could not record generation for {destination_file_name}: {e}")
+
+def download_model_from_gcs(bucket_name: str, source_blob_name: str, destination_file_name: str, client=None) -> dict:
+    """
+    Downloads a file from Google Cloud Storage to a local directory, unless the
+    local copy already matches. Returns timing information for the startup log.
+    """
+    started = time.perf_counter()
+    try:
+        client = client or get_storage_client()
         bucket = client.bucket(bucket_name)
-        blob = bucket.blob(source_blob_name)
+        blob = bucket.get_blob(source_blob_name)
+        if blob is None:
+            raise RuntimeError(f"Blob {source_blob_name} not found in bucket {bucket_name}")
+
+        if is_local_copy_current(blob, destination_file_name):
+            logger.info(f"{destination_file_name} is up to date (generation {blob.generation}), skipping download")
+            return {"blob": source_blob_name, "downloaded": False, "seconds": time.perf_counter() - started}
+
+        # Download ke file sementara lalu rename agar file model tidak pernah setengah jadi
+        temp_file_name = destination_file_name + ".tmp"
+        with span("gcs_download"):
+            blob.download_to_filename(temp_file_name)
+        os.replace(temp_file_name, destination_file_name)
+        _write_generation(destination_file_name, blob.generation)
 
-        # Download the file to the specified destination
-        blob.download_to_filename(destination_file_name)
-        print(f"Downloaded {source_blob_name} to {destination_file_name}.")
+        logger.info(f"Downloaded {source_blob_name} to {destination_file_name}")
+        return {"blob": source_blob_name, "downloaded": True, "seconds": time.perf_counter() - started}
     except Exception as e:
         raise RuntimeError(f"Failed to download {source_blob_name}: {e}")
 
-def download_models():
+def download_models(client=None, model_dir: str = MODEL_DIR) -> list:
     """
-    Downloads all models from GCS to a local directory.
+    Downloads all models from GCS to a local directory, in parallel.
     """
     # Ensure the assets directory exists
-    os.makedirs("./assets", exist_ok=True)
+    os.makedirs(model_dir, exist_ok=True)
 
-    # Download models
-    download_model_from_gcs(GCS_BUCKET_NAME, CLASSIFICATION_MODEL_BLOB, "./assets/classification_model_tf.h5")
-    download_model_from_gcs(GCS_BUCKET_NAME, REGRESSION_MODEL_BLOB, "./assets/bmr_regression_model.h5")
\ No newline at end of file
+    client = client or get_storage_client()
+    with ThreadPoolExecutor(max_workers=len(MODEL_FILES)) as executor:
+        futures = [
+            executor.submit(download_model_from_gcs, GCS_BUCKET_NAME, blob_name, os.path.join(model_dir, file_name), client)
+            for blob_name, file_name in MODEL_FILES.items()
+        ]
+        return [future.result() for future in futures]
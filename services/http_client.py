@@ -0,0 +1,101 @@
+import os
+import random
+import asyncio
+import logging
+import httpx
+
+# Konfigurasi client HTTP bersama untuk Firebase Identity Toolkit / Secure Token
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", "5"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "false").lower() == "true"
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+HTTP_RETRY_BASE_DELAY = float(os.getenv("HTTP_RETRY_BASE_DELAY", "0.1"))
+HTTP_RETRY_MAX_DELAY = 2.0
+
+# Error yang terjadi sebelum request sampai ke server: aman diulang untuk semua request
+CONNECTION_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+# Error setelah request terkirim: hanya diulang untuk request yang idempotent
+TRANSIENT_ERRORS = (httpx.ReadTimeout, httpx.ReadError, httpx.WriteError, httpx.RemoteProtocolError)
+
+_client = None
+
+def create_http_client(http2: bool = HTTP2_ENABLED, verify=True) -> httpx.AsyncClient:
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logging.warning("HTTP2_ENABLED is set but the 'h2' package is not installed; using HTTP/1.1")
+            http2 = False
+
+    return httpx.AsyncClient(
+        http2=http2,
+        verify=verify,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(
+            connect=HTTP_CONNECT_TIMEOUT,
+            read=HTTP_READ_TIMEOUT,
+            write=HTTP_READ_TIMEOUT,
+            pool=HTTP_POOL_TIMEOUT,
+        ),
+    )
+
+async def start_http_client():
+    """
+    Buka client HTTP bersama saat aplikasi mulai.
+    """
+    global _client
+    if _client is None:
+        _client = create_http_client()
+        logging.info("HTTP client started")
+
+async def close_http_client():
+    """
+    Tutup client HTTP bersama dan semua koneksi keep-alive saat aplikasi berhenti.
+    """
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+def get_http_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = create_http_client()
+    return _client
+
+def _retry_delay(attempt: int) -> float:
+    # Exponential backoff dengan full jitter
+    return random.uniform(0, min(HTTP_RETRY_MAX_DELAY, HTTP_RETRY_BASE_DELAY * (2 ** attempt)))
+
+async def post_with_retry(url: str, idempotent: bool = True, client: httpx.AsyncClient = None, **kwargs) -> httpx.Response:
+    """
+    POST lewat client bersama dengan retry terbatas untuk error koneksi dan 5xx.
+    Request yang tidak idempotent hanya diulang jika belum sampai ke server.
+    """
+    client = client or get_http_client()
+    attempt = 0
+    while True:
+        try:
+            response = await client.post(url, **kwargs)
+            if response.status_code < 500 or not idempotent or attempt >= HTTP_MAX_RETRIES:
+                return response
+            logging.warning(f"Retrying POST after HTTP {response.status_code} (attempt {attempt + 1})")
+        except CONNECTION_ERRORS as e:
+            if attempt >= HTTP_MAX_RETRIES:
+                raise
+            logging.warning(f"Retrying POST after connection error: {e!r} (attempt {attempt + 1})")
+        except TRANSIENT_ERRORS as e:
+            if not idempotent or attempt >= HTTP_MAX_RETRIES:
+                raise
+            logging.warning(f"Retrying POST after transient error: {e!r} (attempt {attempt + 1})")
+
+        await asyncio.sleep(_retry_delay(attempt))
+        attempt += 1
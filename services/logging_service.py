@@ -0,0 +1,227 @@
+import os
+import sys
+import json
+import queue
+import random
+import hashlib
+import logging
+import threading
+import logging.handlers
+from datetime import datetime, timezone
+from services.metrics import current_endpoint
+
+# Konfigurasi logging
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()  # "json" (Cloud Logging) atau "text"
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Sampling per logger, contoh: "health.text_generation_service=0.1,main=0.5".
+# WARNING ke atas tidak pernah di-sample.
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+# Field payload (prompt, respons, data kesehatan): "hash", "truncate" atau "full"
+LOG_PAYLOAD_MODE = os.getenv("LOG_PAYLOAD_MODE", "hash").lower()
+LOG_PAYLOAD_MAX_CHARS = int(os.getenv("LOG_PAYLOAD_MAX_CHARS", "200"))
+
+# Field `extra` yang berisi prompt, respons model atau data kesehatan pengguna
+PAYLOAD_FIELDS = frozenset({
+    "prompt", "response", "health_data", "user_prediction",
+    "input_data", "result", "meal_plans",
+})
+
+# Atribut bawaan LogRecord; atribut lain berasal dari `extra`
+_RECORD_ATTRIBUTES = frozenset(vars(logging.makeLogRecord({}))) | {"message", "endpoint"}
+
+def parse_sample_rates(spec: str) -> dict:
+    rates = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, rate = item.split("=", 1)
+            rates[name.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+def redact_payload(value, mode: str = None, max_chars: int = None):
+    """
+    Replaces a large or sensitive value by its hash (`hash`), its first
+    `max_chars` characters (`truncate`), or keeps it (`full`).
+    """
+    mode = mode or LOG_PAYLOAD_MODE
+    max_chars = LOG_PAYLOAD_MAX_CHARS if max_chars is None else max_chars
+    if mode == "full":
+        return value
+    text = value if isinstance(value, str) else json.dumps(value, default=str, sort_keys=True)
+    if mode == "truncate":
+        if len(text) <= max_chars:
+            return text
+        return f"{text[:max_chars]}... ({len(text)} chars)"
+    return {"sha256": hashlib.sha256(text.encode("utf-8")).hexdigest()[:16], "chars": len(text)}
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a fraction of the records below WARNING per logger. The rate of the
+    longest matching logger prefix applies (`health` also covers `health.x`).
+    """
+
+    def __init__(self, rates: dict):
+        super().__init__()
+        self.rates = rates
+        self._resolved = {}
+        self.sampled_out = 0
+
+    def rate_for(self, name: str) -> float:
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate = 1.0
+            parts = name.split(".")
+            for end in range(len(parts), 0, -1):
+                prefix = ".".join(parts[:end])
+                if prefix in self.rates:
+                    rate = self.rates[prefix]
+                    break
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate_for(record.name)
+        if rate >= 1.0 or random.random() < rate:
+            return True
+        self.sampled_out += 1
+        return False
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line with the fields Cloud Logging recognizes
+    (`severity`, `message`, `time`) plus the record's `extra` fields.
+    """
+
+    def format(self, record) -> str:
+        entry = {
+            "severity": record.levelname,
+            "message": record.getMessage(),
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "logger": record.name,
+        }
+        endpoint = getattr(record, "endpoint", "none")
+        if endpoint != "none":
+            entry["endpoint"] = endpoint
+        for key, value in vars(record).items():
+            if key in _RECORD_ATTRIBUTES:
+                continue
+            entry[key] = redact_payload(value) if key in PAYLOAD_FIELDS else value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(levelname)s:%(name)s:%(message)s")
+
+    def format(self, record) -> str:
+        line = super().format(record)
+        extras = {
+            key: redact_payload(value) if key in PAYLOAD_FIELDS else value
+            for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES
+        }
+        return f"{line} {json.dumps(extras, default=str, ensure_ascii=False)}" if extras else line
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queues records for the listener thread. The caller only builds the
+    message; formatting, redaction and the write to stdout happen in the
+    background. When the queue is full the record is dropped and counted.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.enqueued = 0
+        self.dropped = 0
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(vars(record))
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.endpoint = current_endpoint.get()
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+            self.enqueued += 1
+        except queue.Full:
+            self.dropped += 1
+
+class LoggingPipeline:
+    """
+    Routes the root logger through a bounded queue to a listener thread that
+    writes structured records to stdout.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.handler = None
+        self.listener = None
+        self.sampling = None
+        self._options = None
+
+    def start(self, level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, sample_rates: str = LOG_SAMPLE_RATES, queue_size: int = LOG_QUEUE_SIZE):
+        with self._lock:
+            if self.listener is not None:
+                return
+            self._options = (level, fmt, sample_rates, queue_size)
+            output = logging.StreamHandler(sys.stdout)
+            output.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+
+            self.handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+            self.sampling = SamplingFilter(parse_sample_rates(sample_rates))
+            self.handler.addFilter(self.sampling)
+
+            root = logging.getLogger()
+            for existing in list(root.handlers):
+                root.removeHandler(existing)
+            root.addHandler(self.handler)
+            root.setLevel(level)
+
+            self.listener = logging.handlers.QueueListener(self.handler.queue, output)
+            self.listener.start()
+
+    def stop(self):
+        """
+        Writes the records still in the queue, then stops the listener thread.
+        """
+        with self._lock:
+            if self.listener is not None:
+                self.listener.stop()
+                self.listener = None
+
+    def after_fork(self):
+        """
+        Starts a new queue and listener in a forked worker. The listener
+        thread of the parent does not exist in the child.
+        """
+        if self._options is None:
+            return
+        with self._lock:
+            self.listener = None
+        self.start(*self._options)
+
+    def get_stats(self) -> dict:
+        if self.handler is None:
+            return {"running": False}
+        return {
+            "running": self.listener is not None,
+            "format": LOG_FORMAT,
+            "payload_mode": LOG_PAYLOAD_MODE,
+            "queued": self.handler.queue.qsize(),
+            "enqueued": self.handler.enqueued,
+            "dropped": self.handler.dropped,
+            "sampled_out": self.sampling.sampled_out,
+        }
+
+# Pipeline global, dimulai oleh main.py saat import
+logging_pipeline = LoggingPipeline()
@@ -0,0 +1,174 @@
+import os
+import time
+import bisect
+import logging
+import threading
+import contextvars
+from fastapi import HTTPException
+from fastapi.routing import APIRoute
+
+# Ekspor span ke OpenTelemetry (opsional, butuh paket opentelemetry-api)
+METRICS_OTEL_ENABLED = os.getenv("METRICS_OTEL_ENABLED", "false").lower() == "true"
+
+# Batas bucket histogram latensi (detik)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Endpoint yang sedang dilayani; diisi oleh TimedRoute di main.py. Span di luar
+# request (startup, worker background) tercatat dengan endpoint "none".
+current_endpoint = contextvars.ContextVar("current_endpoint", default="none")
+
+class Histogram:
+    def __init__(self, bounds: tuple = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class MetricsRegistry:
+    """
+    Latency histograms and error counters per (endpoint, stage), plus
+    request counters per (endpoint, status). Rendered in the Prometheus
+    text exposition format.
+    """
+
+    def __init__(self, bounds: tuple = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._errors = {}
+        self._requests = {}
+
+    def observe(self, endpoint: str, stage: str, seconds: float, error: bool = False):
+        key = (endpoint, stage)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.bounds)
+            histogram.observe(seconds)
+            if error:
+                self._errors[key] = self._errors.get(key, 0) + 1
+
+    def count_request(self, endpoint: str, status: int):
+        key = (endpoint, str(status))
+        with self._lock:
+            self._requests[key] = self._requests.get(key, 0) + 1
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            histograms = {key: (list(h.counts), h.sum, h.count) for key, h in self._histograms.items()}
+            errors = dict(self._errors)
+            requests = dict(self._requests)
+
+        lines = [
+            "# HELP sleek_stage_duration_seconds Time spent per endpoint and stage.",
+            "# TYPE sleek_stage_duration_seconds histogram",
+        ]
+        for (endpoint, stage), (counts, total, count) in sorted(histograms.items()):
+            labels = f'endpoint="{_escape(endpoint)}",stage="{_escape(stage)}"'
+            cumulative = 0
+            for bound, bucket_count in zip(self.bounds, counts):
+                cumulative += bucket_count
+                lines.append(f'sleek_stage_duration_seconds_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+            lines.append(f'sleek_stage_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"sleek_stage_duration_seconds_sum{{{labels}}} {total:.9g}")
+            lines.append(f"sleek_stage_duration_seconds_count{{{labels}}} {count}")
+
+        lines += [
+            "# HELP sleek_stage_errors_total Stages that ended with an exception.",
+            "# TYPE sleek_stage_errors_total counter",
+        ]
+        for (endpoint, stage), count in sorted(errors.items()):
+            lines.append(f'sleek_stage_errors_total{{endpoint="{_escape(endpoint)}",stage="{_escape(stage)}"}} {count}')
+
+        lines += [
+            "# HELP sleek_requests_total Requests per endpoint and response status.",
+            "# TYPE sleek_requests_total counter",
+        ]
+        for (endpoint, status), count in sorted(requests.items()):
+            lines.append(f'sleek_requests_total{{endpoint="{_escape(endpoint)}",status="{status}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+_tracer = None
+
+def _get_tracer():
+    global _tracer, METRICS_OTEL_ENABLED
+    if _tracer is None:
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            logging.warning("METRICS_OTEL_ENABLED is set but opentelemetry-api is not installed; OpenTelemetry export disabled")
+            METRICS_OTEL_ENABLED = False
+            return None
+        _tracer = trace.get_tracer("sleek")
+    return _tracer
+
+class _Span:
+    __slots__ = ("stage", "started", "_otel")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self._otel = None
+
+    def __enter__(self):
+        if METRICS_OTEL_ENABLED:
+            tracer = _get_tracer()
+            if tracer is not None:
+                self._otel = tracer.start_as_current_span(self.stage)
+                self._otel.__enter__()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        metrics.observe(current_endpoint.get(), self.stage, time.perf_counter() - self.started, exc_type is not None)
+        if self._otel is not None:
+            self._otel.__exit__(exc_type, exc, tb)
+        return False
+
+def span(stage: str) -> _Span:
+    """
+    Times a block as `stage` of the current endpoint:
+
+        with span("vertex"):
+            text = await vertex_client.generate(prompt)
+    """
+    return _Span(stage)
+
+class TimedRoute(APIRoute):
+    """
+    Route class that labels spans with the route path (e.g. `/mealPlan/jobs/{job_id}`)
+    and records the handler time as stage `total` plus a request counter.
+    """
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        endpoint = self.path
+
+        async def timed_handler(request):
+            # Tidak di-reset: setiap request berjalan di task sendiri, dan body
+            # StreamingResponse dijalankan setelah handler selesai di task yang sama
+            current_endpoint.set(endpoint)
+            started = time.perf_counter()
+            status = 500
+            try:
+                response = await handler(request)
+                status = response.status_code
+                return response
+            except HTTPException as e:
+                status = e.status_code
+                raise
+            finally:
+                metrics.observe(endpoint, "total", time.perf_counter() - started, status >= 500)
+                metrics.count_request(endpoint, status)
+
+        return timed_handler
+
+# Registry global yang diekspos di /metrics
+metrics = MetricsRegistry()
@@ -1,15 +1,39 @@
-import tensorflow as tf
-import pandas as pd
+import os
+import time
+import logging
 import numpy as np
-from sklearn.preprocessing import LabelEncoder
+from services.metrics import span
+
+# Backend inferensi: "tensorflow" (default) atau "numpy" (tanpa TensorFlow)
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "tensorflow").strip().lower()
+
+logger = logging.getLogger(__name__)
+
+CLASSIFICATION_MODEL_PATH = './assets/classification_model_tf.h5'
+REGRESSION_MODEL_PATH = './assets/bmr_regression_model.h5'
+
+# Urutan fitur yang diharapkan oleh kedua model
+FEATURE_COLUMNS = ["age", "gender", "height_cm", "weight_kg"]
+
+# Kategori BMI dalam urutan kelas LabelEncoder (alfabetis)
+BMI_CATEGORIES = np.array(sorted(["Underweight", "Ideal", "Overweight", "Obese"]))
 
 # Global model variables
 classification_model = None
 regression_model = None
 
-# Label encoder for BMI Category
-label_encoder = LabelEncoder()
-label_encoder.fit(["Underweight", "Ideal", "Overweight", "Obese"])
+def load_model(path: str, backend: str = None):
+    """
+    Loads a model file with the configured backend.
+    """
+    backend = backend or MODEL_BACKEND
+    if backend == "numpy":
+        from services.numpy_backend import load_dense_model
+        return load_dense_model(path)
+    if backend == "tensorflow":
+        import tensorflow as tf
+        return tf.keras.models.load_model(path)
+    raise ValueError(f"Unknown model backend: {backend}")
 
 def get_classification_model():
     """
@@ -17,8 +41,8 @@ def get_classification_model():
     """
     global classification_model
     if classification_model is None:
-        classification_model = tf.keras.models.load_model('./assets/classification_model_tf.h5')
-        print("Classification model loaded.")
+        classification_model = load_model(CLASSIFICATION_MODEL_PATH)
+        logger.info(f"Classification model loaded ({MODEL_BACKEND}).")
     return classification_model
 
 def get_regression_model():
@@ -27,37 +51,86 @@ def get_regression_model():
     """
     global regression_model
     if regression_model is None:
-        regression_model = tf.keras.models.load_model('./assets/bmr_regression_model.h5')
-        print("Regression model loaded.")
+        regression_model = load_model(REGRESSION_MODEL_PATH)
+        logger.info(f"Regression model loaded ({MODEL_BACKEND}).")
     return regression_model
 
-def predict_bmi_bmr(input_data):
+def warm_up_models() -> dict:
     """
-    Predicts BMI category and BMR based on input data.
+    Loads both models and runs one dummy inference so the first request does
+    not pay the load and graph build cost. Returns timings in seconds.
     """
-    try:
-        print(f"Input data for prediction: {input_data}")
-        user_input = pd.DataFrame([input_data])
+    timings = {}
+    started = time.perf_counter()
+    get_classification_model()
+    timings["load_classification"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    get_regression_model()
+    timings["load_regression"] = time.perf_counter() - started
 
-        if user_input.shape[1] != 4:
-            raise ValueError(f"Invalid input dimensions. Expected 4 features, but received {user_input.shape[1]}.")
+    started = time.perf_counter()
+    result = predict_bmi_bmr_batch([{"age": 30, "gender": 0, "height_cm": 170.0, "weight_kg": 65.0}])[0]
+    if "error" in result:
+        raise RuntimeError(f"Model warm-up failed: {result['error']}")
+    timings["dummy_inference"] = time.perf_counter() - started
+    return timings
+
+def predict_bmi_bmr_batch(input_rows: list) -> list:
+    """
+    Predicts BMI category and BMR for many inputs with a single call per model.
+    Returns one result per input row, in the same order. Rows that fail
+    validation get an {"error": ...} result without affecting the others.
+    """
+    results = [None] * len(input_rows)
+    valid_indices = []
+    for index, input_data in enumerate(input_rows):
+        if len(input_data) != 4:
+            results[index] = {
+                "error": f"Invalid input dimensions. Expected 4 features, but received {len(input_data)}."
+            }
+        elif any(column not in input_data for column in FEATURE_COLUMNS):
+            results[index] = {"error": f"Invalid input features. Expected {FEATURE_COLUMNS}."}
+        else:
+            valid_indices.append(index)
+
+    if not valid_indices:
+        return results
+
+    try:
+        user_input = np.array(
+            [[input_rows[index][column] for column in FEATURE_COLUMNS] for index in valid_indices],
+            dtype=np.float32
+        )
 
         classification_model = get_classification_model()
         regression_model = get_regression_model()
 
-        classification_preds = classification_model.predict(user_input)
-        predicted_category_idx = np.argmax(classification_preds, axis=1)[0]
-        predicted_bmi_category = label_encoder.inverse_transform([predicted_category_idx])[0]
+        with span("model_inference"):
+            classification_preds = classification_model.predict(user_input, verbose=0)
+            predicted_bmi_categories = BMI_CATEGORIES[np.argmax(classification_preds, axis=1)]
 
-        bmr_prediction = regression_model.predict(user_input)[0][0]
+            bmr_predictions = regression_model.predict(user_input, verbose=0)[:, 0]
 
-        result = {
-            "weight_category": predicted_bmi_category,
-            "predicted_bmr": float(bmr_prediction)
-        }
-        print(f"Prediction result: {result}")
-        return result
+        for position, index in enumerate(valid_indices):
+            results[index] = {
+                "weight_category": str(predicted_bmi_categories[position]),
+                "predicted_bmr": float(bmr_predictions[position])
+            }
+        logger.debug("Batch prediction done", extra={"rows": len(valid_indices)})
 
     except Exception as e:
-        print(f"Error during prediction: {e}")
-        return {"error": str(e)}
\ No newline at end of file
+        logger.error(f"Error during batch prediction: {e}")
+        for index in valid_indices:
+            results[index] = {"error": str(e)}
+
+    return results
+
+def predict_bmi_bmr(input_data):
+    """
+    Predicts BMI category and BMR based on input data.
+    """
+    logger.debug("Input data for prediction", extra={"input_data": input_data})
+    result = predict_bmi_bmr_batch([input_data])[0]
+    logger.debug("Prediction result", extra={"result": result})
+    return result
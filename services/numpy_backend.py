@@ -0,0 +1,92 @@
+import json
+import h5py
+import numpy as np
+
+# Aktivasi yang dipakai oleh model Dense dari tim Machine Learning
+def _relu(x):
+    return np.maximum(x, 0)
+
+def _softmax(x):
+    shifted = np.exp(x - x.max(axis=1, keepdims=True))
+    return shifted / shifted.sum(axis=1, keepdims=True)
+
+def _sigmoid(x):
+    return 1 / (1 + np.exp(-x))
+
+ACTIVATIONS = {
+    "linear": lambda x: x,
+    "relu": _relu,
+    "softmax": _softmax,
+    "sigmoid": _sigmoid,
+    "tanh": np.tanh,
+}
+
+class NumpyDenseModel:
+    """
+    Forward pass of a Keras Sequential model made only of Dense layers,
+    computed with NumPy. Exposes the same `predict` call as a Keras model.
+    """
+
+    def __init__(self, layers: list):
+        # Setiap layer: (kernel, bias, fungsi aktivasi)
+        self.layers = layers
+
+    def predict(self, inputs, verbose=0):
+        outputs = np.asarray(inputs, dtype=np.float32)
+        for kernel, bias, activation in self.layers:
+            outputs = activation(outputs @ kernel + bias)
+        return outputs
+
+def _find_dataset(group, name: str):
+    """
+    Finds the weight dataset (`kernel` or `bias`) inside a layer group. Keras 2
+    stores them as `kernel:0`, Keras 3 as `kernel`, nested under the model name.
+    """
+    found = []
+
+    def visitor(path, obj):
+        if isinstance(obj, h5py.Dataset) and path.split("/")[-1].split(":")[0] == name:
+            found.append(obj[()])
+
+    group.visititems(visitor)
+    if not found:
+        raise ValueError(f"Weight '{name}' not found in layer '{group.name}'")
+    return np.asarray(found[0], dtype=np.float32)
+
+def load_dense_model(path: str) -> NumpyDenseModel:
+    """
+    Reads the architecture and weights of a Keras `.h5` file once and
+    returns a NumPy model.
+    """
+    with h5py.File(path, "r") as model_file:
+        model_config = model_file.attrs["model_config"]
+        if isinstance(model_config, bytes):
+            model_config = model_config.decode("utf-8")
+        model_config = json.loads(model_config)
+
+        if model_config.get("class_name") != "Sequential":
+            raise ValueError(f"Unsupported model type: {model_config.get('class_name')}")
+
+        weights = model_file["model_weights"]
+        layers = []
+        for layer in model_config["config"]["layers"]:
+            class_name = layer["class_name"]
+            config = layer["config"]
+            if class_name == "InputLayer":
+                continue
+            if class_name != "Dense":
+                raise ValueError(f"Unsupported layer type: {class_name}")
+
+            activation = config.get("activation", "linear")
+            if activation not in ACTIVATIONS:
+                raise ValueError(f"Unsupported activation: {activation}")
+
+            layer_group = weights[config["name"]]
+            kernel = _find_dataset(layer_group, "kernel")
+            if config.get("use_bias", True):
+                bias = _find_dataset(layer_group, "bias")
+            else:
+                bias = np.zeros(kernel.shape[1], dtype=np.float32)
+            layers.append((kernel, bias, ACTIVATIONS[activation]))
+
+    return NumpyDenseModel(layers)
@@ -0,0 +1,187 @@
+import os
+import time
+import logging
+
+# Mode multi-proses opsional (gunicorn + uvicorn worker, lihat gunicorn.conf.py).
+# WEB_CONCURRENCY: jumlah worker, atau "auto" untuk menyesuaikan dengan batas CPU dan memori.
+# Default satu worker: cache, single-flight job dan rate limit in-process terpisah per worker.
+WEB_CONCURRENCY = os.getenv("WEB_CONCURRENCY", "1").strip().lower()
+WORKERS_PER_CPU = float(os.getenv("WORKERS_PER_CPU", "1"))
+MAX_WORKERS = int(os.getenv("MAX_WORKERS", "8"))
+# Perkiraan memori master dan memori tambahan per worker (MB), dipakai untuk membatasi jumlah worker
+MASTER_MEMORY_MB = int(os.getenv("MASTER_MEMORY_MB", "0"))
+WORKER_MEMORY_MB = int(os.getenv("WORKER_MEMORY_MB", "0"))
+# Worker didaur ulang setelah sekian request (plus jitter agar tidak bersamaan)
+WORKER_MAX_REQUESTS = int(os.getenv("WORKER_MAX_REQUESTS", "10000"))
+WORKER_MAX_REQUESTS_JITTER = int(os.getenv("WORKER_MAX_REQUESTS_JITTER", "1000"))
+# Cloud Run memberi 10 detik setelah SIGTERM
+WORKER_GRACEFUL_TIMEOUT = int(os.getenv("WORKER_GRACEFUL_TIMEOUT", "8"))
+
+# Perkiraan memori (MB) per backend model, diukur dengan benchmarks/prefork_scaling.py.
+# TensorFlow tidak fork-safe: setiap worker memuat model sendiri, jadi dihitung satu set model penuh per worker
+DEFAULT_MEMORY_MB = {
+    "tensorflow": {"master": 600, "worker": 300},
+    "numpy": {"master": 100, "worker": 80},
+}
+# Backend model default dalam mode pre-fork: hanya model NumPy yang dimuat di master dan dibagi ke worker
+PREFORK_MODEL_BACKEND = "numpy"
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+logger = logging.getLogger(__name__)
+
+def _read(path: str):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def cpu_limit(root: str = CGROUP_ROOT) -> float:
+    """
+    CPUs available to the container: the cgroup quota (v2 `cpu.max` or v1
+    `cpu.cfs_quota_us`) if set, otherwise the CPUs this process may run on.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cpus = float(len(os.sched_getaffinity(0)))
+    else:
+        cpus = float(os.cpu_count() or 1)
+
+    quota = period = None
+    cpu_max = _read(os.path.join(root, "cpu.max"))
+    if cpu_max:
+        limit, _, raw_period = cpu_max.partition(" ")
+        if limit != "max":
+            quota, period = int(limit), int(raw_period or 100000)
+    else:
+        raw_quota = _read(os.path.join(root, "cpu", "cpu.cfs_quota_us"))
+        raw_period = _read(os.path.join(root, "cpu", "cpu.cfs_period_us"))
+        if raw_quota and raw_period and int(raw_quota) > 0:
+            quota, period = int(raw_quota), int(raw_period)
+
+    if quota and period:
+        cpus = min(cpus, quota / period)
+    return cpus
+
+def memory_limit(root: str = CGROUP_ROOT):
+    """
+    Container memory limit in bytes (cgroup v2 `memory.max` or v1
+    `memory.limit_in_bytes`), or None when unlimited.
+    """
+    raw = _read(os.path.join(root, "memory.max")) or _read(os.path.join(root, "memory", "memory.limit_in_bytes"))
+    if not raw or raw == "max":
+        return None
+    limit = int(raw)
+    # cgroup v1 menandai "tanpa batas" dengan angka sangat besar
+    return None if limit >= 1 << 60 else limit
+
+def auto_worker_count(cpus: float, memory_bytes, master_mb: int, worker_mb: int) -> int:
+    """
+    One worker per CPU (times WORKERS_PER_CPU), no more than fit in the memory
+    limit after the master, capped by MAX_WORKERS. Always at least one.
+    """
+    workers = int(cpus * WORKERS_PER_CPU)
+    if memory_bytes is not None and worker_mb > 0:
+        workers = min(workers, int((memory_bytes / 2**20 - master_mb) // worker_mb))
+    return max(1, min(workers, MAX_WORKERS))
+
+class PreforkServer:
+    """
+    Pre-fork serving mode: the gunicorn master downloads and loads the models
+    once, then forks the workers, which share those pages copy-on-write
+    instead of each loading its own copy. Only the NumPy backend (the default
+    in this mode) is shared; with MODEL_BACKEND=tensorflow every worker loads
+    its own models. Single-process `uvicorn main:app` does not use any of this.
+    """
+
+    def __init__(self):
+        self.role = "single"
+        self.workers = 1
+        self.cpus = None
+        self.memory_limit = None
+        self.preloaded = False
+        self.downloads = []
+        self.preload_timings = {}
+        self.started_at = time.time()
+
+    def configure(self) -> int:
+        """
+        Sizes the worker pool and splits the CPU between workers. Must run
+        before `main` is imported, because the thread pool sizes and the model
+        backend are read at import.
+        """
+        os.environ.setdefault("MODEL_BACKEND", PREFORK_MODEL_BACKEND)
+        from services.model_service import MODEL_BACKEND
+
+        self.role = "master"
+        self.cpus = cpu_limit()
+        self.memory_limit = memory_limit()
+        defaults = DEFAULT_MEMORY_MB.get(MODEL_BACKEND, DEFAULT_MEMORY_MB["tensorflow"])
+        if WEB_CONCURRENCY == "auto":
+            self.workers = auto_worker_count(
+                self.cpus, self.memory_limit,
+                MASTER_MEMORY_MB or defaults["master"], WORKER_MEMORY_MB or defaults["worker"],
+            )
+        else:
+            self.workers = max(1, int(WEB_CONCURRENCY))
+        if MODEL_BACKEND == "tensorflow" and self.workers > 1:
+            logger.warning(f"MODEL_BACKEND=tensorflow: each of the {self.workers} workers loads its own models (not shared)")
+
+        # Tanpa ini setiap worker membuat thread sebanyak semua CPU (executor, BLAS, TensorFlow)
+        threads = str(max(1, int(self.cpus // self.workers)))
+        for name in ("CPU_POOL_SIZE", "OMP_NUM_THREADS", "TF_NUM_INTRAOP_THREADS", "TF_NUM_INTEROP_THREADS"):
+            os.environ.setdefault(name, threads)
+        return self.workers
+
+    def preload(self):
+        """
+        Runs in the master before the first fork. Downloads the models and, for
+        the NumPy backend, loads and warms them up. The TensorFlow runtime is
+        not fork-safe once a model has been built (a forked worker hangs on its
+        first predict), so that backend only preloads the `tensorflow` import
+        and each worker builds its models after the fork.
+        """
+        from services.gcs_service import download_models
+        from services.model_service import MODEL_BACKEND, warm_up_models
+
+        started = time.perf_counter()
+        self.downloads = download_models()
+        self.preload_timings["download"] = time.perf_counter() - started
+
+        if MODEL_BACKEND == "tensorflow":
+            started = time.perf_counter()
+            import tensorflow  # noqa: F401
+            self.preload_timings["import_tensorflow"] = time.perf_counter() - started
+        else:
+            self.preload_timings.update(warm_up_models())
+        self.preloaded = True
+        logger.info(
+            f"Preloaded models in master ({MODEL_BACKEND}): "
+            + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in self.preload_timings.items())
+        )
+
+    def after_fork(self):
+        """
+        Runs in each worker right after the fork. Threads do not survive a
+        fork, so the log listener is started again in the worker.
+        """
+        from services.logging_service import logging_pipeline
+
+        self.role = "worker"
+        self.started_at = time.time()
+        logging_pipeline.after_fork()
+
+    def get_stats(self) -> dict:
+        return {
+            "role": self.role,
+            "pid": os.getpid(),
+            "workers": self.workers,
+            "cpu_limit": self.cpus,
+            "memory_limit_mb": self.memory_limit // 2**20 if self.memory_limit else None,
+            "preloaded": self.preloaded,
+            "preload_timings": self.preload_timings,
+            "uptime_seconds": time.time() - self.started_at,
+        }
+
+# Instance global; dikonfigurasi oleh gunicorn.conf.py di proses master
+prefork_server = PreforkServer()
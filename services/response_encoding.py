@@ -0,0 +1,100 @@
+import os
+import gzip
+import hashlib
+import orjson
+from fastapi.responses import Response
+
+# Body di bawah ukuran ini dikirim tanpa kompresi
+RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+_brotli = None
+
+def _get_brotli():
+    # brotli opsional: tanpa paket `brotli` hanya gzip yang ditawarkan
+    global _brotli
+    if _brotli is None:
+        try:
+            import brotli
+            _brotli = brotli
+        except ImportError:
+            _brotli = False
+    return _brotli or None
+
+def strong_etag(*parts) -> str:
+    """
+    Strong ETag for the stored state identified by `parts` (document IDs and timestamps).
+    """
+    digest = hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()[:32]
+    return f'"{digest}"'
+
+def matching_etag(if_none_match: str, etag: str):
+    """
+    The tag from `If-None-Match` that names the same stored state as `etag`,
+    or None. Tags sent back for a compressed representation ("<tag>-gzip")
+    also match; a 304 repeats the tag the client has.
+    """
+    if not if_none_match:
+        return None
+    base = etag.strip('"')
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return etag
+        tag = candidate[2:] if candidate.startswith("W/") else candidate
+        if tag.strip('"') == base or tag.strip('"').rsplit("-", 1)[0] == base:
+            return tag
+    return None
+
+def negotiate_encoding(accept_encoding: str) -> str:
+    """
+    Picks "br", "gzip" or "identity" from an Accept-Encoding header, honouring q=0.
+    """
+    accepted = {}
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = quality
+    wildcard = accepted.get("*", 0.0)
+    for coding in ("br", "gzip"):
+        if coding == "br" and _get_brotli() is None:
+            continue
+        if accepted.get(coding, wildcard) > 0:
+            return coding
+    return "identity"
+
+def encode_body(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return _get_brotli().compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return body
+
+def cached_json_response(payload, etag: str, if_none_match: str = None, accept_encoding: str = None, cache_control: str = "private, no-cache") -> Response:
+    """
+    JSON response validated by a strong ETag: 304 without a body when the
+    client already has this state, otherwise the payload serialized with
+    orjson and compressed (brotli or gzip) once it exceeds RESPONSE_COMPRESS_MIN_BYTES.
+    A compressed body gets its own tag, because a strong ETag names exact bytes.
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    matched = matching_etag(if_none_match, etag)
+    if matched:
+        headers["ETag"] = matched
+        return Response(status_code=304, headers=headers)
+
+    body = orjson.dumps(payload)
+    encoding = negotiate_encoding(accept_encoding) if len(body) >= RESPONSE_COMPRESS_MIN_BYTES else "identity"
+    if encoding != "identity":
+        body = encode_body(body, encoding)
+        headers["Content-Encoding"] = encoding
+        headers["ETag"] = f'{etag[:-1]}-{encoding}"'
+    return Response(content=body, media_type="application/json", headers=headers)
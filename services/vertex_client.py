@@ -0,0 +1,489 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+import datetime
+import httpx
+from services.executor_service import run_generation, stream_generation, ExecutorSaturatedError
+from services.admission_control import vertex_breaker
+
+# Konfigurasi client Vertex AI
+VERTEX_MODEL_NAME = os.getenv("VERTEX_MODEL_NAME", "gemini-1.5-pro-002")
+VERTEX_REGIONS = [region.strip() for region in os.getenv("VERTEX_REGIONS", "asia-southeast1").split(",") if region.strip()]
+VERTEX_MAX_CONCURRENCY = int(os.getenv("VERTEX_MAX_CONCURRENCY", "8"))
+VERTEX_TIMEOUT = float(os.getenv("VERTEX_TIMEOUT", "90"))
+VERTEX_HEDGE_AFTER = float(os.getenv("VERTEX_HEDGE_AFTER", "0"))  # 0 = hedging nonaktif
+VERTEX_FAKE_URL = os.getenv("VERTEX_FAKE_URL")  # server generasi palsu untuk pengujian lokal
+# Context caching untuk system instruction (butuh ukuran minimum dari Vertex AI; jika
+# ditolak, system instruction dikirim bersama setiap request)
+VERTEX_CONTEXT_CACHE = os.getenv("VERTEX_CONTEXT_CACHE", "false").lower() == "true"
+VERTEX_CONTEXT_CACHE_TTL = float(os.getenv("VERTEX_CONTEXT_CACHE_TTL", "3600"))
+
+# Skor region: EWMA latensi dikali penalti tingkat error
+REGION_EWMA_ALPHA = 0.3
+REGION_ERROR_PENALTY = 4.0
+
+class VertexCapacityError(RuntimeError):
+    """
+    Raised when a generation got no local slot (concurrency limit or
+    generation pool) before its deadline. Vertex AI was never called, so it
+    does not count toward the Vertex circuit breaker.
+    """
+
+# Kegagalan lokal (kapasitas instance ini), bukan kegagalan Vertex AI
+LOCAL_CAPACITY_ERRORS = (VertexCapacityError, ExecutorSaturatedError)
+
+class VertexSDKBackend:
+    """
+    Generates with the Vertex AI SDK. One `GenerativeModel` is kept per
+    region and system instruction for the life of the process; with
+    VERTEX_CONTEXT_CACHE the instruction is stored as cached content and
+    recreated before it expires.
+    """
+
+    def __init__(self, model_name: str = VERTEX_MODEL_NAME, context_cache: bool = VERTEX_CONTEXT_CACHE, context_cache_ttl: float = VERTEX_CONTEXT_CACHE_TTL):
+        self.model_name = model_name
+        self.context_cache = context_cache
+        self.context_cache_ttl = context_cache_ttl
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def _get_model(self, region: str, system_instruction: str = None):
+        key = (region, system_instruction)
+        entry = self._models.get(key)
+        if entry is None or time.monotonic() >= entry[1]:
+            with self._lock:
+                entry = self._models.get(key)
+                if entry is None or time.monotonic() >= entry[1]:
+                    entry = self._models[key] = self._create_model(region, system_instruction)
+        return entry[0]
+
+    def _init(self, region: str):
+        from vertexai import init
+
+        project_id = os.getenv("GOOGLE_CLOUD_PROJECT")
+        if not project_id:
+            raise RuntimeError("Environment variable 'GOOGLE_CLOUD_PROJECT' is not set.")
+        # GenerativeModel menyimpan lokasi saat dibuat, jadi init per model cukup sekali
+        init(project=project_id, location=region)
+
+    def _create_model(self, region: str, system_instruction: str = None) -> tuple:
+        """
+        Returns (model, monotonic time at which it must be recreated).
+        """
+        from vertexai.preview.generative_models import GenerativeModel
+
+        self._init(region)
+        if not system_instruction:
+            return GenerativeModel(self.model_name), float("inf")
+
+        if self.context_cache:
+            try:
+                from vertexai.preview import caching
+
+                cached_content = caching.CachedContent.create(
+                    model_name=self.model_name,
+                    system_instruction=system_instruction,
+                    ttl=datetime.timedelta(seconds=self.context_cache_ttl),
+                )
+                # Dibuat ulang sedikit sebelum cache kedaluwarsa di Vertex AI
+                return GenerativeModel.from_cached_content(cached_content=cached_content), time.monotonic() + self.context_cache_ttl * 0.9
+            except Exception as e:
+                logging.warning(f"Vertex AI context caching unavailable in {region} ({e}); sending the system instruction with each request")
+        return GenerativeModel(self.model_name, system_instruction=[system_instruction]), float("inf")
+
+    def warm_up(self, region: str, system_instruction: str = None):
+        self._get_model(region, system_instruction)
+
+    @staticmethod
+    def _generation_config(response_schema: dict = None):
+        if response_schema is None:
+            return None
+        from vertexai.preview.generative_models import GenerationConfig
+
+        return GenerationConfig(response_mime_type="application/json", response_schema=response_schema)
+
+    def _send(self, model, prompt: str, response_schema: dict, timeout: float, stream: bool = False):
+        # `generate_content` SDK tidak menerima timeout: request yang sama dikirim
+        # lewat client gapic dengan deadline per panggilan
+        request = model._prepare_request(contents=[prompt], generation_config=self._generation_config(response_schema))
+        if stream:
+            return (model._parse_response(chunk) for chunk in model._prediction_client.stream_generate_content(request=request, timeout=timeout))
+        return model._parse_response(model._prediction_client.generate_content(request=request, timeout=timeout))
+
+    def generate(self, region: str, prompt: str, system_instruction: str = None, response_schema: dict = None, timeout: float = None) -> str:
+        model = self._get_model(region, system_instruction)
+        response = self._send(model, prompt, response_schema, timeout)
+        if not response or not hasattr(response, "text"):
+            raise ValueError("Vertex AI response is empty or invalid")
+        return response.text
+
+    def stream(self, region: str, prompt: str, system_instruction: str = None, response_schema: dict = None, timeout: float = None):
+        model = self._get_model(region, system_instruction)
+        for chunk in self._send(model, prompt, response_schema, timeout, stream=True):
+            text = getattr(chunk, "text", "")
+            if text:
+                yield text
+
+    def count_tokens(self, region: str, prompt: str, system_instruction: str = None) -> int:
+        """
+        Input tokens of one request, system instruction included.
+        """
+        from vertexai.preview.generative_models import GenerativeModel
+
+        with self._lock:
+            self._init(region)
+            model = GenerativeModel(self.model_name, system_instruction=[system_instruction] if system_instruction else None)
+        return model.count_tokens([prompt]).total_tokens
+
+class HttpGenerationBackend:
+    """
+    Talks to a local fake generation server (see benchmarks/fake_vertex_server.py)
+    so the client can be exercised without Vertex AI.
+    """
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+        self._client = httpx.Client(timeout=httpx.Timeout(VERTEX_TIMEOUT * 2, connect=5))
+
+    def _timeout(self, timeout: float = None):
+        return httpx.Timeout(timeout, connect=min(timeout, 5)) if timeout is not None else httpx.USE_CLIENT_DEFAULT
+
+    def generate(self, region: str, prompt: str, system_instruction: str = None, response_schema: dict = None, timeout: float = None) -> str:
+        payload = {"region": region, "prompt": prompt, "system_instruction": system_instruction, "response_schema": response_schema}
+        response = self._client.post(f"{self.base_url}/generate", json=payload, timeout=self._timeout(timeout))
+        response.raise_for_status()
+        return response.json()["text"]
+
+    def stream(self, region: str, prompt: str, system_instruction: str = None, response_schema: dict = None, timeout: float = None):
+        payload = {"region": region, "prompt": prompt, "system_instruction": system_instruction, "response_schema": response_schema}
+        with self._client.stream("POST", f"{self.base_url}/stream", json=payload, timeout=self._timeout(timeout)) as response:
+            response.raise_for_status()
+            for text in response.iter_text():
+                if text:
+                    yield text
+
+class RegionStats:
+    def __init__(self):
+        self.latency = None
+        self.error_rate = 0.0
+        self.calls = 0
+        self.errors = 0
+
+    def record(self, seconds: float, ok: bool):
+        self.calls += 1
+        if ok:
+            self.latency = seconds if self.latency is None else (
+                REGION_EWMA_ALPHA * seconds + (1 - REGION_EWMA_ALPHA) * self.latency
+            )
+        else:
+            self.errors += 1
+        self.error_rate = REGION_EWMA_ALPHA * (0.0 if ok else 1.0) + (1 - REGION_EWMA_ALPHA) * self.error_rate
+
+class _Permit:
+    """
+    One concurrency slot. Released when the worker thread finishes, or as
+    soon as the caller gives up (cancelled, hedge lost or deadline passed):
+    a call still running past that point no longer holds a slot.
+    """
+
+    def __init__(self, loop, semaphore: asyncio.Semaphore):
+        self._loop = loop
+        self._semaphore = semaphore
+        self._lock = threading.Lock()
+        self._state = "pending"
+        # True setelah backend benar-benar dipanggil
+        self.started = False
+
+    def enter(self) -> bool:
+        with self._lock:
+            if self._state != "pending":
+                return False
+            self._state = "running"
+            return True
+
+    def finish(self):
+        with self._lock:
+            released = self._state == "released"
+            self._state = "finished"
+        if not released:
+            self._loop.call_soon_threadsafe(self._semaphore.release)
+
+    def cancel(self):
+        with self._lock:
+            if self._state not in ("pending", "running"):
+                return
+            self._state = "released"
+        self._semaphore.release()
+
+class VertexClientManager:
+    """
+    Long-lived Vertex AI client: caps in-flight generations, enforces a
+    per-call deadline, optionally hedges slow calls to a second region and
+    fails over between regions ranked by latency and error rate.
+    """
+
+    def __init__(
+        self,
+        backend=None,
+        regions: list = None,
+        max_concurrency: int = VERTEX_MAX_CONCURRENCY,
+        timeout: float = VERTEX_TIMEOUT,
+        hedge_after: float = VERTEX_HEDGE_AFTER,
+    ):
+        self._backend = backend
+        self.regions = regions or VERTEX_REGIONS
+        self.max_concurrency = max(max_concurrency, 1)
+        self.timeout = timeout
+        self.hedge_after = hedge_after
+        self._semaphore = None
+        self._region_stats = {region: RegionStats() for region in self.regions}
+        self._stats_lock = threading.Lock()
+        self.in_flight = 0
+        self.waiting = 0
+        self.hedges = 0
+        self.failovers = 0
+        self.timeouts = 0
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = HttpGenerationBackend(VERTEX_FAKE_URL) if VERTEX_FAKE_URL else VertexSDKBackend()
+        return self._backend
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def ranked_regions(self) -> list:
+        """
+        Regions ordered by score (lower is better). Regions without latency
+        data are assumed to be as fast as the average of the others.
+        """
+        with self._stats_lock:
+            known = [stats.latency for stats in self._region_stats.values() if stats.latency is not None]
+            default_latency = sum(known) / len(known) if known else 0.0
+
+            def score(region):
+                stats = self._region_stats[region]
+                latency = stats.latency if stats.latency is not None else default_latency
+                return (latency + 1e-3) * (1 + REGION_ERROR_PENALTY * stats.error_rate)
+
+            return sorted(self.regions, key=lambda region: (score(region), self.regions.index(region)))
+
+    def _record(self, region: str, seconds: float, ok: bool):
+        with self._stats_lock:
+            self._region_stats[region].record(seconds, ok)
+
+    def _track(self, delta: int):
+        with self._stats_lock:
+            self.in_flight += delta
+
+    async def _acquire(self, deadline: float) -> _Permit:
+        loop = asyncio.get_running_loop()
+        semaphore = self._get_semaphore()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(semaphore.acquire(), max(deadline - loop.time(), 0))
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise VertexCapacityError("Timed out waiting for a free Vertex AI generation slot")
+        finally:
+            self.waiting -= 1
+        return _Permit(loop, semaphore)
+
+    async def _call_region(self, region: str, prompt: str, options: dict, deadline: float, permits: list) -> str:
+        permit = await self._acquire(deadline)
+        permits.append(permit)
+
+        loop = asyncio.get_running_loop()
+
+        def call():
+            if not permit.enter():
+                # Pemanggil sudah membatalkan request sebelum thread mulai
+                return None
+            self._track(1)
+            started = time.perf_counter()
+            ok = False
+            try:
+                # Sisa deadline diteruskan ke backend, sehingga panggilan yang macet tidak memegang thread selamanya
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise VertexCapacityError("Vertex AI deadline passed before the call started")
+                permit.started = True
+                text = self.backend.generate(region, prompt, timeout=remaining, **options)
+                ok = True
+                return text
+            finally:
+                if permit.started:
+                    self._record(region, time.perf_counter() - started, ok)
+                self._track(-1)
+                permit.finish()
+
+        try:
+            return await run_generation(call)
+        except BaseException:
+            permit.cancel()
+            raise
+
+    async def generate(self, prompt: str, system_instruction: str = None, response_schema: dict = None) -> str:
+        """
+        Generates text for `prompt`. `response_schema` (OpenAPI subset) asks
+        for JSON output that matches it. The final outcome (after failover)
+        feeds the Vertex circuit breaker, unless Vertex AI was never called
+        because this instance had no capacity (VertexCapacityError).
+        """
+        with vertex_breaker.track(ignore=LOCAL_CAPACITY_ERRORS):
+            return await self._generate(prompt, system_instruction, response_schema)
+
+    async def _generate(self, prompt: str, system_instruction: str, response_schema: dict) -> str:
+        options = {"system_instruction": system_instruction, "response_schema": response_schema}
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        candidates = self.ranked_regions()
+        errors = []
+        # Permit per percobaan; percobaan yang sudah mulai berarti Vertex AI benar-benar dipanggil
+        permits = []
+        local_errors = []
+
+        pending = {asyncio.ensure_future(self._call_region(candidates.pop(0), prompt, options, deadline, permits))}
+        hedge_at = loop.time() + self.hedge_after if self.hedge_after > 0 and candidates else None
+
+        try:
+            while pending:
+                now = loop.time()
+                wait_for = deadline - now
+                if hedge_at is not None:
+                    wait_for = min(wait_for, hedge_at - now)
+                if wait_for <= 0 and (hedge_at is None or deadline <= now):
+                    break
+
+                done, pending = await asyncio.wait(pending, timeout=max(wait_for, 0), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    if isinstance(task.exception(), LOCAL_CAPACITY_ERRORS):
+                        local_errors.append(str(task.exception()))
+                    else:
+                        errors.append(str(task.exception()))
+                    # Failover ke region berikutnya selama deadline belum lewat
+                    if candidates and loop.time() < deadline:
+                        self.failovers += 1
+                        pending.add(asyncio.ensure_future(self._call_region(candidates.pop(0), prompt, options, deadline, permits)))
+
+                if hedge_at is not None and loop.time() >= hedge_at:
+                    hedge_at = None
+                    if candidates and pending:
+                        # Hedge: kirim request yang sama ke region lain, ambil yang selesai lebih dulu
+                        self.hedges += 1
+                        pending.add(asyncio.ensure_future(self._call_region(candidates.pop(0), prompt, options, deadline, permits)))
+
+            if errors:
+                raise RuntimeError(f"Vertex AI generation failed: {'; '.join(errors)}")
+            if not any(permit.started for permit in permits):
+                if not local_errors:
+                    self.timeouts += 1
+                raise VertexCapacityError(
+                    f"No Vertex AI generation slot within the {self.timeout:g}s deadline"
+                    + (f": {'; '.join(local_errors)}" if local_errors else "")
+                )
+            self.timeouts += 1
+            raise RuntimeError(f"Vertex AI generation exceeded the {self.timeout:g}s deadline")
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def stream(self, prompt: str, system_instruction: str = None, response_schema: dict = None):
+        """
+        Streams text chunks from the best-ranked region. Streaming is not
+        hedged; the deadline applies to the whole stream.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        region = self.ranked_regions()[0]
+        permit = await self._acquire(deadline)
+
+        def produce(stop_event=None):
+            if not permit.enter():
+                return
+            self._track(1)
+            started = time.perf_counter()
+            ok = False
+            try:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise VertexCapacityError("Vertex AI deadline passed before the stream started")
+                permit.started = True
+                for text in self.backend.stream(region, prompt, system_instruction, response_schema, timeout=remaining):
+                    if stop_event is not None and stop_event.is_set():
+                        break
+                    yield text
+                ok = True
+            finally:
+                if permit.started:
+                    self._record(region, time.perf_counter() - started, ok)
+                self._track(-1)
+                permit.finish()
+
+        def deadline_error():
+            self.timeouts += 1
+            if not permit.started:
+                # Thread generation tidak pernah mulai: kapasitas lokal, bukan Vertex AI
+                return VertexCapacityError(f"No Vertex AI generation thread within the {self.timeout:g}s deadline")
+            return RuntimeError(f"Vertex AI stream exceeded the {self.timeout:g}s deadline")
+
+        chunks = stream_generation(produce)
+        try:
+            with vertex_breaker.track(ignore=LOCAL_CAPACITY_ERRORS):
+                while True:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        raise deadline_error()
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), remaining)
+                    except StopAsyncIteration:
+                        return
+                    except asyncio.TimeoutError:
+                        raise deadline_error()
+                    yield chunk
+        finally:
+            permit.cancel()
+            await chunks.aclose()
+
+    def warm_up(self, system_instruction: str = None):
+        """
+        Imports the SDK and creates the per-region models (and context cache)
+        ahead of the first request. Meant to run in a background thread at startup.
+        """
+        warm_up = getattr(self.backend, "warm_up", None)
+        if warm_up is not None:
+            for region in self.regions:
+                warm_up(region, system_instruction)
+
+    def get_stats(self) -> dict:
+        with self._stats_lock:
+            regions = {
+                region: {
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "ewma_latency_s": stats.latency,
+                    "ewma_error_rate": stats.error_rate,
+                }
+                for region, stats in self._region_stats.items()
+            }
+            in_flight = self.in_flight
+        return {
+            "in_flight": in_flight,
+            "waiting": self.waiting,
+            "max_concurrency": self.max_concurrency,
+            "hedges": self.hedges,
+            "failovers": self.failovers,
+            "timeouts": self.timeouts,
+            "regions": regions,
+            "ranking": self.ranked_regions(),
+        }
+
+# Instance global yang dipakai oleh layanan text generation
+vertex_client = VertexClientManager()